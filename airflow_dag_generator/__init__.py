@@ -4,6 +4,7 @@ Backend server extension for managing Airflow projects
 """
 
 from .handlers import setup_handlers
+from .core import templates
 
 
 def _jupyter_server_extension_points():
@@ -21,5 +22,7 @@ def _load_jupyter_server_extension(server_app):
     Args:
         server_app (NotebookWebApplication): handle to the Tornado server instance
     """
+    # Compile the DAG/meta/treatment templates once, before the first request
+    templates.configure(server_app.web_app.settings.get("airflow_studio"))
     setup_handlers(server_app.web_app)
     server_app.log.info("Airflow DAG Generator extension loaded successfully!")
@@ -0,0 +1,234 @@
+"""
+Command Line Interface - Fleet-wide project regeneration and local pipeline runs
+
+    python -m airflow_dag_generator regenerate --dry-run          # show diffs only
+    python -m airflow_dag_generator regenerate --jobs 16          # rewrite changed files
+    python -m airflow_dag_generator regenerate -p sales -p risk   # selected projects
+    python -m airflow_dag_generator regenerate -p sales --force   # even if hand-written code would be dropped
+    python -m airflow_dag_generator run sales --slots 4           # run a pipeline locally
+"""
+
+import argparse
+import ast
+import difflib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .core.manager import ProjectManager
+from .core.models import ProjectConfig
+from .core.runner import format_report, run_project
+from .core.templates import TEMPLATE_CACHE_ENV, TEMPLATE_DIR_ENV
+from .core.workspace import WorkspaceIndex
+
+
+TREATMENT_FILE = "src/treatment.py"
+
+
+def _top_level_code(source: str) -> Dict[str, str]:
+    """
+    Module-level definitions and statements of a treatment.py, except imports and the docstring
+
+    Functions and classes are keyed by name (task bodies are regenerated from
+    the loaded code), other statements by their normalised source. Values are
+    short labels for reports.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return {}
+    found = {}
+    for index, node in enumerate(tree.body):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            kind = "class" if isinstance(node, ast.ClassDef) else "def"
+            found[f"{kind} {node.name}"] = f"{kind} {node.name}"
+        else:
+            text = ast.unparse(node)
+            found[text] = text.splitlines()[0]
+    return found
+
+
+def _dropped_code(current: str, rendered: str) -> List[str]:
+    """
+    Hand-written top-level code of `current` that regenerating it as `rendered` would remove
+
+    The loader only keeps imports and task functions, so helpers and
+    constants added to treatment.py by hand do not survive a load and save.
+    """
+    kept = _top_level_code(rendered)
+    return [label for key, label in _top_level_code(current).items() if key not in kept]
+
+
+def regenerate_project(base_path: str, name: str, dry_run: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Reload one project and regenerate its files with the current generators
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    A project whose treatment.py has top-level code the loader does not keep
+    (helpers, constants), or whose DAG or treatment file does not parse, is
+    skipped unless `force` is set.
+
+    Args:
+        base_path: Workspace root
+        name: Project folder name
+        dry_run: Compute unified diffs instead of writing
+        force: Regenerate even if hand-written code would be dropped
+
+    Returns:
+        Dictionary with name, status (created/updated/unchanged/skipped/error),
+        changed files, dropped code, the reason of a skip, diff (dry run) and
+        timing in milliseconds
+    """
+    started = time.perf_counter()
+    result: Dict[str, Any] = {
+        "name": name, "status": "error", "changed": [], "dropped": [], "reason": None, "diff": "", "error": None,
+    }
+    try:
+        manager = ProjectManager(base_path=Path(base_path))
+        config_dict = manager.load_project(name)
+        loaded = time.perf_counter()
+
+        project_path = manager.get_project_path(name)
+        rendered = manager.render_project(ProjectConfig(**config_dict))
+        current_treatment = manager._read_optional(project_path / TREATMENT_FILE)
+        if current_treatment is not None:
+            result["dropped"] = _dropped_code(current_treatment, rendered[TREATMENT_FILE])
+
+        if config_dict.get("load_warnings") and not force:
+            # Loaded from meta.yaml alone: regenerating would replace the broken file with a stub pipeline
+            result["status"] = "skipped"
+            result["reason"] = "; ".join(warning["message"] for warning in config_dict["load_warnings"])
+        elif result["dropped"] and not force:
+            result["status"] = "skipped"
+            result["reason"] = f"would drop {', '.join(result['dropped'])} from {TREATMENT_FILE}"
+        elif dry_run:
+            diffs = []
+            for relative_path, content in rendered.items():
+                current = manager._read_optional(project_path / relative_path)
+                if current == content:
+                    continue
+                result["changed"].append(relative_path)
+                diffs.extend(difflib.unified_diff(
+                    (current or "").splitlines(keepends=True),
+                    content.splitlines(keepends=True),
+                    fromfile=f"a/{name}/{relative_path}" if current is not None else "/dev/null",
+                    tofile=f"b/{name}/{relative_path}",
+                ))
+            result["diff"] = "".join(diffs)
+            result["status"] = "updated" if result["changed"] else "unchanged"
+        else:
+            saved = manager.save_project(config_dict)
+            result["changed"] = saved["files"]["created"] + saved["files"]["written"]
+            result["status"] = saved["status"]
+        result["load_ms"] = round((loaded - started) * 1e3, 1)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["total_ms"] = round((time.perf_counter() - started) * 1e3, 1)
+    return result
+
+
+def _discover(base_path: Path) -> List[str]:
+    """Folders under the workspace root that contain a meta.yaml"""
+    return [
+        name for name in WorkspaceIndex(base_path).names()
+        if (base_path / name / "meta.yaml").is_file()
+    ]
+
+
+def _report(result: Dict[str, Any]) -> str:
+    """One output line for a project"""
+    if result["status"] == "error":
+        detail = result["error"]
+    elif result["status"] == "skipped":
+        detail = f"{result['reason']} (--force to regenerate anyway)"
+    else:
+        detail = ", ".join(result["changed"]) or "-"
+    return f"{result['name']:<40} {result['status']:<10} {result['total_ms']:>9.1f} ms  {detail}"
+
+
+def regenerate(args) -> int:
+    base_path = Path(args.base_path).expanduser()
+    names = args.project or _discover(base_path)
+    if not names:
+        print(f"No projects found under {base_path}")
+        return 0
+
+    # Workers build their template registry from the environment
+    if args.template_dir:
+        os.environ[TEMPLATE_DIR_ENV] = str(Path(args.template_dir).expanduser())
+    if args.template_cache:
+        os.environ[TEMPLATE_CACHE_ENV] = str(Path(args.template_cache).expanduser())
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [
+            executor.submit(regenerate_project, str(base_path), name, args.dry_run, args.force) for name in names
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(_report(result))
+            if args.dry_run and result["diff"]:
+                sys.stdout.write(result["diff"])
+    elapsed = time.perf_counter() - started
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    cpu_ms = sum(result["total_ms"] for result in results)
+    slowest = max(results, key=lambda r: r["total_ms"])
+    print(
+        f"\n{len(results)} project(s) in {elapsed:.2f}s with {args.jobs} job(s)"
+        f"{' (dry run, nothing written)' if args.dry_run else ''}: "
+        + ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    )
+    print(f"per-project time: {cpu_ms:.0f} ms total, slowest {slowest['name']} ({slowest['total_ms']:.1f} ms)")
+    return 1 if counts.get("error") or counts.get("skipped") else 0
+
+
+def run(args) -> int:
+    project_path = Path(args.base_path).expanduser() / args.project
+    if not (project_path / "meta.yaml").is_file():
+        print(f"No project at {project_path}")
+        return 2
+    report = run_project(project_path, args.slots)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(format_report(report))
+    return 0 if report["success"] else 1
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="airflow_dag_generator", description="Airflow Studio command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    regen = commands.add_parser("regenerate", help="regenerate every project with the current templates")
+    regen.add_argument("--base-path", default=str(Path.home() / "workspaces"), help="workspace root")
+    regen.add_argument("-p", "--project", action="append", help="only these projects (repeatable)")
+    regen.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    regen.add_argument("--dry-run", action="store_true", help="print unified diffs instead of writing")
+    regen.add_argument("--force", action="store_true",
+                       help="regenerate projects even if hand-written code would be dropped")
+    regen.add_argument("--template-dir", help="organisation template overrides (per-stage subfolders allowed)")
+    regen.add_argument("--template-cache", help="folder for compiled template bytecode shared by workers")
+    regen.set_defaults(handler=regenerate)
+
+    local = commands.add_parser("run", help="run a project's tasks locally in dependency order")
+    local.add_argument("project", help="project folder name")
+    local.add_argument("--base-path", default=str(Path.home() / "workspaces"), help="workspace root")
+    local.add_argument("--slots", type=int, help="pool slots available at once (default: CPU count)")
+    local.add_argument("--json", action="store_true", help="print the full report as JSON")
+    local.set_defaults(handler=run)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
@@ -0,0 +1,285 @@
+"""
+Pipeline Analyzer - Critical path, pool capacity and makespan estimates
+"""
+
+import heapq
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .graph import downstream_map, task_dependencies, topological_order
+from .models import ProjectConfig, Task
+
+
+DEFAULT_DURATION = 1.0
+MANUAL_PRIORITY_WEIGHTS = {'high': 3, 'mid': 2, 'low': 1}
+
+
+def task_pool(task: Task, config: ProjectConfig) -> str:
+    """Pool a task runs in, with the same fallback as DagGenerator"""
+    return task.selected_pool or (config.pools[0] if config.pools else 'default_pool')
+
+
+def fan_out(task: Task) -> Tuple[int, int]:
+    """
+    (instances, instances running at once) of a task
+
+    A task mapped over static values runs once per value, at most
+    max_active_tis_per_dag at a time. The size of an XCom-mapped task is only
+    known at run time: it counts as one wave of max_active_tis_per_dag.
+    """
+    mapping = task.mapping
+    if mapping is None:
+        return 1, 1
+    if mapping.from_task:
+        width = mapping.max_active_tis_per_dag or 1
+        return width, width
+    instances = len(mapping.values)
+    return instances, min(instances, mapping.max_active_tis_per_dag or instances)
+
+
+def _peak_concurrency(intervals: Iterable[Tuple[float, float, int]]) -> int:
+    """Peak summed weight of overlapping [start, end) intervals"""
+    events = []
+    for start, end, weight in intervals:
+        if end > start:
+            events.append((start, 1, weight))
+            events.append((end, 0, -weight))
+    # Ends (0) sort before starts (1) at the same instant
+    events.sort()
+    current = peak = 0
+    for _, _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def check_estimates(durations: Any, pool_capacity: Any):
+    """
+    Validate the optional inputs of analyze_pipeline coming from a request
+
+    Raises:
+        ValueError: If durations is not a {task id: non-negative number}
+            object or pool_capacity not a {pool: positive integer} object
+    """
+    if durations is not None:
+        if not isinstance(durations, dict):
+            raise ValueError("'durations' must be an object of task id to duration")
+        for task_id, value in durations.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+                raise ValueError(f"Duration of task '{task_id}' must be a non-negative number, got {value!r}")
+    if pool_capacity is not None:
+        if not isinstance(pool_capacity, dict):
+            raise ValueError("'pool_capacity' must be an object of pool name to slots")
+        for name, value in pool_capacity.items():
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError(f"Capacity of pool '{name}' must be a positive integer, got {value!r}")
+
+
+def critical_path_weights(config: ProjectConfig, durations: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+    """
+    Integer priority_weight per task id that schedules critical-path work first
+
+    The weight is the task's bottom level (longest remaining path to the end of
+    the DAG, in units of the shortest task), with the manual high/mid/low
+    priority as a tie-breaker. Meant for weight_rule='absolute'.
+    """
+    analysis = analyze_pipeline(config, durations)
+    return {task_id: info["suggested_priority_weight"] for task_id, info in analysis["tasks"].items()}
+
+
+def analyze_pipeline(
+    config: ProjectConfig,
+    durations: Optional[Dict[str, float]] = None,
+    pool_capacity: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze a pipeline's schedule
+
+    Args:
+        config: Validated project configuration
+        durations: Estimated duration per task id (any unit; default 1.0 each),
+            per instance for mapped tasks
+        pool_capacity: Slots per pool name; pools not listed are treated as unbounded
+
+    Returns:
+        Dictionary with the critical path, per-step and per-pool parallelism,
+        makespan estimates, per-task timing and suggested priority weights
+    """
+    durations = durations or {}
+    pool_capacity = pool_capacity or {}
+    tasks: Dict[str, Task] = {task.id: task for step in config.pipeline for task in step.tasks}
+    # Mapped instances run in waves of `width`, each holding its pool slots
+    waves = {}
+    slots = {}
+    for task_id, task in tasks.items():
+        instances, width = fan_out(task)
+        waves[task_id] = -(-instances // width)
+        slots[task_id] = task.pool_slots * width
+    duration = {task_id: float(durations.get(task_id, DEFAULT_DURATION)) * waves[task_id] for task_id in tasks}
+    warnings: List[str] = []
+
+    dependencies = task_dependencies(config.pipeline)
+    downstream = downstream_map(dependencies)
+    order = topological_order(dependencies)
+
+    # Forward pass: earliest start/finish with unlimited slots
+    earliest_start: Dict[str, float] = {}
+    earliest_finish: Dict[str, float] = {}
+    for task_id in order:
+        earliest_start[task_id] = max((earliest_finish[up] for up in dependencies[task_id]), default=0.0)
+        earliest_finish[task_id] = earliest_start[task_id] + duration[task_id]
+    critical_length = max(earliest_finish.values(), default=0.0)
+
+    # Backward pass: bottom level (longest path to the end, own duration included)
+    bottom_level: Dict[str, float] = {}
+    for task_id in reversed(order):
+        bottom_level[task_id] = duration[task_id] + max((bottom_level[d] for d in downstream[task_id]), default=0.0)
+
+    # Critical path: from the root with the largest bottom level, follow the heaviest successor
+    critical_path: List[str] = []
+    roots = [task_id for task_id in order if not dependencies[task_id]]
+    if roots:
+        node = max(roots, key=lambda t: bottom_level[t])
+        while node is not None:
+            critical_path.append(node)
+            node = max(downstream[node], key=lambda t: bottom_level[t], default=None)
+
+    # Suggested weights: bottom level in units of the shortest task, manual priority breaks ties
+    unit = min((d for d in duration.values() if d > 0), default=DEFAULT_DURATION)
+    suggested = {
+        task_id: int(round(bottom_level[task_id] / unit)) * 10 + MANUAL_PRIORITY_WEIGHTS.get(tasks[task_id].priority, 1)
+        for task_id in tasks
+    }
+
+    # Steps: size, slot demand and peak overlap of their tasks in the unconstrained schedule
+    steps = []
+    for step in config.pipeline:
+        steps.append({
+            "id": step.id,
+            "tasks": len(step.tasks),
+            "slot_demand": sum(slots[task.id] for task in step.tasks),
+            "max_parallelism": _peak_concurrency(
+                (earliest_start[t.id], earliest_finish[t.id], 1) for t in step.tasks
+            ),
+        })
+
+    # Pools: peak slot demand of the unconstrained schedule vs declared capacity
+    pools: Dict[str, Dict[str, Any]] = {}
+    for task_id, task in tasks.items():
+        name = task_pool(task, config)
+        entry = pools.setdefault(name, {
+            "capacity": pool_capacity.get(name),
+            "declared": name in config.pools,
+            "tasks": [],
+            "total_slots": 0,
+        })
+        entry["tasks"].append(task_id)
+        entry["total_slots"] += slots[task_id]
+    for name, entry in pools.items():
+        entry["peak_demand"] = _peak_concurrency(
+            (earliest_start[t], earliest_finish[t], slots[t]) for t in entry["tasks"]
+        )
+        capacity = entry["capacity"]
+        entry["over_capacity"] = capacity is not None and entry["peak_demand"] > capacity
+        if not entry["declared"] and name != 'default_pool':
+            warnings.append(f"Pool '{name}' is used by tasks but not listed in the project pools")
+        if entry["over_capacity"]:
+            warnings.append(
+                f"Pool '{name}' needs {entry['peak_demand']} slots at peak but has {capacity}; "
+                "tasks will queue"
+            )
+        for task_id in entry["tasks"]:
+            if capacity is not None and tasks[task_id].pool_slots > capacity:
+                warnings.append(
+                    f"Task '{tasks[task_id].name}' needs {tasks[task_id].pool_slots} slots "
+                    f"but pool '{name}' only has {capacity}; it can never start"
+                )
+
+    makespan = _simulate(tasks, dependencies, downstream, duration, slots, suggested, config, pool_capacity)
+
+    return {
+        "critical_path": critical_path,
+        "critical_path_duration": critical_length,
+        "max_parallelism": _peak_concurrency(
+            (earliest_start[t], earliest_finish[t], 1) for t in tasks
+        ),
+        "makespan": {
+            "unconstrained": critical_length,
+            "with_pool_limits": makespan,
+        },
+        "steps": steps,
+        "pools": pools,
+        "tasks": {
+            task_id: {
+                "name": tasks[task_id].name,
+                "duration": duration[task_id],
+                "instances": fan_out(tasks[task_id])[0],
+                "earliest_start": earliest_start[task_id],
+                "slack": critical_length - earliest_start[task_id] - bottom_level[task_id],
+                "bottom_level": bottom_level[task_id],
+                "priority_weight": MANUAL_PRIORITY_WEIGHTS.get(tasks[task_id].priority, 1),
+                "suggested_priority_weight": suggested[task_id],
+            }
+            for task_id in order
+        },
+        "warnings": warnings,
+    }
+
+
+def _simulate(
+    tasks: Dict[str, Task],
+    dependencies: Dict[str, List[str]],
+    downstream: Dict[str, List[str]],
+    duration: Dict[str, float],
+    slots: Dict[str, int],
+    priority: Dict[str, int],
+    config: ProjectConfig,
+    pool_capacity: Dict[str, int],
+) -> float:
+    """List-schedule the DAG under pool limits, highest priority first; returns the makespan"""
+    free = dict(pool_capacity)
+    # Slots a task takes from its pool: a task larger than its pool would block
+    # forever, so it takes the whole pool and runs alone once the pool is idle
+    need = {}
+    for task_id, task in tasks.items():
+        name = task_pool(task, config)
+        need[task_id] = min(slots[task_id], pool_capacity[name]) if name in pool_capacity else slots[task_id]
+
+    waiting = {task_id: len(set(dependencies[task_id])) for task_id in tasks}
+    ready = [task_id for task_id, count in waiting.items() if count == 0]
+    running: List[Tuple[float, str]] = []
+    now = 0.0
+    finished = 0
+    while finished < len(tasks):
+        ready.sort(key=lambda t: -priority[t])
+        still_waiting = []
+        # Pools held back for an oversized task waiting at the head of their queue
+        reserved = set()
+        for task_id in ready:
+            name = task_pool(tasks[task_id], config)
+            if name in reserved or (name in free and free[name] < need[task_id]):
+                if name in free and slots[task_id] > pool_capacity[name]:
+                    reserved.add(name)
+                still_waiting.append(task_id)
+                continue
+            if name in free:
+                free[name] -= need[task_id]
+            heapq.heappush(running, (now + duration[task_id], task_id))
+        ready = still_waiting
+
+        if not running:
+            break
+        now, task_id = heapq.heappop(running)
+        done = [task_id]
+        while running and running[0][0] == now:
+            done.append(heapq.heappop(running)[1])
+        for task_id in done:
+            finished += 1
+            name = task_pool(tasks[task_id], config)
+            if name in free:
+                free[name] += need[task_id]
+            for down in downstream[task_id]:
+                waiting[down] -= 1
+                if waiting[down] == 0:
+                    ready.append(down)
+    return now
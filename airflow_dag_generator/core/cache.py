@@ -0,0 +1,193 @@
+"""
+Project Cache - In-process LRU of parsed project configs with stat validation
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import inotify_simple
+except ImportError:  # optional dependency
+    inotify_simple = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+def stat_signature(files: Iterable[Path]) -> Signature:
+    """(name, mtime_ns, size) for each file; missing files are recorded as (name, -1, -1)"""
+    signature = []
+    for path in files:
+        try:
+            st = os.stat(path)
+            signature.append((str(path), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append((str(path), -1, -1))
+    return tuple(signature)
+
+
+class ProjectCache:
+    """
+    Bounded LRU cache keyed by project path
+
+    Every lookup re-stats the files the entry was built from and drops the
+    entry if any of them changed. With `watch=True` and `inotify_simple`
+    installed, a background thread evicts entries as soon as their project
+    folder changes. inotify does not see writes made from other NFS clients,
+    so stat validation stays on in both modes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, watch: bool = False):
+        """
+        Args:
+            max_entries: Maximum number of cached projects
+            watch: Enable inotify-based invalidation when available
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, Tuple[Signature, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._watcher: Optional[_InotifyWatcher] = None
+        if watch:
+            if inotify_simple is None:
+                logger.warning("inotify_simple is not installed; project cache uses stat validation only")
+            else:
+                self._watcher = _InotifyWatcher(self.invalidate)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None) -> "ProjectCache":
+        """Build a cache from the `airflow_studio` tornado settings"""
+        settings = settings or {}
+        return cls(
+            max_entries=int(settings.get("cache_size", DEFAULT_MAX_ENTRIES)),
+            watch=bool(settings.get("cache_inotify", False)),
+        )
+
+    def get(self, key: Path, files: Iterable[Path]) -> Optional[Any]:
+        """
+        Return the cached value for `key` if the files it was built from are unchanged
+
+        Args:
+            key: Project folder
+            files: Files whose stat signature must match the cached one
+        """
+        signature = stat_signature(files)
+        with self._lock:
+            entry = self._entries.get(str(key))
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(str(key))
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[str(key)]
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Path, files: Iterable[Path], value: Any, signature: Optional[Signature] = None):
+        """
+        Store `value` for `key`, stamped with the stat signature of `files`
+
+        Args:
+            key: Project folder
+            files: Files the value was built from
+            value: Cached value
+            signature: stat_signature(files) taken before they were read
+                (defaults to the current one); a later signature would hide a
+                write made while they were being read
+        """
+        if signature is None:
+            signature = stat_signature(files)
+        with self._lock:
+            self._entries[str(key)] = (signature, value)
+            self._entries.move_to_end(str(key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        if self._watcher is not None:
+            self._watcher.watch(key)
+
+    def invalidate(self, key: Path):
+        """Drop the entry for `key` if present"""
+        with self._lock:
+            if self._entries.pop(str(key), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "inotify": self._watcher is not None,
+            }
+
+
+class _InotifyWatcher:
+    """Background thread translating inotify events into cache invalidations"""
+
+    def __init__(self, on_change):
+        flags = inotify_simple.flags
+        self._mask = (
+            flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM
+            | flags.CREATE | flags.DELETE | flags.DELETE_SELF
+        )
+        self._inotify = inotify_simple.INotify()
+        self._on_change = on_change
+        self._paths: Dict[int, Path] = {}
+        self._watched = set()
+        self._lock = threading.Lock()
+        thread = threading.Thread(target=self._run, name="airflow-studio-inotify", daemon=True)
+        thread.start()
+
+    def watch(self, project_path: Path):
+        """Watch a project folder and its src/ subfolder"""
+        with self._lock:
+            for path in (Path(project_path), Path(project_path) / "src"):
+                if str(path) in self._watched or not path.is_dir():
+                    continue
+                wd = self._inotify.add_watch(str(path), self._mask)
+                self._paths[wd] = Path(project_path)
+                self._watched.add(str(path))
+
+    def _run(self):
+        while True:
+            try:
+                events = self._inotify.read()
+            except OSError:
+                logger.exception("inotify watcher stopped")
+                return
+            for event in events:
+                with self._lock:
+                    project_path = self._paths.get(event.wd)
+                    if event.mask & inotify_simple.flags.IGNORED:
+                        # Watch removed by the kernel (folder deleted): allow re-watching
+                        self._paths.pop(event.wd, None)
+                        self._watched = {
+                            p for p in self._watched
+                            if project_path is None or not p.startswith(str(project_path))
+                        }
+                if project_path is not None:
+                    self._on_change(project_path)
@@ -0,0 +1,259 @@
+"""
+Conda Index - Cached package inventory of the custom conda envs, read from conda-meta
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .models import CALLABLE_TYPES, ProjectConfig
+from .preflight import CONDA_ENVS_DIR, env_modules, import_roots
+
+
+logger = logging.getLogger(__name__)
+
+# Top-level entry of an installed file: lib/python3.X/site-packages/<entry>[/...]
+_SITE_PACKAGES_ENTRY = re.compile(r'^lib/python3\.\d+/site-packages/([^/]+)(/?)')
+
+# Every env's interpreter provides these, so they never tell envs apart (3.10+)
+_STDLIB = set(getattr(sys, "stdlib_module_names", ())) | set(sys.builtin_module_names) | {"__future__"}
+
+
+class CondaPackage(NamedTuple):
+    name: str
+    version: str
+    build: str
+    size: int
+    modules: Tuple[str, ...]
+
+
+class _EnvEntry(NamedTuple):
+    signature: Tuple[int, int]
+    records: Dict[str, Tuple[int, CondaPackage]]
+    inventory: Dict[str, Any]
+
+
+def _package_modules(files: Iterable[str]) -> Tuple[str, ...]:
+    """Top-level importable names a package installs into site-packages"""
+    modules = set()
+    for path in files:
+        match = _SITE_PACKAGES_ENTRY.match(path)
+        if match is None:
+            continue
+        entry, in_folder = match.group(1), match.group(2)
+        if in_folder:
+            # Packages; skip .dist-info/.egg-info metadata and bytecode caches
+            if entry != "__pycache__":
+                modules.add(entry)
+        elif entry.endswith(".py"):
+            modules.add(entry[:-3])
+        elif entry.endswith((".so", ".pyd")):
+            modules.add(entry.split('.')[0])
+    return tuple(sorted(module for module in modules if module.isidentifier()))
+
+
+def read_package(meta_file: Path) -> Optional[CondaPackage]:
+    """One conda-meta/<name>-<version>-<build>.json record, or None if it does not read as JSON"""
+    try:
+        with open(meta_file, 'rb') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(record, dict):
+        return None
+    return CondaPackage(
+        name=str(record.get("name") or meta_file.stem),
+        version=str(record.get("version", "")),
+        build=str(record.get("build", "")),
+        size=int(record.get("size") or 0),
+        modules=_package_modules(record.get("files") or ()),
+    )
+
+
+def project_imports(config: ProjectConfig) -> List[str]:
+    """Sorted non-stdlib top-level modules imported by the project's Python tasks"""
+    modules = set()
+    for step in config.pipeline:
+        for task in step.tasks:
+            if task.type not in CALLABLE_TYPES:
+                continue
+            for source in (task.imports, task.code):
+                modules.update(root for _, root in import_roots(source))
+    # `src` is the project's own package
+    return sorted(modules - _STDLIB - {"src"})
+
+
+class CondaIndex:
+    """
+    Package inventory of every env under CONDA_ENVS_DIR, safe to share between threads
+
+    An env is re-read only when the mtime of its folder or of its conda-meta
+    folder changes (conda adds and removes one JSON record per package), and
+    then only the records whose file changed are parsed again. `start()`
+    builds the index in a background thread so the first request does not
+    pay for reading every record.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._root_mtime: Optional[int] = None
+        self._names: List[str] = []
+        self._entries: Dict[str, _EnvEntry] = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Index every env in a daemon thread"""
+        thread = threading.Thread(target=self._build, name="airflow-studio-conda-index", daemon=True)
+        thread.start()
+
+    def _build(self):
+        try:
+            for name in self.names():
+                self.inventory(name)
+        except Exception:
+            logger.exception("Building the conda index failed")
+
+    def names(self) -> List[str]:
+        """Sorted env folder names, rescanned only if CONDA_ENVS_DIR changed"""
+        try:
+            root_mtime = os.stat(CONDA_ENVS_DIR).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            with self._lock:
+                self._root_mtime, self._names = None, []
+                self._entries.clear()
+            return []
+
+        with self._lock:
+            if root_mtime == self._root_mtime:
+                return list(self._names)
+
+        with os.scandir(CONDA_ENVS_DIR) as entries:
+            names = sorted(entry.name for entry in entries if not entry.name.startswith('.') and entry.is_dir())
+        with self._lock:
+            self._root_mtime, self._names = root_mtime, names
+            for removed in set(self._entries) - set(names):
+                del self._entries[removed]
+        return list(names)
+
+    @staticmethod
+    def _signature(env_path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            return os.stat(env_path).st_mtime_ns, os.stat(env_path / "conda-meta").st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def inventory(self, env_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Packages installed in one env (blocking on a cache miss)
+
+        Args:
+            env_name: Folder name under CONDA_ENVS_DIR
+
+        Returns:
+            Dictionary with name, python version, package_count, size_bytes
+            (sum of the package archive sizes), packages {name: version} and
+            provides {module: package}, or None if the env has no conda-meta
+            or is not one of names() (e.g. a path from a URL)
+        """
+        if env_name not in self.names():
+            return None
+        env_path = CONDA_ENVS_DIR / env_name
+        signature = self._signature(env_path)
+        if signature is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(env_name)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry.inventory
+            self.misses += 1
+
+        previous = entry.records if entry is not None else {}
+        records: Dict[str, Tuple[int, CondaPackage]] = {}
+        with os.scandir(env_path / "conda-meta") as files:
+            for meta_file in files:
+                if not meta_file.name.endswith(".json"):
+                    continue
+                mtime = meta_file.stat().st_mtime_ns
+                cached = previous.get(meta_file.name)
+                if cached is not None and cached[0] == mtime:
+                    records[meta_file.name] = cached
+                    continue
+                package = read_package(Path(meta_file.path))
+                if package is not None:
+                    records[meta_file.name] = (mtime, package)
+
+        packages = sorted((package for _, package in records.values()), key=lambda package: package.name)
+        provides: Dict[str, str] = {}
+        for package in packages:
+            for module in package.modules:
+                provides.setdefault(module, package.name)
+        inventory = {
+            "name": env_name,
+            "python": next((package.version for package in packages if package.name == "python"), None),
+            "package_count": len(packages),
+            "size_bytes": sum(package.size for package in packages),
+            "packages": {package.name: package.version for package in packages},
+            "provides": provides,
+        }
+        with self._lock:
+            self._entries[env_name] = _EnvEntry(signature, records, inventory)
+        return inventory
+
+    def rank(self, imports: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Envs ordered by how well they cover `imports` (blocking)
+
+        Envs missing the fewest modules come first; among those, the smallest
+        (by total package size, then package count) wins, since a lighter env
+        starts workers and parses DAGs faster. Modules installed with pip are
+        found through the pre-flight scan of the env's site-packages.
+
+        Args:
+            imports: Top-level module names, e.g. from project_imports
+
+        Returns:
+            List of {name, python, package_count, size_bytes, coverage,
+            covered {module: conda package or None for pip}, missing}
+        """
+        wanted = sorted(set(imports))
+        ranked = []
+        for name in self.names():
+            inventory = self.inventory(name)
+            if inventory is None:
+                continue
+            installed = None
+            covered: Dict[str, Optional[str]] = {}
+            missing = []
+            for module in wanted:
+                if module in inventory["provides"]:
+                    covered[module] = inventory["provides"][module]
+                    continue
+                if installed is None:
+                    installed = env_modules.modules(name) or set()
+                if module in installed:
+                    covered[module] = None
+                else:
+                    missing.append(module)
+            ranked.append({
+                "name": name,
+                "python": inventory["python"],
+                "package_count": inventory["package_count"],
+                "size_bytes": inventory["size_bytes"],
+                "coverage": round(len(covered) / len(wanted), 4) if wanted else 1.0,
+                "covered": covered,
+                "missing": missing,
+            })
+        ranked.sort(key=lambda env: (len(env["missing"]), env["size_bytes"], env["package_count"], env["name"]))
+        return ranked
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,102 @@
+"""
+Cron Expressions - Syntax check for DAG schedules
+"""
+
+import re
+from typing import Optional
+
+try:
+    from croniter import croniter
+except ImportError:  # optional dependency; Airflow itself parses schedules with croniter
+    croniter = None
+
+
+# Presets accepted by Airflow's schedule_interval
+PRESETS = {'@once', '@continuous', '@hourly', '@daily', '@weekly', '@monthly', '@quarterly', '@yearly', '@annually'}
+
+_MONTHS = {name: index for index, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+_DAYS = {name: index for index, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+
+# (name, minimum, maximum, symbolic names)
+_FIELDS = (
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, _MONTHS),
+    ("day of week", 0, 7, _DAYS),
+    # croniter reads a sixth field as seconds
+    ("second", 0, 59, {}),
+)
+
+_ITEM = re.compile(r'^(?P<range>\*|[0-9a-z]+(?:-[0-9a-z]+)?)(?:/(?P<step>\d+))?$')
+
+# croniter extensions: last day (L) and nearest weekday (15W) of the month;
+# nth weekday (1#2) and last weekday (5L, L5) of the month
+_DAY_OF_MONTH_SPECIAL = re.compile(r'^(?:l|lw|(?P<day>\d{1,2})w)$')
+_DAY_OF_WEEK_SPECIAL = re.compile(r'^(?:(?P<nth>[0-7])#[1-5]|(?P<last>[0-7])l|l(?P<last_prefix>[0-7]))$')
+
+
+def _value(token: str, name: str, low: int, high: int, names: dict) -> int:
+    value = names[token] if token in names else int(token) if token.isdigit() else None
+    if value is None:
+        raise ValueError(f"invalid {name} value '{token}'")
+    if not low <= value <= high:
+        raise ValueError(f"{name} value {value} out of range {low}-{high}")
+    return value
+
+
+def cron_error(expression: str) -> Optional[str]:
+    """
+    Check a cron expression or an Airflow preset
+
+    Uses croniter (what Airflow schedules with) when it is installed;
+    otherwise a built-in check of 5- or 6-field expressions including
+    croniter's L, W, # and ? extensions.
+
+    Args:
+        expression: Schedule as written in the config ("" means no schedule)
+
+    Returns:
+        None if valid, otherwise a human-readable reason
+    """
+    expression = expression.strip()
+    if not expression or expression.lower() in PRESETS:
+        return None
+    if expression.startswith('@'):
+        return f"unknown preset '{expression}'"
+
+    if croniter is not None:
+        return None if croniter.is_valid(expression) else "not a valid cron expression"
+
+    fields = expression.split()
+    if len(fields) not in (5, 6):
+        return f"expected 5 or 6 fields (minute hour day month weekday [second]), got {len(fields)}"
+
+    for index, (field, (name, low, high, names)) in enumerate(zip(fields, _FIELDS)):
+        if field == '?' and name in ("day of month", "day of week"):
+            continue
+        for item in field.lower().split(','):
+            special = _DAY_OF_MONTH_SPECIAL if index == 2 else _DAY_OF_WEEK_SPECIAL if index == 4 else None
+            special_match = special.match(item) if special is not None else None
+            if special_match is not None:
+                day = next((value for value in special_match.groupdict().values() if value is not None), None)
+                if day is not None:
+                    try:
+                        _value(day, name, low, high, names)
+                    except ValueError as e:
+                        return str(e)
+                continue
+            match = _ITEM.match(item)
+            if match is None:
+                return f"invalid {name} field '{field}'"
+            try:
+                if match.group('range') != '*':
+                    bounds = [_value(token, name, low, high, names) for token in match.group('range').split('-')]
+                    if len(bounds) == 2 and bounds[0] > bounds[1]:
+                        return f"{name} range '{match.group('range')}' is reversed"
+                if match.group('step') is not None and int(match.group('step')) == 0:
+                    return f"{name} step cannot be 0"
+            except ValueError as e:
+                return str(e)
+    return None
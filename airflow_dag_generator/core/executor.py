@@ -0,0 +1,114 @@
+"""
+Worker Pool - Bounded thread pool with per-user and per-project concurrency limits
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_USER = 4
+DEFAULT_PER_PROJECT = 1
+
+
+class KeyedSemaphore:
+    """Semaphores created on demand per key and dropped once idle"""
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximum concurrent holders for a single key
+        """
+        self.limit = limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        """Acquire the semaphore for `key` for the duration of the block"""
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(self.limit)
+        self._holders[key] = self._holders.get(key, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._holders[key] -= 1
+            if self._holders[key] == 0:
+                del self._holders[key]
+                del self._semaphores[key]
+
+
+class WorkerPool:
+    """Runs blocking project work off the IOLoop with bounded concurrency"""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        per_user: int = DEFAULT_PER_USER,
+        per_project: int = DEFAULT_PER_PROJECT,
+    ):
+        """
+        Args:
+            max_workers: Size of the shared thread pool
+            per_user: Concurrent operations allowed for a single user
+            per_project: Concurrent operations allowed on a single project
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="airflow-studio"
+        )
+        self._users = KeyedSemaphore(per_user)
+        self._projects = KeyedSemaphore(per_project)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None) -> "WorkerPool":
+        """
+        Build a pool from the `airflow_studio` tornado settings, e.g.
+        c.ServerApp.tornado_settings = {"airflow_studio": {"max_workers": 16}}
+        """
+        settings = settings or {}
+        return cls(
+            max_workers=int(settings.get("max_workers", DEFAULT_MAX_WORKERS)),
+            per_user=int(settings.get("per_user", DEFAULT_PER_USER)),
+            per_project=int(settings.get("per_project", DEFAULT_PER_PROJECT)),
+        )
+
+    @asynccontextmanager
+    async def slot(self, user: str, project: Optional[str] = None):
+        """Hold the user and project limits without consuming a worker thread"""
+        async with self._users.hold(user):
+            if project is None:
+                yield
+                return
+            async with self._projects.hold(project):
+                yield
+
+    async def run(self, user: str, project: Optional[str], func: Callable, *args) -> Any:
+        """
+        Run a blocking callable on the thread pool
+
+        The callable sees the caller's context variables (e.g. the request id).
+
+        Args:
+            user: Name of the requesting user
+            project: Project key (name or path) the work touches, or None
+            func: Blocking callable
+            *args: Positional arguments for `func`
+
+        Returns:
+            The callable's return value
+        """
+        async with self.slot(user, project):
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, functools.partial(context.run, func, *args))
+
+    def shutdown(self):
+        """Stop accepting work and release the worker threads"""
+        self.executor.shutdown(wait=False)
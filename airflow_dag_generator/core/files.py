@@ -0,0 +1,76 @@
+"""
+File Writing - Atomic, content-hash-based incremental writes
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+CREATED = "created"
+WRITTEN = "written"
+SKIPPED = "skipped"
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of raw file content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 hex digest of a file on disk"""
+    with open(path, 'rb') as f:
+        return content_hash(f.read())
+
+
+def write_atomic(path: Path, data: bytes):
+    """
+    Write data to a temporary file next to `path`, then rename it into place
+
+    Readers (including the Airflow DAG processor) only ever see the old or
+    the new file, never a partially written one.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if path.exists():
+            os.chmod(tmp_name, path.stat().st_mode & 0o7777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_name, 0o666 & ~umask)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_if_changed(path: Path, content: str) -> str:
+    """
+    Write `content` to `path` only if it differs from what is already there
+
+    Args:
+        path: Target file
+        content: Full text content
+
+    Returns:
+        CREATED, WRITTEN or SKIPPED
+    """
+    data = content.encode('utf-8')
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        write_atomic(path, data)
+        return CREATED
+
+    # A size mismatch means a change without reading the old file
+    if stat.st_size == len(data) and file_hash(path) == content_hash(data):
+        return SKIPPED
+
+    write_atomic(path, data)
+    return WRITTEN
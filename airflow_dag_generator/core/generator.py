@@ -2,13 +2,132 @@
 Code Generators for meta.yaml, dag.py, and treatment.py
 """
 
-from typing import List
-from .models import ProjectConfig, PipelineStep, Task
+import io
+import re
+from typing import Dict, List, NamedTuple, Optional, TextIO, Tuple
+from .models import CALLABLE_TYPES, ProjectConfig, PipelineStep, Task
+from .graph import downstream_map, has_explicit_dependencies, task_dependencies, topological_order
+from .analyzer import critical_path_weights
+from .templates import TemplateRegistry, get_registry, workspace_path
+
+
+_UNSAFE_IDENTIFIER_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+# Operator class generated for each Task.type
+OPERATOR_CLASSES = {
+    'python': 'PythonOperator',
+    'bash': 'BashOperator',
+    'dummy': 'EmptyOperator',
+    'external_python': 'ExternalPythonOperator',
+}
+
+# Queues GPU and NAS tasks go to unless they name one
+GPU_QUEUE = "gpu"
+NAS_QUEUE = "nas"
+
+# Task deferring until the input folder has files (wait_for_input)
+INPUT_SENSOR = "wait_for_input"
+# Seconds between the deferred sensor's checks
+INPUT_POKE_INTERVAL = 60
+# Task ids of the nodes every generated DAG starts and ends with
+BOUNDARY_TASKS = ("start", "end")
+
+# Decorator of the tasks with cache_result, and the treatment.py import providing it
+CACHE_DECORATOR = "@cached"
+CACHE_IMPORT = "from src._cache import cached"
+# Default size of a project's result cache store
+RESULT_CACHE_MB = 1024
+
+# First line of a treatment.py generated with lazy_imports (the loader keys on it)
+LAZY_IMPORTS_MARKER = "# lazy_imports: each task imports its own dependencies, so importing this module is cheap"
+
+
+def sanitize_name(name: str) -> str:
+    """Convert task name to valid Python identifier"""
+    return _UNSAFE_IDENTIFIER_CHARS.sub('_', name)
+
+
+def reserved_task_ids(wait_for_input: bool) -> Tuple[str, ...]:
+    """Task ids the DAG template defines itself, which no project task may generate"""
+    return BOUNDARY_TASKS + ((INPUT_SENSOR,) if wait_for_input else ())
+
+
+# Template rows are tuples rather than dicts: Jinja resolves `row.field` with
+# getattr first, and a dict would pay for an AttributeError on every lookup.
+class TreatmentRow(NamedTuple):
+    name: str
+    label: str
+    priority: str
+    pool_slots: int
+    body: str
+    imports: str
+    # CACHE_DECORATOR line (with its arguments) or ""
+    decorator: str = ""
+
+
+class OperatorRow(NamedTuple):
+    name: str
+    priority_weight: int
+    pool: str
+    pool_slots: int
+    # `.expand()` arguments and concurrency cap of a mapped task
+    expand: Optional[str] = None
+    max_active_tis_per_dag: Optional[int] = None
+    operator: str = 'PythonOperator'
+    # Python literal of a BashOperator's command
+    command: Optional[str] = None
+    queue: Optional[str] = None
+    # Python expression of the executor_config
+    executor_config: Optional[str] = None
+    # Minutes
+    execution_timeout: Optional[int] = None
+
+
+def folder_dataset(folder: str) -> str:
+    """Dataset URI of a workspace folder: the same for the project writing it and those reading it"""
+    return "file://" + workspace_path(folder).rstrip('/')
+
+
+def input_filepath(config: ProjectConfig) -> str:
+    """Path (or glob) the input sensor waits for"""
+    folder = workspace_path(config.datalab_in).rstrip('/')
+    return f"{folder}/{config.input_pattern}" if config.input_pattern else folder
+
+
+def task_queue(task: Task) -> Optional[str]:
+    """Queue a task is routed to, or None for the executor's default queue"""
+    if task.queue:
+        return task.queue
+    if task.gpu:
+        return GPU_QUEUE
+    if task.nas:
+        return NAS_QUEUE
+    return None
+
+
+def pod_resources(task: Task) -> Optional[Tuple[Dict[str, str], Dict[str, str]]]:
+    """(requests, limits) for the KubernetesExecutor pod, or None if the task has no resource hints"""
+    requests = {}
+    if task.cpu:
+        requests['cpu'] = task.cpu
+    if task.memory:
+        requests['memory'] = task.memory
+    limits = {'nvidia.com/gpu': str(task.gpu)} if task.gpu else {}
+    if not requests and not limits:
+        return None
+    return requests, limits
 
 
 class MetaYamlGenerator:
     """Generate meta.yaml configuration file"""
     
+    def __init__(self, templates: Optional[TemplateRegistry] = None):
+        """
+        Args:
+            templates: Template registry (defaults to the process-wide one)
+        """
+        self.templates = templates or get_registry()
+    
     def generate(self, config: ProjectConfig) -> str:
         """
         Generate meta.yaml content
@@ -19,108 +138,175 @@ class MetaYamlGenerator:
         Returns:
             YAML string
         """
-        lines = []
-        
-        # Core identifiers
-        folder_value = f"{config.nomprojet}/r_{config.coderobin}_{config.nomprojet}"
-        lines.append(f"folder: {folder_value}")
-        lines.append(f"stage: {config.stage}")
-        lines.append(f"ld_data: {config.lddata.upper()}")
-        lines.append(f"persoid: {config.persoid}")
-        
-        # Pools
-        if config.pools:
-            lines.append("pools:")
-            for pool in config.pools:
-                lines.append(f"  - {pool}")
-        
-        # Database
-        if config.use_vertica and config.silot:
-            lines.append(f"silot: {config.silot}")
-        
-        # Conda environment
-        if config.use_conda and config.condaenv:
-            lines.append(f"env_name: {config.condaenv}")
-        
-        # I/O Paths (absolute)
-        if config.use_input and config.datalab_in:
-            path = config.datalab_in if config.datalab_in.startswith('/') else f"/home/jovyan/workspaces/{config.datalab_in}"
-            lines.append(f"input_folder: {path}")
-        
-        if config.use_output and config.datalab_out:
-            path = config.datalab_out if config.datalab_out.startswith('/') else f"/home/jovyan/workspaces/{config.datalab_out}"
-            lines.append(f"output_folder: {path}")
-        
-        # Infrastructure flags
-        if config.use_nas:
-            lines.append("NAS: true")
-        
-        if config.use_gpu:
-            lines.append("GPU: true")
-        
-        return "\n".join(lines) + "\n"
+        return self.templates.get("meta.yaml.j2", config.stage).render(config=config)
 
 
 class TreatmentGenerator:
     """Generate treatment.py with task functions"""
     
-    def generate(self, pipeline: List[PipelineStep]) -> str:
+    def __init__(self, templates: Optional[TemplateRegistry] = None):
+        """
+        Args:
+            templates: Template registry (defaults to the process-wide one)
+        """
+        self.templates = templates or get_registry()
+    
+    def generate(
+        self,
+        pipeline: List[PipelineStep],
+        stage: str = "LIL",
+        lazy_imports: bool = False,
+        input_folder: Optional[str] = None,
+    ) -> str:
         """
         Generate treatment.py content
         
         Args:
             pipeline: List of pipeline steps with tasks
+            stage: Project stage, selects the template override
+            lazy_imports: Put each task's imports inside its function instead of at module level
+            input_folder: Project input folder, fingerprinted by the tasks with cache_result
             
         Returns:
             Python code string
         """
+        buffer = io.StringIO()
+        self.generate_to(pipeline, buffer, stage, lazy_imports, input_folder)
+        return buffer.getvalue()
+    
+    def generate_to(
+        self,
+        pipeline: List[PipelineStep],
+        stream: TextIO,
+        stage: str = "LIL",
+        lazy_imports: bool = False,
+        input_folder: Optional[str] = None,
+    ):
+        """
+        Write treatment.py content to a text stream
+        
+        Args:
+            pipeline: List of pipeline steps with tasks
+            stream: Writable text stream (file handle or StringIO)
+            stage: Project stage, selects the template override
+            lazy_imports: Put each task's imports inside its function instead of at module level
+            input_folder: Project input folder, fingerprinted by the tasks with cache_result
+        """
         # Collect unique imports
         all_imports = set()
+        if not lazy_imports:
+            for step in pipeline:
+                for task in step.tasks:
+                    # An external_python callable runs from its source alone: its imports stay inside
+                    if task.imports and task.type == 'python':
+                        for imp in task.imports.split('\n'):
+                            imp = imp.strip()
+                            if imp:
+                                all_imports.add(imp)
+        
+        tasks = []
         for step in pipeline:
             for task in step.tasks:
-                if task.imports:
-                    for imp in task.imports.split('\n'):
-                        imp = imp.strip()
-                        if imp:
-                            all_imports.add(imp)
-        
-        # Start with imports
-        content = ""
-        if all_imports:
-            content += "\n".join(sorted(all_imports)) + "\n\n"
-        
-        # Generate function definitions
-        for step in pipeline:
-            for task in step.tasks:
-                func_name = self._sanitize_name(task.name)
-                content += f"def {func_name}(**context):\n"
-                content += '    """\n'
-                content += f"    Task: {task.name}\n"
-                content += f"    Priority: {task.priority}\n"
-                content += f"    Pool Slots: {task.pool_slots}\n"
-                content += '    """\n'
-                
+                if task.type not in CALLABLE_TYPES:
+                    continue
                 # Indent code
                 if task.code.strip():
-                    for line in task.code.split('\n'):
-                        content += f"    {line}\n" if line else "\n"
+                    body = "\n".join(f"    {line}" if line else "" for line in task.code.split('\n'))
                 else:
-                    content += "    pass\n"
-                
-                content += "\n\n"
+                    body = "    pass"
+                local_imports = ""
+                if lazy_imports or task.type == 'external_python':
+                    local_imports = "\n".join(f"    {imp.strip()}" for imp in task.imports.split('\n') if imp.strip())
+                tasks.append(TreatmentRow(
+                    sanitize_name(task.name), task.name, task.priority, task.pool_slots, body, local_imports,
+                    self._cache_decorator(task, input_folder),
+                ))
         
-        return content
+        template = self.templates.get("treatment.py.j2", stage)
+        stream.writelines(template.generate(
+            imports=sorted(all_imports),
+            cache_import=CACHE_IMPORT if any(task.decorator for task in tasks) else "",
+            tasks=tasks,
+            lazy_imports=lazy_imports,
+            lazy_marker=LAZY_IMPORTS_MARKER,
+        ))
+    
+    @staticmethod
+    def _cache_decorator(task: Task, input_folder: Optional[str]) -> str:
+        """`@cached(...)` line of a task with cache_result, or "" """
+        if not task.cache_result:
+            return ""
+        arguments = []
+        if input_folder:
+            arguments.append(f"inputs={workspace_path(input_folder).rstrip('/')!r}")
+        if task.mapping is not None:
+            arguments.append(f"arguments=({task.mapping.argument!r},)")
+        return f"{CACHE_DECORATOR}({', '.join(arguments)})"
     
     @staticmethod
     def _sanitize_name(name: str) -> str:
         """Convert task name to valid Python identifier"""
-        import re
-        return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+        return sanitize_name(name)
+
+
+class ResultCacheGenerator:
+    """Generate src/_cache.py, the result cache decorator of the tasks with cache_result"""
+    
+    def __init__(self, templates: Optional[TemplateRegistry] = None):
+        """
+        Args:
+            templates: Template registry (defaults to the process-wide one)
+        """
+        self.templates = templates or get_registry()
+    
+    def generate(self, config: ProjectConfig) -> str:
+        """
+        Generate _cache.py content
+        
+        Args:
+            config: Validated project configuration
+            
+        Returns:
+            Python module
+        """
+        return self.templates.get("result_cache.py.j2", config.stage).render(config=config, max_mb=RESULT_CACHE_MB)
+
+
+class PipelineTestGenerator:
+    """Generate tests/test_pipeline.py, a pytest run of the pipeline through the local runner"""
+    
+    def __init__(self, templates: Optional[TemplateRegistry] = None):
+        """
+        Args:
+            templates: Template registry (defaults to the process-wide one)
+        """
+        self.templates = templates or get_registry()
+    
+    def generate(self, config: ProjectConfig) -> str:
+        """
+        Generate test_pipeline.py content
+        
+        Args:
+            config: Validated project configuration
+            
+        Returns:
+            Python test module
+        """
+        # Airflow task ids: config ids are renumbered when the runner reloads the project
+        task_ids = [sanitize_name(task.name) for step in config.pipeline for task in step.tasks]
+        return self.templates.get("test_pipeline.py.j2", config.stage).render(config=config, task_ids=task_ids)
 
 
 class DagGenerator:
     """Generate Airflow DAG file"""
     
+    def __init__(self, templates: Optional[TemplateRegistry] = None):
+        """
+        Args:
+            templates: Template registry (defaults to the process-wide one)
+        """
+        self.templates = templates or get_registry()
+    
     def generate(self, config: ProjectConfig) -> str:
         """
         Generate dag.py content
@@ -131,83 +317,141 @@ class DagGenerator:
         Returns:
             Python DAG code
         """
-        # Collect all task function names
-        all_task_names = []
-        for step in config.pipeline:
-            for task in step.tasks:
-                all_task_names.append(self._sanitize_name(task.name))
+        buffer = io.StringIO()
+        self.generate_to(config, buffer)
+        return buffer.getvalue()
+    
+    def generate_to(self, config: ProjectConfig, stream: TextIO):
+        """
+        Write dag.py content to a text stream
         
-        task_imports = f"from src.treatment import {', '.join(all_task_names)}" if all_task_names else ""
+        Args:
+            config: Project configuration
+            stream: Writable text stream (file handle or StringIO)
+        """
+        # Sanitize every task name once
+        step_names = [[sanitize_name(task.name) for task in step.tasks] for step in config.pipeline]
         
-        # Header
-        content = f"""from airflow import DAG
-from airflow.operators.dummy import DummyOperator
-from airflow.operators.python import PythonOperator
-from datetime import datetime
-{task_imports}
-
-# --- Configuration ---
-custom_env_name = "{config.condaenv if config.use_conda else 'airflow-env'}"
-schedule_interval = {f'"{config.cron}"' if config.cron else 'None'}
-
-default_args = {{
-    'owner': '{config.persoid}',
-    'start_date': datetime(2023, 1, 1),
-}}
-
-with DAG('dag_{config.nomprojet.replace('-', '_')}',
-         default_args=default_args,
-         schedule_interval=schedule_interval,
-         catchup=False) as dag:
-
-    start = DummyOperator(task_id='start')
-    end = DummyOperator(task_id='end')
-
-"""
+        default_pool = config.pools[0] if config.pools else 'default_pool'
+        if config.priority_mode == 'critical_path':
+            weights = critical_path_weights(config)
+            weight_rule = 'absolute'
+        else:
+            weights = {task.id: self._get_priority_weight(task.priority) for step in config.pipeline for task in step.tasks}
+            weight_rule = None
         
-        # Define tasks
-        for step in config.pipeline:
-            for task in step.tasks:
-                safe_name = self._sanitize_name(task.name)
-                task_pool = task.selected_pool or (config.pools[0] if config.pools else 'default_pool')
-                
-                content += f"    t_{safe_name} = PythonOperator(\n"
-                content += f"        task_id='{safe_name}',\n"
-                content += f"        python_callable={safe_name},\n"
-                content += f"        priority_weight={self._get_priority_weight(task.priority)},\n"
-                content += f"        pool='{task_pool}',\n"
-                content += f"        pool_slots={task.pool_slots},\n"
-                content += f"        dag=dag\n"
-                content += f"    )\n\n"
-        
-        # Define dependencies
-        content += "    # Pipeline Flow\n"
+        variables = {
+            task.id: f"t_{safe_name}" for step, names in zip(config.pipeline, step_names)
+            for task, safe_name in zip(step.tasks, names)
+        }
+        tasks = []
+        mapped_arguments = set()
+        for step, names in zip(config.pipeline, step_names):
+            for task, safe_name in zip(step.tasks, names):
+                row = OperatorRow(
+                    safe_name, weights[task.id], task.selected_pool or default_pool, task.pool_slots,
+                    operator=OPERATOR_CLASSES[task.type],
+                    command=repr(task.code) if task.type == 'bash' else None,
+                    queue=task_queue(task),
+                    execution_timeout=task.execution_timeout,
+                )
+                resources = pod_resources(task)
+                if resources is not None:
+                    row = row._replace(executor_config=f"_pod_resources({resources[0]!r}, {resources[1]!r})")
+                if task.mapping is not None:
+                    mapping = task.mapping
+                    if mapping.from_task:
+                        expand = f"op_kwargs={variables[mapping.from_task]}.output.map(_as_{mapping.argument})"
+                        mapped_arguments.add(mapping.argument)
+                    else:
+                        expand = f"op_kwargs={[{mapping.argument: value} for value in mapping.values]!r}"
+                    row = row._replace(expand=expand, max_active_tis_per_dag=mapping.max_active_tis_per_dag)
+                tasks.append(row)
         
+        callables = [
+            safe_name for step, names in zip(config.pipeline, step_names)
+            for task, safe_name in zip(step.tasks, names) if task.type in CALLABLE_TYPES
+        ]
+        schedule_datasets = list(config.schedule_datasets)
+        if config.schedule_on_input:
+            schedule_datasets.append(folder_dataset(config.datalab_in))
+        output_dataset = folder_dataset(config.datalab_out) if config.publish_output else None
+        head = INPUT_SENSOR if config.wait_for_input else "start"
+        
+        template = self.templates.get("dag.py.j2", config.stage)
+        stream.writelines(template.generate(
+            config=config,
+            task_names=callables,
+            tasks=tasks,
+            operators={row.operator for row in tasks},
+            uses_timedelta=config.wait_for_input or any(row.execution_timeout for row in tasks),
+            uses_pod_resources=any(row.executor_config for row in tasks),
+            weight_rule=weight_rule,
+            mapped_arguments=sorted(mapped_arguments),
+            schedule_datasets=[repr(uri) for uri in schedule_datasets],
+            output_dataset=repr(output_dataset) if output_dataset else None,
+            input_sensor=INPUT_SENSOR if config.wait_for_input else None,
+            input_filepath=repr(input_filepath(config)) if config.wait_for_input else None,
+            poke_interval=INPUT_POKE_INTERVAL,
+            flow=(["start >> %s" % INPUT_SENSOR] if config.wait_for_input else []) + self._flow_lines(config, step_names, head),
+        ))
+    
+    @staticmethod
+    def _flow_lines(config: ProjectConfig, step_names: List[List[str]], head: str = "start") -> List[str]:
+        """Dependency statements, without indentation, from the `head` node"""
         if not config.pipeline:
-            content += "    start >> end\n"
-        else:
-            previous_node = "start"
-            
-            for step in config.pipeline:
-                current_nodes = [f"t_{self._sanitize_name(t.name)}" for t in step.tasks]
-                
-                if len(current_nodes) == 1:
-                    content += f"    {previous_node} >> {current_nodes[0]}\n"
-                    previous_node = current_nodes[0]
-                else:
-                    # Parallel tasks
-                    content += f"    {previous_node} >> [{', '.join(current_nodes)}]\n"
-                    previous_node = f"[{', '.join(current_nodes)}]"
+            return [f"{head} >> end"]
+        if has_explicit_dependencies(config.pipeline):
+            return DagGenerator._edge_lines(config, step_names, head)
+        
+        lines = []
+        previous_node = head
+        for names in step_names:
+            current_nodes = [f"t_{name}" for name in names]
             
-            content += f"    {previous_node} >> end\n"
+            if len(current_nodes) == 1:
+                lines.append(f"{previous_node} >> {current_nodes[0]}")
+                previous_node = current_nodes[0]
+            else:
+                # Parallel tasks
+                group = f"[{', '.join(current_nodes)}]"
+                lines.append(f"{previous_node} >> {group}")
+                previous_node = group
+        
+        lines.append(f"{previous_node} >> end")
+        return lines
+    
+    @staticmethod
+    def _edge_lines(config: ProjectConfig, step_names: List[List[str]], head: str = "start") -> List[str]:
+        """One statement per task with its real upstreams, in topological order"""
+        node = {}
+        for step, names in zip(config.pipeline, step_names):
+            for task, safe_name in zip(step.tasks, names):
+                node[task.id] = f"t_{safe_name}"
         
-        return content
+        lines = []
+        dependencies = task_dependencies(config.pipeline)
+        downstream = downstream_map(dependencies)
+        for task_id in topological_order(dependencies):
+            upstream = [node[up] for up in dependencies[task_id]]
+            if not upstream:
+                lines.append(f"{head} >> {node[task_id]}")
+            elif len(upstream) == 1:
+                lines.append(f"{upstream[0]} >> {node[task_id]}")
+            else:
+                lines.append(f"[{', '.join(upstream)}] >> {node[task_id]}")
+        
+        sinks = [node[task_id] for task_id, down in downstream.items() if not down]
+        if len(sinks) == 1:
+            lines.append(f"{sinks[0]} >> end")
+        else:
+            lines.append(f"[{', '.join(sinks)}] >> end")
+        return lines
     
     @staticmethod
     def _sanitize_name(name: str) -> str:
         """Convert task name to valid Python identifier"""
-        import re
-        return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+        return sanitize_name(name)
     
     @staticmethod
     def _get_priority_weight(priority: str) -> int:
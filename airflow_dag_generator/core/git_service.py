@@ -2,9 +2,34 @@
 Git Service - Safe subprocess execution for Git commands
 """
 
-import subprocess
+import asyncio
+import logging
+import shlex
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .models import GitOperation
+from .metrics import GIT_SECONDS, TIMEOUTS
+from .repo_state import resolve_head
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+STREAM_LINE_LIMIT = 2 ** 20
+
+# Plan steps after which HEAD has to be read again
+_MOVES_HEAD = {'init', 'checkout', 'commit', 'pull'}
+
+
+def _observe(argv: List[str], outcome: str, started: float):
+    """Record one git subprocess: latency by subcommand and outcome (ok, failed, timeout, error)"""
+    subcommand = argv[1] if len(argv) > 1 else ""
+    GIT_SECONDS.labels(subcommand=subcommand, outcome=outcome).observe(time.perf_counter() - started)
+    if outcome == "timeout":
+        TIMEOUTS.labels(operation="git").inc()
+        logger.warning("git %s timed out", subcommand, extra={"fields": {"git_subcommand": subcommand}})
 
 
 class GitService:
@@ -15,75 +40,361 @@ class GitService:
         'branch', 'tag', 'remote', 'status', 'log'
     ]
     
-    def execute(self, command: str, cwd: str) -> Dict[str, any]:
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            timeout: Seconds before a running command is killed
+        """
+        self.timeout = timeout
+    
+    def validate(self, command: str, cwd: str) -> Tuple[Optional[List[str]], str]:
         """
-        Execute a Git command in the specified directory
+        Check a Git command against the allow-list and split it into argv
         
         Args:
             command: Git command string (e.g., "git add .")
             cwd: Working directory path
             
         Returns:
-            Dictionary with success status and output
+            Tuple of (argv, "") when valid, or (None, error message)
         """
         # Security: Validate command
         if not command.startswith('git '):
-            return {
-                "success": False,
-                "output": "Error: Only git commands are allowed"
-            }
+            return None, "Error: Only git commands are allowed"
         
         # Extract git subcommand
-        parts = command.split()
+        try:
+            parts = shlex.split(command)
+        except ValueError as e:
+            return None, f"Error: Invalid git command ({e})"
         if len(parts) < 2:
-            return {
-                "success": False,
-                "output": "Error: Invalid git command"
-            }
+            return None, "Error: Invalid git command"
         
         git_cmd = parts[1]
         if git_cmd not in self.ALLOWED_COMMANDS:
-            return {
-                "success": False,
-                "output": f"Error: Command '{git_cmd}' not allowed"
-            }
+            return None, f"Error: Command '{git_cmd}' not allowed"
         
         # Validate cwd
         cwd_path = Path(cwd)
         if not cwd_path.exists():
+            return None, f"Error: Directory '{cwd}' does not exist"
+        
+        return parts, ""
+    
+    async def execute(self, command: str, cwd: str) -> Dict[str, any]:
+        """
+        Execute a Git command in the specified directory without blocking the IOLoop
+        
+        Args:
+            command: Git command string (e.g., "git add .")
+            cwd: Working directory path
+            
+        Returns:
+            Dictionary with success status and output
+        """
+        parts, error = self.validate(command, cwd)
+        if parts is None:
             return {
                 "success": False,
-                "output": f"Error: Directory '{cwd}' does not exist"
+                "output": error
             }
         
-        # Execute command
+        code, output = await self._run(parts, cwd)
+        return {
+            "success": code == 0,
+            "output": output
+        }
+    
+    async def _run(self, argv: List[str], cwd: str) -> Tuple[Optional[int], str]:
+        """
+        Execute argv (no shell) and collect its output
+        
+        Returns:
+            Tuple of (exit code or None on error/timeout, combined output)
+        """
+        started = time.perf_counter()
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
+            process = await asyncio.create_subprocess_exec(
+                *argv,
                 cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=30  # 30 second timeout
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(), timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                _observe(argv, "timeout", started)
+                return None, f"Error: Command timed out after {self.timeout:g} seconds"
+            _observe(argv, "ok" if process.returncode == 0 else "failed", started)
             
             # Combine stdout and stderr for full output
-            output = result.stdout
-            if result.stderr:
-                output += "\n" + result.stderr
+            output = stdout.decode(errors="replace")
+            if stderr:
+                output += "\n" + stderr.decode(errors="replace")
             
-            return {
-                "success": result.returncode == 0,
-                "output": output.strip()
-            }
+            return process.returncode, output.strip()
             
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "output": "Error: Command timed out after 30 seconds"
+        except Exception as e:
+            _observe(argv, "error", started)
+            return None, f"Error: {str(e)}"
+    
+    async def stream(self, commands: List[str], cwd: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a command sequence, yielding output lines and exit codes as they happen
+        
+        The sequence stops at the first command that fails. Events are dictionaries
+        with an "event" key: "command", "output", "exit" and a final "done".
+        
+        Args:
+            commands: Git command strings, run in order
+            cwd: Working directory path
+            
+        Yields:
+            Event dictionaries
+        """
+        completed = 0
+        for index, command in enumerate(commands):
+            yield {"event": "command", "index": index, "command": command}
+            
+            parts, error = self.validate(command, cwd)
+            if parts is None:
+                yield {"event": "output", "index": index, "line": error}
+                yield {"event": "exit", "index": index, "code": None, "success": False}
+                break
+            
+            code = None
+            async for event in self._stream_one(index, parts, cwd):
+                if event["event"] == "exit":
+                    code = event["code"]
+                yield event
+            
+            if code != 0:
+                break
+            completed += 1
+        
+        yield {
+            "event": "done",
+            "success": completed == len(commands),
+            "completed": completed
+        }
+    
+    async def _stream_one(self, index: int, parts: List[str], cwd: str) -> AsyncIterator[Dict[str, Any]]:
+        """Run a single validated command, merging stderr into the line stream"""
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *parts,
+                cwd=cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=STREAM_LINE_LIMIT
+            )
+        except Exception as e:
+            _observe(parts, "error", started)
+            yield {"event": "output", "index": index, "line": f"Error: {str(e)}"}
+            yield {"event": "exit", "index": index, "code": None, "success": False}
+            return
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        # Inside a line longer than STREAM_LINE_LIMIT, whose head was already sent
+        skipping = False
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                try:
+                    raw = await asyncio.wait_for(process.stdout.readuntil(b"\n"), timeout=remaining)
+                except asyncio.IncompleteReadError as e:
+                    # Last line without a newline (empty at EOF)
+                    raw = e.partial
+                except asyncio.LimitOverrunError:
+                    chunk = await asyncio.wait_for(process.stdout.read(STREAM_LINE_LIMIT), timeout=remaining)
+                    if not skipping:
+                        line = chunk.decode(errors="replace")
+                        yield {"event": "output", "index": index, "line": f"{line} [truncated]"}
+                        skipping = True
+                    continue
+                if not raw:
+                    break
+                if skipping:
+                    # The end of the truncated line
+                    skipping = False
+                    continue
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                yield {"event": "output", "index": index, "line": line}
+            
+            code = await asyncio.wait_for(process.wait(), timeout=max(deadline - loop.time(), 0.1))
+            _observe(parts, "ok" if code == 0 else "failed", started)
+            yield {"event": "exit", "index": index, "code": code, "success": code == 0}
+        except asyncio.TimeoutError:
+            _observe(parts, "timeout", started)
+            yield {
+                "event": "output",
+                "index": index,
+                "line": f"Error: Command timed out after {self.timeout:g} seconds"
             }
+            yield {"event": "exit", "index": index, "code": None, "success": False}
+        finally:
+            # Also reached when the consumer goes away mid-stream
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    
+    async def run_plan(self, operations: List[Dict[str, Any]], cwd: str) -> Dict[str, Any]:
+        """
+        Run a structured deploy plan in one worker, rolling back local state on failure
+        
+        Operations are validated up front, the working directory is checked once
+        and every step runs as a direct git exec (no shell). If a step fails, the
+        local effects of the steps before it (staged files, commits, tags,
+        branches, remotes) are undone in reverse order. Pushed refs are not
+        reverted on the remote.
+        
+        Args:
+            operations: GitOperation dictionaries, run in order
+            cwd: Working directory path
+            
+        Returns:
+            Dictionary with overall success, per-step results and timings,
+            and the rollback actions that were applied
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        
+        try:
+            plan = [GitOperation(**op) for op in operations]
         except Exception as e:
+            return {"success": False, "error": str(e), "steps": [], "rolled_back": []}
+        
+        if not Path(cwd).is_dir():
             return {
                 "success": False,
-                "output": f"Error: {str(e)}"
+                "error": f"Error: Directory '{cwd}' does not exist",
+                "steps": [],
+                "rolled_back": []
             }
+        
+        steps = []
+        undo: List[List[str]] = []
+        success = True
+        # (branch, commit) read from .git files, again only after a step moves HEAD
+        head: Optional[Tuple[Optional[str], Optional[str]]] = None
+        index_saved = False
+        for index, operation in enumerate(plan):
+            step_started = loop.time()
+            if operation.op in ('checkout', 'commit') and head is None:
+                head = resolve_head(Path(cwd))
+            if operation.op == 'add' and not index_saved:
+                # Restore the index as it was before the plan, keeping what the user had staged
+                code, tree = await self._run(['git', 'write-tree'], cwd)
+                index_saved = code == 0
+                if index_saved:
+                    undo.append(['git', 'read-tree', tree])
+            code, output, step_undo = await self._run_operation(operation, cwd, head, index_saved)
+            steps.append({
+                "index": index,
+                "op": operation.op,
+                "success": code == 0,
+                "output": output,
+                "duration_ms": round((loop.time() - step_started) * 1000, 2)
+            })
+            if code != 0:
+                success = False
+                break
+            undo.extend(step_undo)
+            if operation.op in _MOVES_HEAD:
+                head = None
+        
+        rolled_back = []
+        if not success:
+            for argv in reversed(undo):
+                code, output = await self._run(argv, cwd)
+                rolled_back.append({
+                    "command": " ".join(argv),
+                    "success": code == 0,
+                    "output": output
+                })
+        
+        return {
+            "success": success,
+            "steps": steps,
+            "rolled_back": rolled_back,
+            "duration_ms": round((loop.time() - started) * 1000, 2)
+        }
+    
+    async def _run_operation(
+        self,
+        operation: GitOperation,
+        cwd: str,
+        head: Optional[Tuple[Optional[str], Optional[str]]] = None,
+        index_saved: bool = False,
+    ) -> Tuple[Optional[int], str, List[List[str]]]:
+        """
+        Run one plan step, returning (exit code, output, undo commands)
+        
+        Args:
+            operation: Plan step
+            cwd: Working directory path
+            head: (branch, commit) before the step, for checkout and commit
+            index_saved: Whether the plan restores the pre-plan index on rollback
+                (otherwise an add is undone by unstaging its paths)
+        """
+        op = operation.op
+        branch, sha = head or (None, None)
+        undo: List[List[str]] = []
+        
+        if op == 'init':
+            argv = ['git', 'init']
+        elif op == 'remote_add':
+            argv = ['git', 'remote', 'add', operation.name or 'origin', operation.url]
+            undo.append(['git', 'remote', 'remove', operation.name or 'origin'])
+        elif op == 'checkout':
+            # Where to return on rollback; unborn branches cannot be checked out again
+            previous = (branch if sha else "") if branch else (sha or "")
+            if operation.create:
+                argv = ['git', 'checkout', '-b', operation.branch]
+                if previous:
+                    undo.append(['git', 'branch', '-D', operation.branch])
+                    undo.append(['git', 'checkout', previous])
+            else:
+                argv = ['git', 'checkout', operation.branch]
+                if previous:
+                    undo.append(['git', 'checkout', previous])
+        elif op == 'add':
+            argv = ['git', 'add', '--', *operation.paths]
+            if not index_saved:
+                undo.append(['git', 'reset', '-q', '--', *operation.paths])
+        elif op == 'commit':
+            argv = ['git', 'commit', '-m', operation.message]
+            if sha:
+                undo.append(['git', 'reset', '--soft', sha])
+            else:
+                undo.append(['git', 'update-ref', '-d', 'HEAD'])
+        elif op == 'tag':
+            if operation.message:
+                argv = ['git', 'tag', '-a', operation.name, '-m', operation.message]
+            else:
+                argv = ['git', 'tag', operation.name]
+            undo.append(['git', 'tag', '-d', operation.name])
+        elif op == 'push':
+            argv = ['git', 'push']
+            if operation.set_upstream:
+                argv.append('-u')
+            argv.append(operation.remote)
+            if operation.ref:
+                argv.append(operation.ref)
+        elif op == 'pull':
+            argv = ['git', 'pull', operation.remote]
+            if operation.ref:
+                argv.append(operation.ref)
+        else:
+            argv = ['git', 'status', '--short', '--branch']
+        
+        code, output = await self._run(argv, cwd)
+        return code, output, undo
@@ -0,0 +1,110 @@
+"""
+Task Graph - Dependency resolution and topological validation for pipelines
+"""
+
+import heapq
+from typing import Dict, List, Sequence, Set
+
+
+class CycleError(ValueError):
+    """Raised when task dependencies form a cycle"""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Dependency cycle between tasks: {' -> '.join(cycle)}")
+
+
+def has_explicit_dependencies(pipeline: Sequence) -> bool:
+    """True if any task declares `depends_on` (otherwise the pipeline is a pure step chain)"""
+    return any(task.depends_on for step in pipeline for task in step.tasks)
+
+
+def task_dependencies(pipeline: Sequence) -> Dict[str, List[str]]:
+    """
+    Upstream task ids for every task, in pipeline order
+
+    A task's explicit `depends_on` wins. A task without one depends on every
+    task of the previous step, which is exactly the historical step-chain
+    behaviour; tasks of the first step have no upstream.
+
+    Args:
+        pipeline: List of PipelineStep
+
+    Returns:
+        Mapping task id -> list of upstream task ids
+    """
+    dependencies: Dict[str, List[str]] = {}
+    previous_ids: List[str] = []
+    for step in pipeline:
+        for task in step.tasks:
+            dependencies[task.id] = list(task.depends_on) if task.depends_on else list(previous_ids)
+        previous_ids = [task.id for task in step.tasks]
+    return dependencies
+
+
+def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """
+    Order task ids so that every task comes after its upstreams
+
+    Ties keep the input (pipeline) order, so a step chain comes back unchanged.
+
+    Raises:
+        CycleError: If the dependencies contain a cycle
+    """
+    remaining = {task_id: len(set(upstream)) for task_id, upstream in dependencies.items()}
+    downstream: Dict[str, List[str]] = {task_id: [] for task_id in dependencies}
+    for task_id, upstream in dependencies.items():
+        for up in set(upstream):
+            downstream[up].append(task_id)
+
+    position = {task_id: index for index, task_id in enumerate(dependencies)}
+    ready = [(position[task_id], task_id) for task_id, count in remaining.items() if count == 0]
+    heapq.heapify(ready)
+    order: List[str] = []
+    while ready:
+        _, task_id = heapq.heappop(ready)
+        order.append(task_id)
+        for down in downstream[task_id]:
+            remaining[down] -= 1
+            if remaining[down] == 0:
+                heapq.heappush(ready, (position[down], down))
+
+    if len(order) < len(dependencies):
+        raise CycleError(_find_cycle(dependencies, set(order)))
+    return order
+
+
+def _find_cycle(dependencies: Dict[str, List[str]], acyclic: set) -> List[str]:
+    """Walk upstream from any unresolved task until a node repeats"""
+    start = next(task_id for task_id in dependencies if task_id not in acyclic)
+    path: List[str] = []
+    seen: Dict[str, int] = {}
+    node = start
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = next(up for up in dependencies[node] if up not in acyclic)
+    cycle = path[seen[node]:]
+    # Report in execution direction: upstream -> downstream
+    return list(reversed(cycle)) + [cycle[-1]]
+
+
+def downstream_map(dependencies: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Invert an upstream mapping into task id -> downstream task ids"""
+    downstream: Dict[str, List[str]] = {task_id: [] for task_id in dependencies}
+    for task_id, upstream in dependencies.items():
+        for up in upstream:
+            downstream[up].append(task_id)
+    return downstream
+
+
+def ancestors(dependencies: Dict[str, List[str]], task_id: str) -> Set[str]:
+    """Every task id that must finish before task_id, directly or transitively"""
+    seen: Set[str] = set()
+    stack = list(dependencies[task_id])
+    while stack:
+        upstream = stack.pop()
+        if upstream not in seen:
+            seen.add(upstream)
+            stack.extend(dependencies[upstream])
+    return seen
@@ -0,0 +1,705 @@
+"""
+Project Loader - Rebuild the pipeline model from generated dag_*.py and treatment.py
+"""
+
+import ast
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .files import content_hash
+from .generator import (
+    CACHE_DECORATOR, CACHE_IMPORT, GPU_QUEUE, INPUT_SENSOR, LAZY_IMPORTS_MARKER, NAS_QUEUE, folder_dataset,
+)
+from .graph import CycleError, topological_order
+
+
+PRIORITY_BY_WEIGHT = {3: 'high', 2: 'mid', 1: 'low'}
+OPERATOR_TYPES = {
+    'PythonOperator': 'python',
+    'BashOperator': 'bash',
+    'DummyOperator': 'dummy',
+    'EmptyOperator': 'dummy',
+    'ExternalPythonOperator': 'external_python',
+}
+BOUNDARY_NODES = ('start', 'end')
+
+_DOC_FIELD = re.compile(r'^\s*(Task|Priority|Pool Slots):\s*(.*?)\s*$')
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_GIT_SECTION = re.compile(r'^\s*\[\s*remote\s+"([^"]+)"\s*\]\s*$')
+_GIT_URL = re.compile(r'^\s*url\s*=\s*(.+?)\s*$')
+
+
+class _ParseCache:
+    """Small thread-safe LRU of parse results keyed by content hash"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, source: str, parse: Callable[[str], Any]) -> Any:
+        key = f"{parse.__name__}:{content_hash(source.encode('utf-8'))}"
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        result = parse(source)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+_parse_cache = _ParseCache()
+
+
+def _literal(node: ast.AST, default: Any = None) -> Any:
+    """literal_eval a node, falling back to `default` for non-literals"""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return default
+
+
+def _keyword_value(node: ast.AST) -> Any:
+    """
+    Operator keyword value: literals as Python values, names as their id and
+    calls such as `timedelta(minutes=30)` as {"call", "args", **keywords}
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Call):
+        return {
+            "call": _call_name(node.func),
+            "args": [_literal(arg) for arg in node.args],
+            **{kw.arg: _literal(kw.value) for kw in node.keywords if kw.arg is not None},
+        }
+    return _literal(node)
+
+
+def _call_name(node: ast.AST) -> str:
+    """Name of the called object: `Foo(...)` and `mod.Foo(...)` both give 'Foo'"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ""
+
+
+def _unwrap_expand(call: ast.Call) -> Tuple[ast.Call, Optional[Dict[str, Any]]]:
+    """
+    Split a mapped operator `Op.partial(...).expand(op_kwargs=...)`
+
+    Returns:
+        (call to report as the operator, with the partial() keywords, mapping or
+        None). The mapping is {argument, values} for a static list or
+        {argument, from_var} for `t_x.output.map(_as_<argument>)`.
+    """
+    func = call.func
+    if not (isinstance(func, ast.Attribute) and func.attr == "expand" and isinstance(func.value, ast.Call)):
+        return call, None
+    partial = func.value
+    if not (isinstance(partial.func, ast.Attribute) and partial.func.attr == "partial"):
+        return call, None
+    operator = ast.Call(func=partial.func.value, args=partial.args, keywords=partial.keywords)
+
+    mapping: Dict[str, Any] = {"argument": "item"}
+    for kw in call.keywords:
+        if kw.arg != "op_kwargs":
+            continue
+        value = kw.value
+        if isinstance(value, ast.List):
+            rows = _literal(value) or []
+            if rows and isinstance(rows[0], dict) and len(rows[0]) == 1:
+                mapping["argument"] = next(iter(rows[0]))
+            mapping["values"] = [row.get(mapping["argument"]) for row in rows if isinstance(row, dict)]
+        elif (isinstance(value, ast.Call) and isinstance(value.func, ast.Attribute) and value.func.attr == "map"
+              and isinstance(value.func.value, ast.Attribute) and isinstance(value.func.value.value, ast.Name)):
+            mapping["from_var"] = value.func.value.value.id
+            if value.args and isinstance(value.args[0], ast.Name) and value.args[0].id.startswith("_as_"):
+                mapping["argument"] = value.args[0].id[len("_as_"):]
+    return operator, mapping
+
+
+def _flatten_shift(node: ast.AST) -> Optional[List[Tuple[List[str], bool]]]:
+    """
+    Flatten `a >> [b, c] >> d` into operand groups
+
+    Returns:
+        [(names, reversed)] where `reversed` marks a `<<` before that operand,
+        or None if the expression is not a dependency chain
+    """
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.RShift, ast.LShift)):
+        left = _flatten_shift(node.left)
+        right = _flatten_shift(node.right)
+        if left is None or right is None:
+            return None
+        first_names, _ = right[0]
+        return left + [(first_names, isinstance(node.op, ast.LShift))] + right[1:]
+    if isinstance(node, ast.Name):
+        return [([node.id], False)]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        names = [elt.id for elt in node.elts if isinstance(elt, ast.Name)]
+        return [(names, False)] if len(names) == len(node.elts) else None
+    return None
+
+
+def _statements(body: List[ast.stmt]):
+    """Yield statements, descending into `with`/`if` blocks but not into expressions"""
+    for node in body:
+        yield node
+        if isinstance(node, (ast.With, ast.If)):
+            yield from _statements(node.body)
+            yield from _statements(getattr(node, "orelse", []))
+
+
+def _dataset_uri(node: ast.AST) -> Optional[str]:
+    """URI of a `Dataset('<uri>')` call"""
+    if isinstance(node, ast.Call) and _call_name(node.func) == "Dataset" and node.args:
+        return _literal(node.args[0])
+    return None
+
+
+def _empty_dag_info() -> Dict[str, Any]:
+    return {
+        "cron": "", "env_name": "", "owner": "", "operators": {}, "edges": [],
+        "datasets": [], "output_dataset": None, "sensors": {},
+    }
+
+
+def parse_dag(source: str) -> Dict[str, Any]:
+    """
+    Extract schedule, operators and dependency edges from a generated DAG file
+
+    Returns:
+        Dictionary with cron, env_name, owner, operators (by variable name,
+        in definition order), edges as (upstream var, downstream var), the
+        schedule datasets, the output dataset and sensors (by variable name)
+    """
+    tree = ast.parse(source)
+    info = _empty_dag_info()
+
+    for node in _statements(tree.body):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            target = node.targets[0].id
+            if target == "schedule_interval":
+                info["cron"] = _literal(node.value) or ""
+            elif target == "schedule" and isinstance(node.value, ast.List):
+                info["datasets"] = [uri for uri in map(_dataset_uri, node.value.elts) if uri]
+            elif target == "output_dataset":
+                info["output_dataset"] = _dataset_uri(node.value)
+            elif target == "custom_env_name":
+                info["env_name"] = _literal(node.value) or ""
+            elif target == "default_args" and isinstance(node.value, ast.Dict):
+                for key, value in zip(node.value.keys, node.value.values):
+                    if key is not None and _literal(key) == "owner":
+                        info["owner"] = _literal(value) or ""
+            elif isinstance(node.value, ast.Call):
+                call, mapping = _unwrap_expand(node.value)
+                operator = _call_name(call.func)
+                if operator.endswith("Operator"):
+                    kwargs = {kw.arg: _keyword_value(kw.value) for kw in call.keywords if kw.arg is not None}
+                    if mapping is not None:
+                        kwargs["expand"] = mapping
+                    info["operators"][target] = {"operator": operator, **kwargs}
+                elif operator.endswith("Sensor"):
+                    kwargs = {kw.arg: _keyword_value(kw.value) for kw in call.keywords if kw.arg is not None}
+                    info["sensors"][target] = {"operator": operator, **kwargs}
+        elif isinstance(node, ast.Expr):
+            groups = _flatten_shift(node.value)
+            if groups is None or len(groups) < 2:
+                continue
+            for (upstream, _), (downstream, is_reversed) in zip(groups, groups[1:]):
+                for up in upstream:
+                    for down in downstream:
+                        info["edges"].append((down, up) if is_reversed else (up, down))
+
+    return info
+
+
+def _generated_chunks(lines: List[str]) -> List[Tuple[int, int]]:
+    """
+    Split treatment.py into top-level statements by indentation alone
+
+    Every code line the generator emits inside a function is indented, so any
+    non-blank line starting at column 0 (comments aside) opens a new statement,
+    except a `def` right after its decorator line. Consecutive non-function
+    statements (the import block) are kept together so they are parsed in one go.
+    """
+    starts = []
+    in_function = True
+    decorated = False
+    for i, line in enumerate(lines):
+        if not line or line[0].isspace() or line.startswith('#'):
+            continue
+        is_function = line.startswith(('def ', '@'))
+        if (is_function or in_function) and not (decorated and line.startswith('def ')):
+            starts.append(i)
+        in_function = is_function
+        decorated = line.startswith('@')
+    return list(zip(starts, starts[1:] + [len(lines)]))
+
+
+def _ast_chunks(source: str, lines: List[str]) -> List[Tuple[int, int]]:
+    """Split any valid module into top-level statements using a full parse"""
+    tree = ast.parse(source)
+    starts = [
+        min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+        for node in tree.body
+    ]
+    return list(zip(starts, starts[1:] + [len(lines)]))
+
+
+def _docstring_end(chunk: List[str]) -> int:
+    """Index of the first line after a `def` line's docstring (1 if there is none)"""
+    if len(chunk) < 2:
+        return 1
+    second = chunk[1].strip()
+    for quote in ('"""', "'''"):
+        if not second.startswith(quote):
+            continue
+        if second.count(quote) >= 2:
+            return 2
+        for j in range(2, len(chunk)):
+            if quote in chunk[j]:
+                return j + 1
+        raise SyntaxError("unterminated docstring")
+    return 1
+
+
+def _split_local_imports(code: str) -> Tuple[str, str]:
+    """(imports, code) for a lazy_imports body: the leading import block ends at the first blank line"""
+    head, _, rest = code.partition("\n\n")
+    if not head.strip():
+        return "", code
+    try:
+        statements = ast.parse(head).body
+    except SyntaxError:
+        return "", code
+    if not all(isinstance(node, (ast.Import, ast.ImportFrom)) for node in statements):
+        return "", code
+    return head, rest
+
+
+def _is_cache_decorator(line: str) -> bool:
+    """Whether a line is the generated result cache decorator"""
+    return line == CACHE_DECORATOR or line.startswith(CACHE_DECORATOR + "(")
+
+
+def _has_cache_decorator(node: ast.FunctionDef) -> bool:
+    """Whether a parsed function is decorated with the result cache decorator"""
+    for decorator in node.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        if isinstance(target, ast.Name) and target.id == CACHE_DECORATOR[1:]:
+            return True
+    return False
+
+
+def _function_entry(
+    node: ast.FunctionDef,
+    body: List[str],
+    lazy: bool = False,
+    cache_result: bool = False,
+) -> Dict[str, Any]:
+    """Task metadata from the docstring plus the de-indented body code (and local imports if lazy)"""
+    meta = {"task_name": node.name, "priority": "low", "pool_slots": 1, "cache_result": cache_result}
+    docstring = ast.get_docstring(node, clean=False)
+    for doc_line in (docstring or "").splitlines():
+        match = _DOC_FIELD.match(doc_line)
+        if not match:
+            continue
+        field, value = match.groups()
+        if field == "Task":
+            meta["task_name"] = value
+        elif field == "Priority":
+            meta["priority"] = value
+        elif field == "Pool Slots" and value.isdigit():
+            meta["pool_slots"] = int(value)
+
+    body = list(body)
+    while body and not body[-1].strip():
+        body.pop()
+    # The generator indents every non-empty code line by exactly 4 spaces
+    code = "\n".join(line[4:] if line.startswith("    ") else line.lstrip() for line in body)
+    local_imports = None
+    if lazy:
+        local_imports, code = _split_local_imports(code)
+    if code.strip() == "pass":
+        code = ""
+
+    # Identifiers in the body (a superset of its Name nodes, without parsing
+    # it); only used to attribute imports to tasks
+    entry = {**meta, "code": code, "names": set(_IDENTIFIER.findall(code))}
+    if local_imports is not None:
+        entry["imports"] = local_imports
+    return entry
+
+
+def parse_treatment(source: str) -> Dict[str, Any]:
+    """
+    Extract module-level imports and task functions from treatment.py
+
+    Function bodies are user code and are never needed as AST: for generated
+    files only imports and each function's `def` line and docstring are
+    parsed, which keeps large projects cheap. Files that do not follow the
+    generated layout fall back to a full parse for statement boundaries.
+
+    Returns:
+        Dictionary with imports (list of (source line, bound names)), lazy
+        (generated with lazy_imports) and functions by name, each with task
+        metadata, code and referenced names (plus its own imports if lazy)
+    """
+    lines = source.splitlines()
+    lazy = bool(lines) and lines[0] == LAZY_IMPORTS_MARKER
+    try:
+        return _parse_treatment_chunks(lines, _generated_chunks(lines), lazy)
+    except SyntaxError:
+        return _parse_treatment_chunks(lines, _ast_chunks(source, lines), lazy)
+
+
+def _parse_treatment_chunks(lines: List[str], chunks: List[Tuple[int, int]], lazy: bool = False) -> Dict[str, Any]:
+    imports: List[Tuple[str, Set[str]]] = []
+    functions: Dict[str, Dict[str, Any]] = {}
+
+    for start, end in chunks:
+        chunk = lines[start:end]
+        function = chunk
+        cache_result = len(chunk) > 1 and _is_cache_decorator(chunk[0])
+        if cache_result:
+            function = chunk[1:]
+        if function[0].startswith('def '):
+            try:
+                header_end = _docstring_end(function)
+                tree = ast.parse("\n".join(function[:header_end] + ["    pass"]))
+            except SyntaxError:
+                # Not the generated one-line `def` + docstring layout
+                tree = None
+            if tree is not None and len(tree.body) == 1 and isinstance(tree.body[0], ast.FunctionDef):
+                functions[tree.body[0].name] = _function_entry(tree.body[0], function[header_end:], lazy, cache_result)
+                continue
+
+        for node in ast.parse("\n".join(chunk)).body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                bound = set()
+                for alias in node.names:
+                    bound.add((alias.asname or alias.name).split('.')[0])
+                segment = chunk[node.lineno - 1:node.end_lineno]
+                segment[-1] = segment[-1][:node.end_col_offset]
+                segment[0] = segment[0][node.col_offset:]
+                import_line = "\n".join(segment)
+                # Provides the cache decorator, not a task dependency
+                if import_line != CACHE_IMPORT:
+                    imports.append((import_line, bound))
+            elif isinstance(node, ast.FunctionDef):
+                # Decorated or otherwise hand-written function
+                header_end = node.body[0].end_lineno if ast.get_docstring(node) is not None else node.lineno
+                functions[node.name] = _function_entry(node, chunk[header_end:], lazy, _has_cache_decorator(node))
+
+    return {"imports": imports, "lazy": lazy, "functions": functions}
+
+
+def read_git_remote(git_config: str, remote: str = "origin") -> str:
+    """URL of `remote` in a .git/config file's content, or "" """
+    in_section = False
+    for line in git_config.splitlines():
+        section = _GIT_SECTION.match(line)
+        if section:
+            in_section = section.group(1) == remote
+            continue
+        if line.strip().startswith('['):
+            in_section = False
+            continue
+        if in_section:
+            url = _GIT_URL.match(line)
+            if url:
+                return url.group(1)
+    return ""
+
+
+def _layers_from_edges(task_vars: List[str], edges: List[Tuple[str, str]]) -> Tuple[List[List[str]], Dict[str, List[str]]]:
+    """
+    Group operators into steps by longest path from `start`
+
+    Returns:
+        (steps as lists of operator variables, upstream operator variables per operator)
+    """
+    known = set(task_vars)
+    upstream: Dict[str, List[str]] = {var: [] for var in task_vars}
+    for up, down in edges:
+        if up in known and down in known and up not in upstream[down]:
+            upstream[down].append(up)
+
+    try:
+        order = topological_order(upstream)
+    except CycleError:
+        # Not a valid DAG file; keep definition order in a single step
+        return [list(task_vars)], {var: [] for var in task_vars}
+
+    depth: Dict[str, int] = {}
+    for var in order:
+        depth[var] = 1 + max((depth[up] for up in upstream[var]), default=-1)
+
+    steps: List[List[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for var in task_vars:
+        steps[depth[var]].append(var)
+    return steps, upstream
+
+
+def _task_mapping(op: Dict[str, Any], task_ids: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """TaskMapping dictionary of a mapped operator, or None"""
+    mapping = op.get("expand")
+    if mapping is None:
+        return None
+    return {
+        "argument": mapping["argument"],
+        "values": mapping.get("values", []),
+        "from_task": task_ids.get(mapping.get("from_var")),
+        "max_active_tis_per_dag": op.get("max_active_tis_per_dag"),
+    }
+
+
+def _resource_hints(op: Dict[str, Any], use_nas: bool) -> Dict[str, Any]:
+    """Task queue, cpu, memory, gpu, nas and execution_timeout fields from operator keywords"""
+    requests: Dict[str, Any] = {}
+    limits: Dict[str, Any] = {}
+    executor_config = op.get("executor_config")
+    if isinstance(executor_config, dict) and executor_config.get("call") == "_pod_resources":
+        args = executor_config["args"] + [None, None]
+        requests, limits = args[0] or {}, args[1] or {}
+    gpu = int(limits.get("nvidia.com/gpu", 0))
+
+    # A queue equal to the GPU/NAS default was not chosen explicitly
+    queue = op.get("queue") if isinstance(op.get("queue"), str) else None
+    nas = False
+    if gpu and queue == GPU_QUEUE:
+        queue = None
+    elif not gpu and use_nas and queue == NAS_QUEUE:
+        queue, nas = None, True
+
+    return {
+        "queue": queue,
+        "cpu": requests.get("cpu"),
+        "memory": requests.get("memory"),
+        "gpu": gpu,
+        "nas": nas,
+        "execution_timeout": _timedelta_minutes(op.get("execution_timeout")),
+    }
+
+
+def _timedelta_minutes(value: Any) -> Optional[int]:
+    """N of a parsed `timedelta(minutes=N)` keyword"""
+    return value.get("minutes") if isinstance(value, dict) and value.get("call") == "timedelta" else None
+
+
+def _data_triggers(dag: Dict[str, Any], meta_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Dataset schedule, output dataset and input sensor fields of the project config"""
+    input_folder = meta_data.get("input_folder")
+    input_dataset = folder_dataset(input_folder) if input_folder else None
+    sensor = dag["sensors"].get(INPUT_SENSOR)
+    pattern = ""
+    if sensor is not None and input_folder:
+        filepath = str(sensor.get("filepath") or "")
+        prefix = input_folder.rstrip('/') + '/'
+        pattern = filepath[len(prefix):] if filepath.startswith(prefix) else ""
+    return {
+        "schedule_datasets": [uri for uri in dag["datasets"] if uri != input_dataset],
+        "schedule_on_input": input_dataset is not None and input_dataset in dag["datasets"],
+        "publish_output": dag["output_dataset"] is not None,
+        "wait_for_input": sensor is not None,
+        "input_pattern": pattern,
+        "wait_timeout": (_timedelta_minutes(sensor.get("timeout")) if sensor else None) or 720,
+    }
+
+
+def build_pipeline(
+    dag: Dict[str, Any],
+    treatment: Dict[str, Any],
+    pools: List[str],
+    use_nas: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Rebuild PipelineStep/Task dictionaries from parsed DAG and treatment files
+
+    Args:
+        dag: Result of parse_dag
+        treatment: Result of parse_treatment
+        pools: Pools listed in meta.yaml (the first one is the generator's default)
+        use_nas: Whether the project mounts the NAS (NAS tasks are recognised by their queue)
+
+    Returns:
+        List of PipelineStep dictionaries
+    """
+    operators = dag["operators"]
+    task_vars = [var for var in operators if var not in BOUNDARY_NODES]
+    functions = treatment["functions"]
+    default_pool = pools[0] if pools else 'default_pool'
+
+    # Give each import to the tasks that use the names it binds
+    functions_by_name: Dict[str, List[str]] = {}
+    for func_name, func in functions.items():
+        for name in func["names"]:
+            functions_by_name.setdefault(name, []).append(func_name)
+    imports_by_function: Dict[str, List[str]] = {}
+    unused_imports = []
+    for import_line, bound in treatment["imports"]:
+        users = {func_name for name in bound for func_name in functions_by_name.get(name, ())}
+        if not users:
+            unused_imports.append(import_line)
+        for func_name in users:
+            imports_by_function.setdefault(func_name, []).append(import_line)
+
+    layers, upstream = _layers_from_edges(task_vars, dag["edges"])
+    task_ids = {}
+    for var in (var for layer in layers for var in layer):
+        task_ids[var] = f"t{len(task_ids) + 1}"
+
+    steps = []
+    previous_layer: Set[str] = set()
+    for step_index, step_vars in enumerate(layers, start=1):
+        tasks = []
+        for var in step_vars:
+            op = operators[var]
+            callable_name = op.get("python_callable") or op.get("task_id") or var[2:]
+            func = functions.get(callable_name, {})
+
+            code = func.get("code", "")
+            imports = imports_by_function.get(callable_name, [])
+            if "imports" in func:
+                imports = [func["imports"]] if func["imports"] else []
+            elif op["operator"] == "ExternalPythonOperator":
+                # Generated with its imports inside, whatever lazy_imports says
+                local_imports, code = _split_local_imports(code)
+                imports = [local_imports] if local_imports else []
+            if op["operator"] == "BashOperator":
+                code = op.get("bash_command") or ""
+            if task_ids[var] == "t1":
+                imports = unused_imports + imports
+
+            # Depending on exactly the previous step is the implicit default
+            depends_on = []
+            if upstream[var] and set(upstream[var]) != previous_layer:
+                depends_on = [task_ids[up] for up in upstream[var]]
+
+            pool = op.get("pool")
+            weight = op.get("priority_weight")
+            tasks.append({
+                "id": task_ids[var],
+                "name": func.get("task_name", op.get("task_id", callable_name)),
+                "imports": "\n".join(imports),
+                "code": code,
+                "priority": PRIORITY_BY_WEIGHT.get(weight, func.get("priority", "low")),
+                "pool_slots": op.get("pool_slots") or func.get("pool_slots", 1),
+                "type": OPERATOR_TYPES.get(op["operator"], "python"),
+                "selected_pool": pool if pool and pool != default_pool else None,
+                "depends_on": depends_on,
+                "mapping": _task_mapping(op, task_ids),
+                **_resource_hints(op, use_nas),
+                "cache_result": func.get("cache_result", False),
+            })
+        if tasks:
+            steps.append({"id": f"s{step_index}", "tasks": tasks})
+        previous_layer = set(step_vars)
+
+    if not steps:
+        # Nothing to recover (e.g. DAG file missing): start from a single empty task
+        steps.append({"id": "s1", "tasks": [{
+            "id": "t1",
+            "name": "extract_data",
+            "imports": "\n".join(unused_imports),
+            "code": "",
+            "priority": "low",
+            "pool_slots": 1,
+            "type": "python",
+            "selected_pool": None,
+            "depends_on": [],
+            "mapping": None,
+        }]})
+    return steps
+
+
+def _parse_source(source: Optional[str], parse: Callable[[str], Any], file_name: str,
+                  warnings: List[Dict[str, Any]]) -> Optional[Any]:
+    """Cached parse of a project file; None if it is missing or not valid Python (a warning is added)"""
+    if not source:
+        return None
+    try:
+        return _parse_cache.get_or_parse(source, parse)
+    except (SyntaxError, ValueError) as e:
+        line = getattr(e, "lineno", None) or 1
+        reason = e.msg if isinstance(e, SyntaxError) else str(e)
+        warnings.append({"file": file_name, "task": None, "code": "syntax_error", "line": line,
+                         "message": f"{file_name}, line {line}: {reason}. The project was loaded without it; "
+                                    f"saving regenerates the file from this configuration"})
+        return None
+
+
+def load_sources(
+    project_name: str,
+    meta_data: Dict[str, Any],
+    dag_source: Optional[str],
+    treatment_source: Optional[str],
+    git_config: Optional[str] = None,
+    prepare_tests: bool = False,
+) -> Dict[str, Any]:
+    """
+    Build the project config dictionary from file contents
+
+    `prepare_tests` says whether the project has a generated test harness.
+
+    Parsed ASTs are cached by content hash, so unchanged files are not re-parsed.
+    Missing DAG or treatment files leave the corresponding fields empty. A
+    file edited by hand into invalid Python is treated as missing, so the
+    project still opens from meta.yaml; the config then has `load_warnings`
+    ({file, task, code, message, line}, like the pre-flight warnings).
+    """
+    pools = meta_data.get("pools", []) or []
+    warnings: List[Dict[str, Any]] = []
+    dag = _parse_source(dag_source, parse_dag, f"dag_{project_name}.py", warnings) or _empty_dag_info()
+    treatment = _parse_source(treatment_source, parse_treatment, "src/treatment.py", warnings) or {
+        "imports": [], "lazy": False, "functions": {}
+    }
+    folder = meta_data.get("folder", "")
+
+    config = {
+        "nomprojet": project_name,
+        "coderobin": folder.split("_")[1][:4] if "_" in folder else "unkn",
+        "git_remote": read_git_remote(git_config) if git_config else "",
+        "persoid": meta_data.get("persoid", dag["owner"] or "jovyan"),
+        "lddata": str(meta_data.get("ld_data", "")).lower(),
+        "use_conda": "env_name" in meta_data,
+        "condaenv": meta_data.get("env_name", "airflow-ml-3.11"),
+        "stage": meta_data.get("stage", "LIL"),
+        "use_vertica": "silot" in meta_data,
+        "silot": meta_data.get("silot", "BANK"),
+        "use_input": "input_folder" in meta_data,
+        "datalab_in": meta_data.get("input_folder", ""),
+        "use_output": "output_folder" in meta_data,
+        "datalab_out": meta_data.get("output_folder", ""),
+        "use_nas": meta_data.get("NAS", False),
+        "use_gpu": meta_data.get("GPU", False),
+        "cron": dag["cron"],
+        **_data_triggers(dag, meta_data),
+        "priority_mode": "critical_path" if any(
+            op.get("weight_rule") == "absolute" for op in dag["operators"].values()
+        ) else "manual",
+        "bundle_base": "",
+        "prepare_tests": prepare_tests,
+        "lazy_imports": treatment.get("lazy", False),
+        "pipeline": build_pipeline(dag, treatment, pools, bool(meta_data.get("NAS", False))),
+        "pools": pools,
+    }
+    if warnings:
+        config["load_warnings"] = warnings
+    return config
@@ -0,0 +1,67 @@
+"""
+Structured Logging - Request ids on log records and optional JSON output
+"""
+
+import json
+import logging
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+LOGGER_NAME = "airflow_dag_generator"
+
+# Set by StudioHandler.prepare; WorkerPool copies the context into its threads
+request_id: ContextVar[str] = ContextVar("airflow_studio_request_id", default="-")
+request_user: ContextVar[str] = ContextVar("airflow_studio_request_user", default="-")
+
+
+class RequestContextFilter(logging.Filter):
+    """Add the current request id and user to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        record.user = request_user.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={"fields": {...}}` adds keys to it"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", request_id.get()),
+            "user": getattr(record, "user", request_user.get()),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure(settings: Optional[Dict[str, Any]] = None):
+    """
+    Set up the extension's logger from the `airflow_studio` tornado settings, e.g.
+    c.ServerApp.tornado_settings = {"airflow_studio": {"json_logs": True, "log_level": "DEBUG"}}
+
+    Without `json_logs`, records propagate to the Jupyter Server log as before.
+    """
+    settings = settings or {}
+    logger = logging.getLogger(LOGGER_NAME)
+    if "log_level" in settings:
+        logger.setLevel(str(settings["log_level"]).upper())
+    for handler in [h for h in logger.handlers if isinstance(h.formatter, JsonFormatter)]:
+        logger.removeHandler(handler)
+    if settings.get("json_logs"):
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        handler.addFilter(RequestContextFilter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    else:
+        logger.propagate = True
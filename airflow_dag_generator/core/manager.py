@@ -2,25 +2,73 @@
 Project Manager - High-level orchestration for project creation and loading
 """
 
+import hashlib
 import json
+import logging
 import yaml
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from .models import ProjectConfig
-from .generator import MetaYamlGenerator, DagGenerator, TreatmentGenerator
+from .generator import MetaYamlGenerator, DagGenerator, PipelineTestGenerator, ResultCacheGenerator, TreatmentGenerator
+from .cache import ProjectCache, stat_signature
+from .loader import load_sources
+from .files import CREATED, WRITTEN, SKIPPED, write_if_changed
+from .preflight import PreflightError, run_preflight
+from .validation import document_diff
+from .metrics import BYTES_WRITTEN, FILES, GENERATOR_SECONDS, PROJECT_SECONDS, timed
+
+
+logger = logging.getLogger(__name__)
+
+# Pytest harness written when prepare_tests is set
+TEST_HARNESS = "tests/test_pipeline.py"
+# Result cache decorator written when a task sets cache_result
+RESULT_CACHE_MODULE = "src/_cache.py"
+
+
+def config_etag(config: Dict[str, Any]) -> str:
+    """Strong ETag of a loaded project configuration: hash of its canonical JSON"""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return '"%s"' % hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+
+def etag_matches(header: str, etag: Optional[str]) -> bool:
+    """Whether an If-Match header value accepts the current ETag (None: no project)"""
+    if etag is None:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return "*" in candidates or etag in candidates
+
+
+def _caches_results(config: ProjectConfig) -> bool:
+    """Whether any task uses the result cache decorator"""
+    return any(task.cache_result for step in config.pipeline for task in step.tasks)
+
+
+class ConflictError(Exception):
+    """Raised by save_project when the project changed since the client loaded it"""
+    
+    def __init__(self, project_name: str, etag: Optional[str], diff: List[Dict[str, Any]]):
+        self.etag = etag
+        self.diff = diff
+        if etag is None:
+            super().__init__(f"Project '{project_name}' no longer exists")
+        else:
+            super().__init__(f"Project '{project_name}' was changed since it was loaded ({len(diff)} difference(s))")
 
 
 class ProjectManager:
     """Manages project lifecycle: create, load, save"""
     
-    def __init__(self, base_path: Path = None):
+    def __init__(self, base_path: Path = None, cache: Optional[ProjectCache] = None):
         """
         Args:
             base_path: Base directory for projects (defaults to ~/workspaces)
+            cache: Shared cache of loaded project configs (no caching if None)
         """
         self.base_path = base_path or Path.home() / "workspaces"
-        self.base_path.mkdir(parents=True, exist_ok=True)
+        self.cache = cache
     
     def get_project_path(self, project_name: str) -> Path:
         """Get absolute path to project directory"""
@@ -28,129 +76,236 @@ class ProjectManager:
     
     def load_project(self, project_name: str) -> Dict[str, Any]:
         """
-        Load existing project configuration from meta.yaml
+        Load existing project configuration from meta.yaml, the DAG file and treatment.py
         
         Args:
             project_name: Name of the project folder
             
         Returns:
-            ProjectConfig as dictionary
+            ProjectConfig as dictionary (shared with the cache: do not mutate)
             
         Raises:
             FileNotFoundError: If project doesn't exist
         """
+        with timed(PROJECT_SECONDS, operation="load"):
+            return self._load_project(project_name)
+    
+    def _load_project(self, project_name: str) -> Dict[str, Any]:
+        """load_project without the timing"""
         project_path = self.get_project_path(project_name)
-        meta_file = project_path / "meta.yaml"
+        source_files = self._source_files(project_path, project_name)
+        
+        if self.cache is not None:
+            config = self.cache.get(project_path, source_files)
+            if config is not None:
+                return config
         
-        if not meta_file.exists():
+        # Stat before reading: a write in between then invalidates the entry
+        signature = stat_signature(source_files) if self.cache is not None else None
+        meta_file, dag_file, treatment_file, git_config_file, test_file = source_files
+        try:
+            with open(meta_file, 'r') as f:
+                meta_data = yaml.safe_load(f)
+        except FileNotFoundError:
             raise FileNotFoundError(f"Project '{project_name}' not found at {project_path}")
         
-        with open(meta_file, 'r') as f:
-            meta_data = yaml.safe_load(f)
+        config = load_sources(
+            project_name,
+            meta_data or {},
+            self._read_optional(dag_file),
+            self._read_optional(treatment_file),
+            self._read_optional(git_config_file),
+            prepare_tests=test_file.is_file(),
+        )
+        for warning in config.get("load_warnings", ()):
+            logger.warning("Project %s: %s", project_name, warning["message"])
+        if self.cache is not None:
+            self.cache.put(project_path, source_files, config, signature)
+        return config
+    
+    @staticmethod
+    def _source_files(project_path: Path, project_name: str) -> List[Path]:
+        """Files load_project reads, in a fixed order (also the cache validation set)"""
+        return [
+            project_path / "meta.yaml",
+            project_path / f"dag_{project_name}.py",
+            project_path / "src" / "treatment.py",
+            project_path / ".git" / "config",
+            project_path / TEST_HARNESS,
+        ]
+    
+    @staticmethod
+    def _read_optional(path: Path) -> Optional[str]:
+        """File content, or None if it does not exist"""
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def project_etag(self, project_name: str) -> Optional[str]:
+        """ETag of the project as load_project returns it, or None if it does not exist"""
+        try:
+            return config_etag(self._load_project(project_name))
+        except FileNotFoundError:
+            return None
+    
+    def _check_version(self, project_name: str, if_match: str, config: ProjectConfig):
+        """Raise ConflictError, with the changes the save would overwrite, unless if_match is current"""
+        try:
+            current = self._load_project(project_name)
+        except FileNotFoundError:
+            raise ConflictError(project_name, None, [])
+        etag = config_etag(current)
+        if not etag_matches(if_match, etag):
+            logger.info("Refused stale save of project %s", project_name)
+            # Diff the validated config so fields the client left out compare as their defaults
+            raise ConflictError(project_name, etag, document_diff(current, config.dict()))
+    
+    def render_project(self, config: ProjectConfig) -> Dict[str, str]:
+        """
+        Generate every project file in memory
         
-        # Reconstruct ProjectConfig from meta.yaml
-        # This is a simplified loader; in production, you'd parse the DAG file too
-        config = {
-            "nomprojet": project_name,
-            "coderobin": meta_data.get("folder", "").split("_")[1][:4] if "_" in meta_data.get("folder", "") else "unkn",
-            "git_remote": "",  # Not stored in meta.yaml
-            "persoid": meta_data.get("persoid", "jovyan"),
-            "lddata": meta_data.get("ld_data", "").lower(),
-            "use_conda": "env_name" in meta_data,
-            "condaenv": meta_data.get("env_name", "airflow-ml-3.11"),
-            "stage": meta_data.get("stage", "LIL"),
-            "use_vertica": "silot" in meta_data,
-            "silot": meta_data.get("silot", "BANK"),
-            "use_input": "input_folder" in meta_data,
-            "datalab_in": meta_data.get("input_folder", ""),
-            "use_output": "output_folder" in meta_data,
-            "datalab_out": meta_data.get("output_folder", ""),
-            "use_nas": meta_data.get("NAS", False),
-            "use_gpu": meta_data.get("GPU", False),
-            "cron": "",  # Would need to parse from dag.py
-            "bundle_base": "",
-            "prepare_tests": False,
-            "pipeline": [
-                {
-                    "id": "s1",
-                    "tasks": [
-                        {
-                            "id": "t1",
-                            "name": "extract_data",
-                            "imports": "",
-                            "code": "# Loaded from treatment.py",
-                            "priority": "low",
-                            "pool_slots": 1,
-                            "type": "python"
-                        }
-                    ]
-                }
-            ],
-            "pools": meta_data.get("pools", [])
+        Args:
+            config: Validated project configuration
+            
+        Returns:
+            Mapping of path relative to the project folder -> file content
+        """
+        readme = f"""# {config.nomprojet}
+
+Generated by Airflow Studio
+
+## Project Info
+- Owner: {config.persoid}
+- Stage: {config.stage}
+- LD Data: {config.lddata}
+
+## Deployment
+Follow the GitOps workflow in the Deployment Cockpit.
+"""
+        with timed(GENERATOR_SECONDS, generator="meta"):
+            meta = MetaYamlGenerator().generate(config)
+        with timed(GENERATOR_SECONDS, generator="dag"):
+            dag = DagGenerator().generate(config)
+        with timed(GENERATOR_SECONDS, generator="treatment"):
+            treatment = TreatmentGenerator().generate(
+                config.pipeline, config.stage, config.lazy_imports, config.datalab_in if config.use_input else None
+            )
+        rendered = {
+            "meta.yaml": meta,
+            f"dag_{config.nomprojet}.py": dag,
+            "src/treatment.py": treatment,
+            "src/__init__.py": "",
+            "README.md": readme,
         }
-        
-        return config
+        if config.prepare_tests:
+            rendered[TEST_HARNESS] = PipelineTestGenerator().generate(config)
+        if _caches_results(config):
+            rendered[RESULT_CACHE_MODULE] = ResultCacheGenerator().generate(config)
+        return rendered
     
-    def save_project(self, config_dict: Dict[str, Any]) -> Dict[str, str]:
+    def save_project(self, config_dict: Dict[str, Any], if_match: Optional[str] = None) -> Dict[str, Any]:
         """
         Create or update a project with full folder structure
         
+        Only files whose content changed are rewritten (atomically), so
+        unchanged DAG files keep their mtime and are not re-parsed by Airflow.
+        
         Args:
             config_dict: Project configuration dictionary
+            if_match: ETag(s) the caller loaded the project at (If-Match header
+                syntax); the save is refused if the project on disk differs
             
         Returns:
-            Status dictionary with path
+            Status dictionary with path, the files created, written, skipped
+            or removed, and pre-flight warnings
+            
+        Raises:
+            ConflictError: If `if_match` does not match the project on disk (nothing is written)
+            PreflightError: If the generated files would fail to import (nothing is written)
         """
+        with timed(PROJECT_SECONDS, operation="save"):
+            return self._save_project(config_dict, if_match)
+    
+    def _save_project(self, config_dict: Dict[str, Any], if_match: Optional[str] = None) -> Dict[str, Any]:
+        """save_project without the timing"""
         # Validate with Pydantic
         config = ProjectConfig(**config_dict)
         
-        # Create project structure
         project_path = self.get_project_path(config.nomprojet)
+        if if_match is not None:
+            self._check_version(config.nomprojet, if_match, config)
+        rendered = self.render_project(config)
+        with timed(PROJECT_SECONDS, operation="preflight"):
+            report = run_preflight(config, rendered, project_path)
+        if report["errors"]:
+            logger.info("Pre-flight rejected project %s: %d error(s)", config.nomprojet, len(report["errors"]))
+            raise PreflightError(report["errors"])
+        
+        # Create project structure
+        is_new = not project_path.exists()
         project_path.mkdir(parents=True, exist_ok=True)
         
         # Create subdirectories
         (project_path / "src").mkdir(exist_ok=True)
         (project_path / "tests").mkdir(exist_ok=True)
         
-        # Generate meta.yaml
-        meta_generator = MetaYamlGenerator()
-        meta_content = meta_generator.generate(config)
-        with open(project_path / "meta.yaml", 'w') as f:
-            f.write(meta_content)
-        
-        # Generate dag.py
-        dag_generator = DagGenerator()
-        dag_content = dag_generator.generate(config)
-        with open(project_path / f"dag_{config.nomprojet}.py", 'w') as f:
-            f.write(dag_content)
+        files = {CREATED: [], WRITTEN: [], SKIPPED: []}
+        written_bytes = 0
+        for relative_path, content in rendered.items():
+            outcome = write_if_changed(project_path / relative_path, content)
+            files[outcome].append(relative_path)
+            FILES.labels(outcome=outcome).inc()
+            if outcome != SKIPPED:
+                written_bytes += len(content.encode('utf-8'))
+        BYTES_WRITTEN.inc(written_bytes)
         
-        # Generate treatment.py
-        treatment_generator = TreatmentGenerator()
-        treatment_content = treatment_generator.generate(config.pipeline)
-        with open(project_path / "src" / "treatment.py", 'w') as f:
-            f.write(treatment_content)
+        # prepare_tests or cache_result was turned off: drop the generated
+        # module unless someone edited it
+        removed = []
+        test_file = project_path / TEST_HARNESS
+        if not config.prepare_tests and test_file.is_file():
+            if self._read_optional(test_file) == PipelineTestGenerator().generate(config):
+                test_file.unlink()
+                removed.append(TEST_HARNESS)
+        cache_module = project_path / RESULT_CACHE_MODULE
+        if not _caches_results(config) and cache_module.is_file():
+            if self._read_optional(cache_module) == ResultCacheGenerator().generate(config):
+                cache_module.unlink()
+                removed.append(RESULT_CACHE_MODULE)
         
-        # Create __init__.py
-        with open(project_path / "src" / "__init__.py", 'w') as f:
-            f.write("")
+        # Write through so the next load does not re-read the generated files
+        if self.cache is not None:
+            source_files = self._source_files(project_path, config.nomprojet)
+            self.cache.put(
+                project_path,
+                source_files,
+                load_sources(
+                    config.nomprojet,
+                    yaml.safe_load(rendered["meta.yaml"]) or {},
+                    rendered[f"dag_{config.nomprojet}.py"],
+                    rendered["src/treatment.py"],
+                    self._read_optional(source_files[3]),
+                    prepare_tests=source_files[4].is_file(),
+                )
+            )
         
-        # Create README
-        readme = f"""# {config.nomprojet}
-
-Generated by Airflow Studio
-
-## Project Info
-- Owner: {config.persoid}
-- Stage: {config.stage}
-- LD Data: {config.lddata}
-
-## Deployment
-Follow the GitOps workflow in the Deployment Cockpit.
-"""
-        with open(project_path / "README.md", 'w') as f:
-            f.write(readme)
+        if is_new:
+            status = "created"
+        elif files[CREATED] or files[WRITTEN] or removed:
+            status = "updated"
+        else:
+            status = "unchanged"
+        logger.info(
+            "Saved project %s: %s, %d file(s) written, %d bytes",
+            config.nomprojet, status, len(files[CREATED]) + len(files[WRITTEN]), written_bytes,
+            extra={"fields": {"project": config.nomprojet, "status": status, "bytes_written": written_bytes}}
+        )
         
         return {
-            "status": "created",
-            "path": str(project_path)
+            "status": status,
+            "path": str(project_path),
+            "files": {**files, "removed": removed},
+            "warnings": report["warnings"],
         }
@@ -0,0 +1,131 @@
+"""
+Metrics - Prometheus instrumentation for the extension, in a registry of its own
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+    from prometheus_client import CONTENT_TYPE_LATEST
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # optional dependency
+    CollectorRegistry = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Jupyter Server already registers its own metrics in the default registry
+REGISTRY = CollectorRegistry(auto_describe=True) if CollectorRegistry is not None else None
+
+# Requests and git commands range from a cached GET (~1 ms) to a push (tens of seconds)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_GENERATOR_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class _NoopMetric:
+    """Stands in for every metric when prometheus_client is not installed"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+
+if REGISTRY is not None:
+    REQUEST_SECONDS = Histogram(
+        "airflow_studio_request_seconds", "API request latency",
+        ["handler", "method", "status"], buckets=_LATENCY_BUCKETS, registry=REGISTRY
+    )
+    USER_REQUEST_SECONDS = Counter(
+        "airflow_studio_user_request_seconds", "Time spent serving each user's API requests",
+        ["user", "handler"], registry=REGISTRY
+    )
+    GIT_SECONDS = Histogram(
+        "airflow_studio_git_seconds", "Git subprocess latency",
+        ["subcommand", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY
+    )
+    PROJECT_SECONDS = Histogram(
+        "airflow_studio_project_seconds", "ProjectManager operation latency",
+        ["operation"], buckets=_LATENCY_BUCKETS, registry=REGISTRY
+    )
+    GENERATOR_SECONDS = Histogram(
+        "airflow_studio_generator_seconds", "Time to render one generated file",
+        ["generator"], buckets=_GENERATOR_BUCKETS, registry=REGISTRY
+    )
+    FILES = Counter(
+        "airflow_studio_files", "Generated files by write outcome",
+        ["outcome"], registry=REGISTRY
+    )
+    BYTES_WRITTEN = Counter(
+        "airflow_studio_file_written_bytes", "Bytes of generated files written to disk", registry=REGISTRY
+    )
+    TIMEOUTS = Counter(
+        "airflow_studio_timeouts", "Subprocesses killed after their timeout",
+        ["operation"], registry=REGISTRY
+    )
+    ERRORS = Counter(
+        "airflow_studio_errors", "Requests that failed with an unexpected exception",
+        ["handler", "exception"], registry=REGISTRY
+    )
+else:
+    REQUEST_SECONDS = USER_REQUEST_SECONDS = GIT_SECONDS = PROJECT_SECONDS = GENERATOR_SECONDS = _NoopMetric()
+    FILES = BYTES_WRITTEN = TIMEOUTS = ERRORS = _NoopMetric()
+
+
+@contextmanager
+def timed(histogram: Any, **labels) -> Iterator[None]:
+    """Observe the duration of the block, whether it succeeds or raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+
+class _CacheCollector:
+    """Reads hit/miss counters of in-process caches at scrape time"""
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def add(self, name: str, stats: Callable[[], Dict[str, Any]]):
+        self._sources[name] = stats
+
+    def collect(self):
+        hits = CounterMetricFamily("airflow_studio_cache_hits", "Cache lookups answered from the cache", labels=["cache"])
+        misses = CounterMetricFamily("airflow_studio_cache_misses", "Cache lookups that had to compute", labels=["cache"])
+        size = GaugeMetricFamily("airflow_studio_cache_entries", "Entries currently cached", labels=["cache"])
+        for name, stats in list(self._sources.items()):
+            values = stats()
+            hits.add_metric([name], values.get("hits", 0))
+            misses.add_metric([name], values.get("misses", 0))
+            size.add_metric([name], values.get("size", 0))
+        return [hits, misses, size]
+
+
+_caches = _CacheCollector()
+if REGISTRY is not None:
+    REGISTRY.register(_caches)
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]):
+    """
+    Export a cache's counters
+
+    Args:
+        name: Value of the `cache` label
+        stats: Callable returning at least hits, misses and size
+    """
+    _caches.add(name, stats)
+
+
+def render() -> Optional[bytes]:
+    """Every metric in the Prometheus text format, or None without prometheus_client"""
+    if REGISTRY is None:
+        return None
+    return generate_latest(REGISTRY)
@@ -2,8 +2,55 @@
 Pydantic Models for strict validation of project configurations
 """
 
-from typing import List, Optional, Literal
-from pydantic import BaseModel, Field, validator
+import keyword
+import re
+from typing import Any, List, Optional, Literal
+from pydantic import BaseModel, Field, validator, root_validator
+
+from .graph import ancestors, task_dependencies, topological_order
+from .cron import cron_error
+
+
+# Task types generated as a Python callable in src/treatment.py
+CALLABLE_TYPES = ('python', 'external_python')
+
+# Kubernetes resource quantities
+_CPU_QUANTITY = re.compile(r'^\d+(\.\d+)?m?$')
+_MEMORY_QUANTITY = re.compile(r'^\d+(\.\d+)?(Ki|Mi|Gi|Ti|k|M|G|T)?$')
+_QUEUE_NAME = re.compile(r'^[A-Za-z0-9_.-]+$')
+# Airflow Dataset URIs: printable ASCII without spaces ('airflow' is a reserved scheme)
+_DATASET_URI = re.compile(r'^[\x21-\x7e]+$')
+
+
+def safe_project_name(name: str) -> str:
+    """Folder name a project is saved under"""
+    return name.replace(' ', '_').lower()
+
+
+class TaskMapping(BaseModel):
+    """Dynamic task mapping: one operator fanned out over values at run time (`.partial().expand()`)"""
+    # Keyword each value is passed under (context['<argument>'] in the task code)
+    argument: str = "item"
+    # Map over a static list...
+    values: List[Any] = Field(default_factory=list)
+    # ...or over the list returned by an upstream task (its XCom)
+    from_task: Optional[str] = None
+    # Mapped instances allowed to run at once across all runs; None means unlimited
+    max_active_tis_per_dag: Optional[int] = Field(default=None, ge=1)
+    
+    @validator('argument')
+    def argument_identifier(cls, v):
+        """The argument becomes a keyword of the callable"""
+        if not v.isidentifier() or keyword.iskeyword(v):
+            raise ValueError(f"Mapping argument '{v}' is not a valid Python name")
+        return v
+    
+    @root_validator(skip_on_failure=True)
+    def single_source(cls, values):
+        """Map over either static values or an upstream XCom, not both"""
+        if bool(values.get('values')) == bool(values.get('from_task')):
+            raise ValueError("Task mapping needs either a non-empty 'values' list or 'from_task', not both")
+        return values
 
 
 class Task(BaseModel):
@@ -14,8 +61,59 @@ class Task(BaseModel):
     code: str = "# Add your logic here..."
     priority: Literal['high', 'mid', 'low'] = 'low'
     pool_slots: int = Field(default=1, ge=1, le=5)
-    type: Literal['python', 'bash', 'dummy'] = 'python'
+    # 'bash' runs `code` as a shell command, 'dummy' is an EmptyOperator and
+    # 'external_python' runs the callable in the project's conda env
+    type: Literal['python', 'bash', 'dummy', 'external_python'] = 'python'
     selected_pool: Optional[str] = None
+    # Upstream task ids; empty means "every task of the previous step"
+    depends_on: List[str] = Field(default_factory=list)
+    # Fan out into one task instance per value instead of a single instance
+    mapping: Optional[TaskMapping] = None
+    
+    # Resource hints: worker queue, KubernetesExecutor requests and time limit
+    queue: Optional[str] = None
+    cpu: Optional[str] = None
+    memory: Optional[str] = None
+    gpu: int = Field(default=0, ge=0, le=8)
+    # Reads or writes the project NAS (routed to workers that mount it)
+    nas: bool = False
+    # Minutes
+    execution_timeout: Optional[int] = Field(default=None, ge=1)
+    # Skip the run and return the recorded result when the input folder, code and params are unchanged
+    cache_result: bool = False
+    
+    @validator('queue')
+    def queue_name(cls, v):
+        """Queue names are emitted verbatim in the DAG file"""
+        if v and not _QUEUE_NAME.match(v):
+            raise ValueError(f"Invalid queue name '{v}'")
+        return v or None
+    
+    @validator('cpu')
+    def cpu_quantity(cls, v):
+        """Kubernetes CPU quantity, e.g. '500m' or '2'"""
+        if v and not _CPU_QUANTITY.match(v):
+            raise ValueError(f"Invalid CPU request '{v}' (expected e.g. '500m' or '2')")
+        return v or None
+    
+    @validator('memory')
+    def memory_quantity(cls, v):
+        """Kubernetes memory quantity, e.g. '512Mi' or '4Gi'"""
+        if v and not _MEMORY_QUANTITY.match(v):
+            raise ValueError(f"Invalid memory request '{v}' (expected e.g. '512Mi' or '4Gi')")
+        return v or None
+    
+    @root_validator(skip_on_failure=True)
+    def hints_fit_type(cls, values):
+        """Only Python callables can be mapped or cached; an explicit queue replaces the NAS routing"""
+        if values.get('mapping') is not None and values.get('type') not in CALLABLE_TYPES:
+            raise ValueError(f"Task '{values.get('id')}' of type '{values.get('type')}' cannot be mapped")
+        if values.get('cache_result') and values.get('type') != 'python':
+            # external_python callables run from their source alone, without the decorator's module
+            raise ValueError(f"Task '{values.get('id')}' of type '{values.get('type')}' cannot cache its result")
+        if values.get('nas') and values.get('queue'):
+            raise ValueError(f"Task '{values.get('id')}' sets both 'nas' and 'queue'; 'nas' already selects the queue")
+        return values
 
 
 class PipelineStep(BaseModel):
@@ -49,10 +147,25 @@ class ProjectConfig(BaseModel):
     
     # Scheduling
     cron: str = ""
+    # Run when these Datasets are updated instead of on the cron; with
+    # schedule_on_input, the input folder (published by an upstream project) too
+    schedule_datasets: List[str] = Field(default_factory=list)
+    schedule_on_input: bool = False
+    # Emit the output folder as a Dataset when the pipeline succeeds
+    publish_output: bool = False
+    # Defer (without holding a worker slot) until the input folder, or the
+    # files matching input_pattern inside it, exist; wait_timeout in minutes
+    wait_for_input: bool = False
+    input_pattern: str = ""
+    wait_timeout: int = Field(default=720, ge=1, le=10080)
+    # 'critical_path' derives priority_weight from the DAG shape instead of high/mid/low
+    priority_mode: Literal['manual', 'critical_path'] = 'manual'
     
     # Advanced
     bundle_base: str = ""
     prepare_tests: bool = False
+    # Import task dependencies inside the callables, so parsing the DAG stays cheap
+    lazy_imports: bool = False
     
     # Pipeline
     pipeline: List[PipelineStep] = Field(min_items=1)
@@ -66,7 +179,97 @@ class ProjectConfig(BaseModel):
     @validator('nomprojet')
     def nomprojet_safe(cls, v):
         """Ensure project name is filesystem-safe"""
-        return v.replace(' ', '_').lower()
+        return safe_project_name(v)
+    
+    @validator('cron')
+    def cron_valid(cls, v):
+        """Reject schedules Airflow cannot parse"""
+        error = cron_error(v)
+        if error:
+            raise ValueError(f"Invalid cron '{v}': {error}")
+        return v
+    
+    @validator('schedule_datasets', each_item=True)
+    def dataset_uri_valid(cls, v):
+        """Dataset URIs Airflow accepts"""
+        if not _DATASET_URI.match(v):
+            raise ValueError(f"Invalid dataset URI '{v}': use printable ASCII without spaces")
+        if v.lower().startswith("airflow://"):
+            raise ValueError(f"Invalid dataset URI '{v}': the 'airflow' scheme is reserved")
+        return v
+    
+    @validator('input_pattern')
+    def input_pattern_relative(cls, v):
+        """The pattern is a glob inside the input folder"""
+        if v.startswith('/') or '..' in v.split('/'):
+            raise ValueError(f"Input pattern '{v}' must be relative to the input folder")
+        return v
+    
+    @root_validator(skip_on_failure=True)
+    def datasets_match_io(cls, values):
+        """Dataset scheduling replaces the cron; folder datasets and sensors need the folders"""
+        if (values.get('schedule_datasets') or values.get('schedule_on_input')) and values.get('cron'):
+            raise ValueError("Schedule on a cron or on datasets, not both")
+        has_input = values.get('use_input') and values.get('datalab_in')
+        if values.get('schedule_on_input') and not has_input:
+            raise ValueError("schedule_on_input needs use_input and an input folder")
+        if values.get('wait_for_input') and not has_input:
+            raise ValueError("wait_for_input needs use_input and an input folder")
+        if values.get('publish_output') and not (values.get('use_output') and values.get('datalab_out')):
+            raise ValueError("publish_output needs use_output and an output folder")
+        return values
+    
+    @root_validator(skip_on_failure=True)
+    def dependencies_form_dag(cls, values):
+        """Ensure task ids are unique and depends_on references form an acyclic graph"""
+        pipeline = values.get('pipeline') or []
+        task_ids = set()
+        for step in pipeline:
+            for task in step.tasks:
+                if task.id in task_ids:
+                    raise ValueError(f"Duplicate task id '{task.id}'")
+                task_ids.add(task.id)
+        
+        for step in pipeline:
+            for task in step.tasks:
+                for upstream in task.depends_on:
+                    if upstream == task.id:
+                        raise ValueError(f"Task '{task.id}' cannot depend on itself")
+                    if upstream not in task_ids:
+                        raise ValueError(f"Task '{task.id}' depends on unknown task '{upstream}'")
+        
+        dependencies = task_dependencies(pipeline)
+        topological_order(dependencies)
+        
+        # A mapped task reads its values from an upstream XCom: the producer
+        # must already run before it, and be defined earlier in the DAG file
+        earlier_ids = set()
+        for step in pipeline:
+            for task in step.tasks:
+                source = task.mapping.from_task if task.mapping else None
+                if source is None:
+                    continue
+                if source not in task_ids:
+                    raise ValueError(f"Task '{task.id}' is mapped over unknown task '{source}'")
+                if source not in earlier_ids or source not in ancestors(dependencies, task.id):
+                    raise ValueError(
+                        f"Task '{task.id}' is mapped over '{source}', which must be an upstream task of an earlier step"
+                    )
+            earlier_ids.update(task.id for task in step.tasks)
+        return values
+    
+    @root_validator(skip_on_failure=True)
+    def hints_match_project(cls, values):
+        """GPU, NAS and conda env tasks need the project-level infrastructure"""
+        for step in values.get('pipeline') or []:
+            for task in step.tasks:
+                if task.gpu and not values.get('use_gpu'):
+                    raise ValueError(f"Task '{task.id}' requests GPUs but the project does not enable use_gpu")
+                if task.nas and not values.get('use_nas'):
+                    raise ValueError(f"Task '{task.id}' uses the NAS but the project does not enable use_nas")
+                if task.type == 'external_python' and not values.get('use_conda'):
+                    raise ValueError(f"Task '{task.id}' runs in the conda env but the project does not enable use_conda")
+        return values
     
     class Config:
         schema_extra = {
@@ -96,3 +299,24 @@ class ProjectConfig(BaseModel):
                 "pools": ["marketing_std_pool"]
             }
         }
+
+
+class GitOperation(BaseModel):
+    """Single step of a deploy plan executed by GitService.run_plan"""
+    op: Literal['init', 'remote_add', 'checkout', 'add', 'commit', 'tag', 'push', 'pull', 'status']
+    paths: List[str] = Field(default_factory=lambda: ['.'])
+    message: str = ""
+    name: str = ""
+    url: str = ""
+    branch: str = ""
+    create: bool = False
+    remote: str = "origin"
+    ref: str = ""
+    set_upstream: bool = False
+    
+    @validator('name', 'url', 'branch', 'remote', 'ref')
+    def no_option_injection(cls, v):
+        """Refuse values git would parse as command-line options"""
+        if v.startswith('-'):
+            raise ValueError("must not start with '-'")
+        return v
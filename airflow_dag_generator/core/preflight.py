@@ -0,0 +1,265 @@
+"""
+Pre-flight Checks - Compile generated files and resolve imports before saving
+"""
+
+import ast
+import keyword
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .generator import reserved_task_ids, sanitize_name
+from .loader import _ParseCache
+from .models import CALLABLE_TYPES, ProjectConfig, Task
+
+
+CONDA_ENVS_DIR = Path("/etc/conda/envs/custom")
+
+# Treatment module name the DAG imports the task callables from
+_TREATMENT_MODULE = "src.treatment"
+
+Issue = Dict[str, Any]
+
+# `def` line of a generated task function
+_DEF_LINE = re.compile(r'^def (\w+)\(')
+
+# Results are keyed by the content hash of the checked source, so an unchanged
+# task (or DAG file) is never compiled twice
+_check_cache = _ParseCache(max_entries=8192)
+
+
+class PreflightError(ValueError):
+    """Raised by save_project when generated files would not import in Airflow"""
+
+    def __init__(self, issues: List[Issue]):
+        self.issues = issues
+        first = issues[0]
+        more = f" (+{len(issues) - 1} more)" if len(issues) > 1 else ""
+        super().__init__(f"Pre-flight failed: {first['message']}{more}")
+
+
+def _compile_errors(source: str) -> List[Tuple[int, str]]:
+    """[(line, message)] from a full compile (syntax, indentation and symbol table errors)"""
+    try:
+        compile(source, "<preflight>", "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [(e.lineno or 1, e.msg)]
+    except ValueError as e:  # e.g. null bytes
+        return [(1, str(e))]
+    return []
+
+
+def import_roots(source: str) -> List[Tuple[int, str]]:
+    """[(line, top-level module)] for absolute imports; [] if the source does not parse"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    roots = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            roots.extend((node.lineno, alias.name.split('.')[0]) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            roots.append((node.lineno, node.module.split('.')[0]))
+    return roots
+
+
+def _module_level_names(source: str) -> Set[str]:
+    """Names bound at module level of the DAG file, except the task callables"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == _TREATMENT_MODULE:
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.Assign):
+            names.update(t.id for target in node.targets for t in ast.walk(target) if isinstance(t, ast.Name))
+        elif isinstance(node, ast.FunctionDef):
+            names.add(node.name)
+        elif isinstance(node, ast.With):
+            names.update(
+                t.id for item in node.items if item.optional_vars is not None
+                for t in ast.walk(item.optional_vars) if isinstance(t, ast.Name)
+            )
+            for statement in node.body:
+                if isinstance(statement, ast.Assign):
+                    names.update(t.id for target in statement.targets for t in ast.walk(target) if isinstance(t, ast.Name))
+    return names
+
+
+class EnvModuleIndex:
+    """Top-level importable names per conda env, rebuilt when its lib folders change"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[tuple, Set[str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _search_dirs(env_path: Path) -> List[Path]:
+        dirs = []
+        for lib in sorted(env_path.glob("lib/python3*")):
+            dirs += [lib, lib / "lib-dynload", lib / "site-packages"]
+        return [d for d in dirs if d.is_dir()]
+
+    @staticmethod
+    def _scan(directory: Path) -> Set[str]:
+        names = set()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir():
+                    # Packages, including namespace packages; skip metadata and caches
+                    if name.isidentifier():
+                        names.add(name)
+                elif name.endswith(".py"):
+                    names.add(name[:-3])
+                elif name.endswith((".so", ".pyd")):
+                    names.add(name.split('.')[0])
+        return names
+
+    def modules(self, env_name: str) -> Optional[Set[str]]:
+        """Importable top-level names, or None if the env is not available on this host"""
+        env_path = CONDA_ENVS_DIR / env_name
+        dirs = self._search_dirs(env_path) if env_path.is_dir() else []
+        if not dirs:
+            return None
+        signature = tuple((str(d), d.stat().st_mtime_ns) for d in dirs)
+        with self._lock:
+            entry = self._entries.get(env_name)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+
+        names = set(sys.builtin_module_names)
+        for directory in dirs:
+            names |= self._scan(directory)
+        with self._lock:
+            self._entries[env_name] = (signature, names)
+        return names
+
+
+# Shared by pre-flight and the conda env ranking (core/conda.py)
+env_modules = EnvModuleIndex()
+
+
+def _task_function(name: str, code: str) -> str:
+    """The task as a standalone function, the way the treatment template lays it out"""
+    body = "\n".join(f"    {line}" if line else "" for line in code.split("\n")) if code.strip() else "    pass"
+    return f"def {name}(**context):\n{body}\n"
+
+
+def _treatment_task(source: str, line: int, tasks: Dict[str, Task]) -> Optional[Task]:
+    """Task a treatment.py line belongs to: its enclosing function, or the task declaring that import line"""
+    lines = source.splitlines()
+    for i in range(min(line, len(lines)) - 1, -1, -1):
+        match = _DEF_LINE.match(lines[i])
+        if match:
+            return tasks.get(match.group(1))
+    text = lines[line - 1].strip() if 0 < line <= len(lines) else ""
+    for task in tasks.values():
+        if text and text in (import_line.strip() for import_line in task.imports.split('\n')):
+            return task
+    return None
+
+
+def run_preflight(config: ProjectConfig, rendered: Dict[str, str], project_path: Path) -> Dict[str, List[Issue]]:
+    """
+    Check the generated project before it is written
+
+    Errors (the DAG would fail to import): task code or imports that do not
+    compile, a treatment.py that does not compile once assembled, task names
+    that are not valid identifiers, two tasks generating the same callable,
+    tasks of any type taking the task id of a node the DAG template defines
+    (start, end, the input sensor), and task callables shadowing a DAG-level
+    name.
+    Warnings: imports not found in the selected conda env (only checked when
+    the env exists on this host).
+
+    Args:
+        config: Validated project configuration
+        rendered: Output of ProjectManager.render_project
+        project_path: Project folder (its top-level entries count as local modules)
+
+    Returns:
+        Dictionary with "errors" and "warnings" lists of {file, task, code, message[, line]}
+    """
+    errors: List[Issue] = []
+    warnings: List[Issue] = []
+    treatment_file = "src/treatment.py"
+    dag_file = f"dag_{config.nomprojet}.py"
+    dag_names = _check_cache.get_or_parse(rendered[dag_file], _module_level_names)
+    reserved = reserved_task_ids(config.wait_for_input)
+
+    seen: Dict[str, str] = {}
+    callables: Dict[str, Task] = {}
+    imports = []
+    for step in config.pipeline:
+        for task in step.tasks:
+            name = sanitize_name(task.name)
+            issue = {"file": treatment_file, "task": task.id}
+            if name in reserved:
+                errors.append({**issue, "file": dag_file, "code": "reserved_task_id",
+                               "message": f"Task '{task.name}' generates the task id '{name}', which the DAG "
+                                          f"already uses for its own '{name}' task"})
+            if task.type not in CALLABLE_TYPES:
+                # Bash and empty tasks only exist in the DAG file; their task_id must still be unique
+                if name in seen:
+                    errors.append({**issue, "file": dag_file, "code": "duplicate_callable",
+                                   "message": f"Tasks '{seen[name]}' and '{task.name}' both generate the task '{name}'"})
+                else:
+                    seen[name] = task.name
+                continue
+            if not name.isidentifier() or keyword.iskeyword(name):
+                errors.append({**issue, "code": "invalid_name",
+                               "message": f"Task '{task.name}' generates '{name}', which is not a valid Python name"})
+                continue
+            if name in seen:
+                errors.append({**issue, "code": "duplicate_callable",
+                               "message": f"Tasks '{seen[name]}' and '{task.name}' both generate the function '{name}'"})
+            else:
+                seen[name] = task.name
+                callables[name] = task
+            if name in dag_names and name not in reserved:
+                errors.append({**issue, "file": dag_file, "code": "name_collision",
+                               "message": f"Task '{task.name}' generates '{name}', which shadows a name of the DAG file"})
+
+            for line, message in _check_cache.get_or_parse(_task_function(name, task.code), _compile_errors):
+                errors.append({**issue, "code": "syntax_error", "line": max(1, line - 1),
+                               "message": f"Task '{task.name}', line {max(1, line - 1)}: {message}"})
+            if task.imports.strip():
+                for line, message in _check_cache.get_or_parse(task.imports, _compile_errors):
+                    errors.append({**issue, "code": "syntax_error", "line": line,
+                                   "message": f"Task '{task.name}' imports, line {line}: {message}"})
+                imports.extend((task, line, root) for line, root in _check_cache.get_or_parse(task.imports, import_roots))
+
+    # The DAG file comes from our templates; a failure here means a broken template override
+    for line, message in _check_cache.get_or_parse(rendered[dag_file], _compile_errors):
+        errors.append({"file": dag_file, "task": None, "code": "syntax_error", "line": line,
+                       "message": f"{dag_file}, line {line}: {message}"})
+
+    # Tasks that compile on their own can still break the assembled module,
+    # e.g. a multi-line import split up by the import block's dedup and sort
+    if not any(issue["code"] == "syntax_error" for issue in errors):
+        source = rendered[treatment_file]
+        for line, message in _check_cache.get_or_parse(source, _compile_errors):
+            task = _treatment_task(source, line, callables)
+            where = f" (task '{task.name}')" if task is not None else ""
+            errors.append({"file": treatment_file, "task": task.id if task is not None else None,
+                           "code": "syntax_error", "line": line,
+                           "message": f"{treatment_file}, line {line}{where}: {message}"})
+
+    available = env_modules.modules(config.condaenv) if config.use_conda else None
+    if available is not None:
+        local = {"src"} | ({entry.split('.')[0] for entry in os.listdir(project_path)} if project_path.is_dir() else set())
+        for task, line, root in imports:
+            if root not in available and root not in local:
+                warnings.append({"file": treatment_file, "task": task.id, "code": "unresolved_import", "line": line,
+                                 "message": f"Task '{task.name}': module '{root}' is not installed in conda env "
+                                            f"'{config.condaenv}'"})
+    return {"errors": errors, "warnings": warnings}
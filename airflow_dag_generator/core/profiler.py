@@ -0,0 +1,160 @@
+"""
+DAG Profiler - Measure what the scheduler pays to parse a generated DAG file
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .preflight import CONDA_ENVS_DIR
+from .metrics import TIMEOUTS
+
+
+DEFAULT_TIMEOUT = 60
+TOP_MODULES = 30
+
+# Printed on stderr right before the DAG file runs: importtime lines above it
+# belong to interpreter startup, not to the DAG
+_START_MARKER = "airflow-studio-profile-start"
+
+# Runs in the target interpreter; stdlib only
+_PROBE = f"""
+import json, resource, runpy, sys, time
+# runpy.run_path imports pkgutil on first use: load it before the marker so it is not counted as a DAG import
+import pkgutil  # noqa: F401
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+sys.stderr.write("{_START_MARKER}\\n")
+sys.stderr.flush()
+error = None
+started = time.perf_counter()
+try:
+    runpy.run_path(sys.argv[1], run_name="__airflow_studio_profile__")
+except BaseException as e:
+    error = type(e).__name__ + ": " + str(e)
+elapsed = time.perf_counter() - started
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"parse_ms": elapsed * 1e3, "rss_before_kib": before, "rss_after_kib": after, "error": error}}))
+"""
+
+_IMPORT_TIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def project_python(use_conda: bool, condaenv: str) -> str:
+    """Interpreter of the project's conda env, or the server's own if it is not on this host"""
+    if use_conda and condaenv:
+        candidate = CONDA_ENVS_DIR / condaenv / "bin" / "python"
+        if candidate.is_file():
+            return str(candidate)
+    return sys.executable
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Import records (in completion order) from `-X importtime` output after the start marker
+
+    Returns:
+        List of {module, self_us, cumulative_us, depth}
+    """
+    lines = stderr.splitlines()
+    if _START_MARKER in lines:
+        lines = lines[lines.index(_START_MARKER) + 1:]
+    records = []
+    for line in lines:
+        match = _IMPORT_TIME.match(line)
+        if match:
+            records.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                # The module column is indented by two spaces per nesting level
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+    return records
+
+
+def summarize_imports(records: List[Dict[str, Any]], top: int = TOP_MODULES) -> Dict[str, Any]:
+    """Totals, the costliest modules and per-package cost (self time summed by top-level package)"""
+    packages: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        root = record["module"].split('.')[0]
+        entry = packages.setdefault(root, {"package": root, "self_us": 0, "modules": 0})
+        entry["self_us"] += record["self_us"]
+        entry["modules"] += 1
+
+    direct = [record for record in records if record["depth"] == 0]
+    return {
+        "import_us": sum(record["cumulative_us"] for record in direct),
+        "modules_imported": len(records),
+        "direct_imports": sorted(direct, key=lambda r: -r["cumulative_us"]),
+        "top_modules": sorted(records, key=lambda r: -r["self_us"])[:top],
+        "packages": sorted(packages.values(), key=lambda p: -p["self_us"]),
+    }
+
+
+async def profile_dag(dag_path: Path, python: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+    """
+    Import a DAG file in a fresh interpreter, as the scheduler's DAG processor would
+
+    Runs `python -X importtime` with the project folder on sys.path, so
+    `from src.treatment import ...` resolves exactly like in Airflow. Bytecode
+    is not written, so the numbers include compiling the project's modules.
+
+    Args:
+        dag_path: Generated dag_*.py
+        python: Interpreter to use (defaults to the server's)
+        timeout: Seconds before the subprocess is killed
+
+    Returns:
+        Dictionary with the interpreter, parse time, RSS growth, import
+        breakdown and the error raised by the DAG file, if any
+    """
+    python = python or sys.executable
+    project_path = Path(dag_path).parent
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(project_path), os.environ.get("PYTHONPATH")])),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    try:
+        process = await asyncio.create_subprocess_exec(
+            python, "-X", "importtime", "-c", _PROBE, str(dag_path),
+            cwd=str(project_path),
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except Exception as e:
+        return {"python": python, "success": False, "error": f"Error: {str(e)}"}
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        TIMEOUTS.labels(operation="profile").inc()
+        return {"python": python, "success": False, "error": f"Error: DAG import timed out after {timeout:g} seconds"}
+
+    try:
+        probe = json.loads(stdout.decode(errors="replace").strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return {
+            "python": python,
+            "success": False,
+            "error": stderr.decode(errors="replace").strip()[-2000:] or f"Exit code {process.returncode}",
+        }
+
+    imports = summarize_imports(parse_importtime(stderr.decode(errors="replace")))
+    return {
+        "python": python,
+        "success": probe["error"] is None,
+        "error": probe["error"],
+        "parse_ms": round(probe["parse_ms"], 3),
+        # ru_maxrss is in KiB on Linux
+        "rss_growth_kib": probe["rss_after_kib"] - probe["rss_before_kib"],
+        "peak_rss_kib": probe["rss_after_kib"],
+        **imports,
+    }
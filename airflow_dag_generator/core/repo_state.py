@@ -0,0 +1,836 @@
+"""
+Repository State - Branch, refs, tags and worktree status read straight from .git
+"""
+
+import configparser
+import fnmatch
+import hashlib
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .cache import Signature, stat_signature
+
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Entries returned per list (tags, recent HEAD moves, changed paths)
+MAX_TAGS = 20
+MAX_RECENT = 10
+MAX_PATHS = 200
+
+# Bytes read from the end of .git/logs/HEAD for the recent entries
+_REFLOG_TAIL = 64 * 1024
+
+_SYMBOLIC_PREFIX = "ref: "
+_GITLINK_MODE = 0o160000
+_SYMLINK_MODE = 0o120000
+_TREE_MODE = 0o040000
+
+# Pack object types; 6 and 7 are deltas against another object
+_PACK_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+_OFS_DELTA, _REF_DELTA = 6, 7
+# Longest delta chain followed (git's default depth is 50)
+_MAX_DELTA_DEPTH = 64
+
+# Files whose presence in the git dir means an operation is in progress
+_OPERATIONS = [
+    ("rebase-merge", "rebasing"),
+    ("rebase-apply", "rebasing"),
+    ("MERGE_HEAD", "merging"),
+    ("CHERRY_PICK_HEAD", "cherry-picking"),
+    ("REVERT_HEAD", "reverting"),
+    ("BISECT_LOG", "bisecting"),
+]
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    mode: int
+    mtime: int
+    size: int
+    sha: str
+    stage: int
+    skip_worktree: bool
+
+
+def git_dir(worktree: Path) -> Optional[Path]:
+    """The repository folder of a worktree: .git itself, or where a `gitdir:` file points"""
+    dot_git = Path(worktree) / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    try:
+        with open(dot_git, 'r') as f:
+            line = f.readline().strip()
+    except (FileNotFoundError, NotADirectoryError, UnicodeDecodeError):
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    target = Path(line[len("gitdir:"):].strip())
+    return target if target.is_absolute() else (Path(worktree) / target).resolve()
+
+
+def parse_head(head: str) -> Tuple[Optional[str], Optional[str]]:
+    """(branch, None) for a symbolic HEAD, (None, sha) for a detached one"""
+    head = head.strip()
+    if head.startswith(_SYMBOLIC_PREFIX):
+        ref = head[len(_SYMBOLIC_PREFIX):]
+        return (ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref), None
+    return None, head or None
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError, UnicodeDecodeError):
+        return None
+
+
+def _offset_varint(data: bytes, cursor: int) -> Tuple[int, int]:
+    """Index v4 path prefix length (git's offset varint encoding)"""
+    byte = data[cursor]
+    cursor += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[cursor]
+        cursor += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, cursor
+
+
+def read_index(data: bytes, hash_size: int = 20) -> Tuple[int, List[IndexEntry]]:
+    """
+    Entries of a .git/index file (versions 2 to 4)
+
+    Args:
+        data: File content
+        hash_size: 20 for SHA-1 repositories, 32 for SHA-256
+
+    Returns:
+        Tuple of (index version, entries in index order)
+
+    Raises:
+        ValueError: If the data is not a git index
+    """
+    if len(data) < 12 or data[:4] != b"DIRC":
+        raise ValueError("Not a git index")
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        raise ValueError(f"Unsupported git index version {version}")
+
+    entries = []
+    offset = 12
+    previous = b""
+    try:
+        for _ in range(count):
+            # ctime, mtime (seconds, nanoseconds), dev, ino, mode, uid, gid, size
+            fields = struct.unpack_from(">10I", data, offset)
+            cursor = offset + 40
+            sha = data[cursor:cursor + hash_size].hex()
+            cursor += hash_size
+            flags, = struct.unpack_from(">H", data, cursor)
+            cursor += 2
+            extended = 0
+            if version >= 3 and flags & 0x4000:
+                extended, = struct.unpack_from(">H", data, cursor)
+                cursor += 2
+            if version == 4:
+                strip, cursor = _offset_varint(data, cursor)
+                end = data.index(b"\0", cursor)
+                name = previous[:len(previous) - strip] + data[cursor:end]
+                offset = end + 1
+            else:
+                end = data.index(b"\0", cursor)
+                name = data[cursor:end]
+                # Entries are padded with 1 to 8 NULs to a multiple of 8 bytes
+                offset += ((end - offset) // 8 + 1) * 8
+            previous = name
+            entries.append(IndexEntry(
+                path=name.decode('utf-8', 'surrogateescape'),
+                mode=fields[6],
+                mtime=fields[2],
+                size=fields[9],
+                sha=sha,
+                stage=(flags >> 12) & 3,
+                skip_worktree=bool(extended & 0x4000),
+            ))
+    except (struct.error, ValueError, IndexError):
+        raise ValueError("Truncated git index")
+    return version, entries
+
+
+def _packed_refs(text: Optional[str]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """{ref: (sha, peeled commit of an annotated tag or None)} from packed-refs"""
+    refs: Dict[str, Tuple[str, Optional[str]]] = {}
+    last = None
+    for line in (text or "").splitlines():
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('^'):
+            if last is not None:
+                refs[last] = (refs[last][0], line[1:].strip())
+            continue
+        sha, _, ref = line.partition(' ')
+        last = ref.strip()
+        refs[last] = (sha, None)
+    return refs
+
+
+def _loose_refs(common_dir: Path) -> Dict[str, str]:
+    """{ref: content} for every file under refs/ (a sha or `ref: <target>`)"""
+    refs = {}
+    root = common_dir / "refs"
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = Path(directory) / name
+            content = _read_text(path)
+            if content:
+                refs[path.relative_to(common_dir).as_posix()] = content.strip()
+    return refs
+
+
+def resolve_head(worktree: Path) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (branch, commit) HEAD points to, read from .git without running git
+
+    The branch is None for a detached HEAD, the commit None for an unborn
+    branch; both are None outside a repository.
+    """
+    repo_dir = git_dir(worktree)
+    if repo_dir is None:
+        return None, None
+    branch, sha = parse_head(_read_text(repo_dir / "HEAD") or "")
+    if branch is None:
+        return None, sha
+    common_dir = RepoStateCache._common_dir(repo_dir)
+    ref = branch if branch.startswith("refs/") else f"refs/heads/{branch}"
+    # A symbolic ref may point at another one; git follows at most 5 levels
+    for _ in range(5):
+        content = _read_text(common_dir / ref)
+        if content is None:
+            packed = _packed_refs(_read_text(common_dir / "packed-refs")).get(ref)
+            return branch, packed[0] if packed else None
+        content = content.strip()
+        if not content.startswith(_SYMBOLIC_PREFIX):
+            return branch, content or None
+        ref = content[len(_SYMBOLIC_PREFIX):]
+    return branch, None
+
+
+def _reflog_tail(path: Path, limit: int) -> List[Dict[str, Any]]:
+    """Newest `limit` entries of a reflog: {sha, previous, author, time, message}"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - _REFLOG_TAIL))
+            data = f.read()
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    lines = data.split(b"\n")
+    if size > _REFLOG_TAIL:
+        lines = lines[1:]  # first line is cut
+
+    entries = []
+    for line in reversed(lines):
+        if len(entries) == limit:
+            break
+        header, _, message = line.decode('utf-8', 'replace').partition('\t')
+        parts = header.split(' ', 2)
+        if len(parts) < 3:
+            continue
+        identity, _, when = parts[2].rpartition('>')
+        when = when.split()
+        entries.append({
+            "sha": parts[1],
+            "previous": parts[0],
+            "author": identity.split('<')[0].strip(),
+            "time": int(when[0]) if when and when[0].isdigit() else None,
+            "message": message,
+        })
+    return entries
+
+
+def _git_config(text: Optional[str]) -> configparser.ConfigParser:
+    config = configparser.ConfigParser(strict=False, interpolation=None)
+    try:
+        config.read_string(text or "")
+    except configparser.Error:
+        pass
+    return config
+
+
+def _version_key(name: str) -> List[Tuple[int, str]]:
+    """Natural sort key: v1.10.0 after v1.9.2"""
+    return [(int(part), "") if part.isdigit() else (-1, part) for part in re.split(r'(\d+)', name)]
+
+
+def _ignore_patterns(text: Optional[str]) -> List[Tuple[bool, bool, bool, str]]:
+    """(negated, directory only, anchored, glob) for each .gitignore line"""
+    patterns = []
+    for line in (text or "").splitlines():
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        line = line[1:] if negated else line
+        directory_only = line.endswith('/')
+        line = line.rstrip('/')
+        anchored = '/' in line
+        patterns.append((negated, directory_only, anchored, line.lstrip('/')))
+    return patterns
+
+
+def _ignored(path: str, is_dir: bool, patterns: List[Tuple[bool, bool, bool, str]]) -> bool:
+    """Last matching pattern wins, as in git (nested .gitignore files are not read)"""
+    ignored = False
+    name = path.rsplit('/', 1)[-1]
+    for negated, directory_only, anchored, pattern in patterns:
+        if directory_only and not is_dir:
+            continue
+        if fnmatch.fnmatchcase(path if anchored else name, pattern):
+            ignored = not negated
+    return ignored
+
+
+def _blob_sha(path: Path, mode: int, hash_name: str) -> Optional[str]:
+    """Object id git would give the file's current content"""
+    try:
+        if mode & 0o170000 == _SYMLINK_MODE:
+            content = os.readlink(path).encode('utf-8', 'surrogateescape')
+        else:
+            with open(path, 'rb') as f:
+                content = f.read()
+    except OSError:
+        return None
+    return hashlib.new(hash_name, b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _dir_mtime(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return None
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild an object from its base and a git delta (copy and insert instructions)"""
+    def varint(cursor: int) -> int:
+        byte = 0x80
+        while byte & 0x80:
+            byte = delta[cursor]
+            cursor += 1
+        return cursor
+
+    cursor = varint(varint(0))  # source and target sizes
+    out = bytearray()
+    while cursor < len(delta):
+        op = delta[cursor]
+        cursor += 1
+        if op & 0x80:
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[cursor] << (8 * i)
+                    cursor += 1
+            for i in range(3):
+                if op & (1 << (4 + i)):
+                    size |= delta[cursor] << (8 * i)
+                    cursor += 1
+            out += base[offset:offset + (size or 0x10000)]
+        elif op:
+            out += delta[cursor:cursor + op]
+            cursor += op
+        else:
+            raise ValueError("Invalid delta instruction")
+    return bytes(out)
+
+
+class _ObjectReader:
+    """
+    Commits and trees read from .git/objects, loose or packed
+
+    Only what HEAD's tree needs: objects found in neither place (e.g. behind
+    alternates or a promisor remote) read as None.
+    """
+
+    def __init__(self, common_dir: Path, hash_size: int):
+        self.objects = common_dir / "objects"
+        self.hash_size = hash_size
+        self._packs: Optional[List[Tuple[bytes, Path]]] = None
+
+    def _pack_indexes(self) -> List[Tuple[bytes, Path]]:
+        if self._packs is None:
+            self._packs = []
+            for idx in sorted((self.objects / "pack").glob("pack-*.idx")):
+                try:
+                    with open(idx, 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                # Version 2 index; version 1 has not been written by git since 1.5
+                if data[:8] == b"\xfftOc\x00\x00\x00\x02":
+                    self._packs.append((data, idx.with_suffix(".pack")))
+        return self._packs
+
+    def _pack_offset(self, data: bytes, name: bytes) -> Optional[int]:
+        """Offset of an object in the pack of a version 2 .idx, by binary search of its sorted names"""
+        fanout = struct.unpack_from(">256I", data, 8)
+        count = fanout[255]
+        names = 8 + 256 * 4
+        low, high = (fanout[name[0] - 1] if name[0] else 0), fanout[name[0]]
+        while low < high:
+            middle = (low + high) // 2
+            candidate = data[names + middle * self.hash_size:names + (middle + 1) * self.hash_size]
+            if candidate < name:
+                low = middle + 1
+            elif candidate > name:
+                high = middle
+            else:
+                offsets = names + count * (self.hash_size + 4)
+                offset, = struct.unpack_from(">I", data, offsets + middle * 4)
+                if offset & 0x80000000:
+                    offset, = struct.unpack_from(">Q", data, offsets + count * 4 + (offset & 0x7fffffff) * 8)
+                return offset
+        return None
+
+    @staticmethod
+    def _inflate(f) -> bytes:
+        inflater = zlib.decompressobj()
+        out = b""
+        while not inflater.eof:
+            chunk = f.read(16384)
+            if not chunk:
+                raise ValueError("Truncated pack object")
+            out += inflater.decompress(chunk)
+        return out
+
+    def _read_packed(self, f, offset: int, depth: int = 0) -> Tuple[str, bytes]:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        kind = (byte >> 4) & 7
+        while byte & 0x80:  # object size, not needed to inflate
+            byte = f.read(1)[0]
+        if kind in _PACK_TYPES:
+            return _PACK_TYPES[kind], self._inflate(f)
+        if depth >= _MAX_DELTA_DEPTH:
+            raise ValueError("Delta chain too long")
+        if kind == _OFS_DELTA:
+            byte = f.read(1)[0]
+            distance = byte & 0x7f
+            while byte & 0x80:
+                byte = f.read(1)[0]
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            delta = self._inflate(f)
+            base_kind, base = self._read_packed(f, offset - distance, depth + 1)
+        elif kind == _REF_DELTA:
+            base_name = f.read(self.hash_size)
+            delta = self._inflate(f)
+            found = self.read(base_name.hex(), depth + 1)
+            if found is None:
+                raise ValueError("Missing delta base")
+            base_kind, base = found
+        else:
+            raise ValueError(f"Unknown pack object type {kind}")
+        return base_kind, _apply_delta(base, delta)
+
+    def read(self, sha: str, depth: int = 0) -> Optional[Tuple[str, bytes]]:
+        """(type, content) of an object, or None if it is not in this repository's object folder"""
+        try:
+            with open(self.objects / sha[:2] / sha[2:], 'rb') as f:
+                raw = zlib.decompress(f.read())
+            header, _, content = raw.partition(b"\0")
+            return header.split(b" ")[0].decode('ascii'), content
+        except FileNotFoundError:
+            pass
+        name = bytes.fromhex(sha)
+        for data, pack in self._pack_indexes():
+            offset = self._pack_offset(data, name)
+            if offset is not None:
+                with open(pack, 'rb') as f:
+                    return self._read_packed(f, offset, depth)
+        return None
+
+    def flat_tree(self, sha: str, prefix: str = "") -> Optional[Dict[str, Tuple[int, str]]]:
+        """{path: (mode, sha)} of every blob, symlink and submodule under a tree; None if an object is missing"""
+        found = self.read(sha)
+        if found is None or found[0] != "tree":
+            return None
+        files = {}
+        data, cursor = found[1], 0
+        while cursor < len(data):
+            space = data.index(b" ", cursor)
+            end = data.index(b"\0", space)
+            mode = int(data[cursor:space], 8)
+            path = prefix + data[space + 1:end].decode('utf-8', 'surrogateescape')
+            child = data[end + 1:end + 1 + self.hash_size].hex()
+            cursor = end + 1 + self.hash_size
+            if mode == _TREE_MODE:
+                subtree = self.flat_tree(child, path + "/")
+                if subtree is None:
+                    return None
+                files.update(subtree)
+            else:
+                files[path] = (mode, child)
+        return files
+
+    def commit_tree(self, sha: str) -> Optional[Dict[str, Tuple[int, str]]]:
+        """Flattened tree of a commit"""
+        found = self.read(sha)
+        if found is None or found[0] != "commit" or not found[1].startswith(b"tree "):
+            return None
+        return self.flat_tree(found[1][5:5 + 2 * self.hash_size].decode('ascii'))
+
+
+def _staged(entries: Dict[str, IndexEntry], conflicted: List[str],
+            head_tree: Dict[str, Tuple[int, str]]) -> List[str]:
+    """Paths whose index entry differs from HEAD: added, modified or deleted by `git add`/`git rm`"""
+    changed = [
+        path for path, entry in entries.items()
+        if head_tree.get(path) != (entry.mode, entry.sha)
+    ]
+    skipped = set(conflicted)
+    changed.extend(path for path in head_tree if path not in entries and path not in skipped)
+    return sorted(changed)
+
+
+class _Repo(NamedTuple):
+    """The part of the state that only depends on files in the git dir"""
+    signature: Signature
+    refs: Dict[str, Any]
+    hash_name: str
+    index_mtime: int
+    entries: Dict[str, IndexEntry]
+    conflicted: List[str]
+    patterns: List[Tuple[bool, bool, bool, str]]
+    # Flattened tree of HEAD's commit (kept while HEAD does not move), None if unreadable
+    head_tree: Optional[Dict[str, Tuple[int, str]]]
+    # Index changes against HEAD, None when HEAD's tree could not be read
+    staged: Optional[List[str]]
+
+
+class RepoStateCache:
+    """
+    Git state of project worktrees, safe to share between threads
+
+    HEAD, refs, config, the reflog tail, the index and its changes against
+    HEAD's tree are parsed once and kept until the stat signature of the files
+    and ref folders they come from changes (git replaces them by renaming a
+    lock file, so every update changes an mtime). Each call still lstats the
+    tracked files for the worktree status; a file is only re-hashed when its
+    stat no longer matches the index, and that hash is kept for as long as the
+    file is untouched. The untracked scan is reused while the folders it
+    listed keep their mtimes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries: Maximum number of cached worktrees
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._repos: "OrderedDict[str, _Repo]" = OrderedDict()
+        self._hashes: Dict[Tuple[str, str], Tuple[int, int, Optional[str]]] = {}
+        # worktree -> (repo signature, [(folder, mtime)] scanned, untracked paths)
+        self._untracked_scans: Dict[str, Tuple[Signature, List[Tuple[str, Optional[int]]], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _common_dir(repo_dir: Path) -> Path:
+        """Where refs live: linked worktrees share them with the main repository"""
+        common = _read_text(repo_dir / "commondir")
+        if common is None:
+            return repo_dir
+        target = Path(common.strip())
+        return target if target.is_absolute() else (repo_dir / target).resolve()
+
+    @staticmethod
+    def _watched(worktree: Path, repo_dir: Path, common_dir: Path) -> List[Path]:
+        files = [
+            repo_dir, repo_dir / "HEAD", repo_dir / "index", repo_dir / "logs" / "HEAD",
+            common_dir / "packed-refs", common_dir / "config",
+            common_dir / "refs" / "heads", common_dir / "refs" / "tags", common_dir / "refs" / "remotes",
+            worktree / ".gitignore", common_dir / "info" / "exclude",
+        ]
+        # Pushes and fetches update refs/remotes/<remote>/<branch>
+        try:
+            with os.scandir(common_dir / "refs" / "remotes") as remotes:
+                files.extend(Path(remote.path) for remote in remotes if remote.is_dir())
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        return files
+
+    def _read_repo(self, worktree: Path, repo_dir: Path, common_dir: Path, signature: Signature,
+                   previous: Optional[_Repo] = None) -> _Repo:
+        """Parse the git dir (blocking); HEAD's tree is taken from `previous` while HEAD has not moved"""
+        config = _git_config(_read_text(common_dir / "config"))
+        object_format = config.get("extensions", "objectformat", fallback="sha1").strip().lower()
+        hash_name, hash_size = ("sha256", 32) if object_format == "sha256" else ("sha1", 20)
+
+        packed = _packed_refs(_read_text(common_dir / "packed-refs"))
+        loose = _loose_refs(common_dir)
+        shas = {ref: sha for ref, (sha, _) in packed.items()}
+        peeled = {ref: commit for ref, (_, commit) in packed.items() if commit}
+        for ref, content in loose.items():
+            if not content.startswith(_SYMBOLIC_PREFIX):
+                shas[ref] = content
+                peeled.pop(ref, None)
+
+        def resolve(ref: str) -> Optional[str]:
+            for _ in range(5):
+                content = loose.get(ref)
+                if content is None or not content.startswith(_SYMBOLIC_PREFIX):
+                    return shas.get(ref)
+                ref = content[len(_SYMBOLIC_PREFIX):].strip()
+            return None
+
+        branch, head = parse_head(_read_text(repo_dir / "HEAD") or "")
+        if branch is not None:
+            head = resolve(f"refs/heads/{branch}")
+
+        upstream = None
+        if branch is not None:
+            section = f'branch "{branch}"'
+            remote = config.get(section, "remote", fallback=None)
+            merge = config.get(section, "merge", fallback=None)
+            if remote and merge and merge.startswith("refs/heads/"):
+                name = f"{remote}/{merge[len('refs/heads/'):]}" if remote != "." else merge[len('refs/heads/'):]
+                ref = f"refs/remotes/{name}" if remote != "." else merge
+                sha = resolve(ref)
+                upstream = {"ref": name, "sha": sha, "in_sync": sha is not None and sha == head}
+
+        tags = sorted(
+            (
+                {"name": ref[len("refs/tags/"):], "sha": sha, "commit": peeled.get(ref, sha)}
+                for ref, sha in shas.items() if ref.startswith("refs/tags/")
+            ),
+            key=lambda tag: _version_key(tag["name"]),
+            reverse=True,
+        )
+        refs = {
+            "branch": branch,
+            "detached": branch is None and head is not None,
+            "head": head,
+            "upstream": upstream,
+            "branches": sorted(ref[len("refs/heads/"):] for ref in shas if ref.startswith("refs/heads/")),
+            "tags": tags[:MAX_TAGS],
+            "tag_count": len(tags),
+            "recent": _reflog_tail(repo_dir / "logs" / "HEAD", MAX_RECENT),
+            "operation": next((label for name, label in _OPERATIONS if (repo_dir / name).exists()), None),
+        }
+
+        entries: Dict[str, IndexEntry] = {}
+        conflicted = set()
+        index_version = None
+        index_file = repo_dir / "index"
+        try:
+            with open(index_file, 'rb') as f:
+                index_version, parsed = read_index(f.read(), hash_size)
+            index_mtime = os.stat(index_file).st_mtime_ns
+        except FileNotFoundError:
+            parsed, index_mtime = [], -1
+        for entry in parsed:
+            if entry.stage:
+                conflicted.add(entry.path)
+            else:
+                entries[entry.path] = entry
+        refs["index"] = {"version": index_version, "entries": len(parsed)}
+
+        patterns = _ignore_patterns(
+            (_read_text(common_dir / "info" / "exclude") or "") + "\n" + (_read_text(Path(worktree) / ".gitignore") or "")
+        )
+
+        if head is None:
+            head_tree: Optional[Dict[str, Tuple[int, str]]] = {}  # unborn branch: everything in the index is staged
+        elif previous is not None and previous.refs["head"] == head:
+            head_tree = previous.head_tree
+        else:
+            try:
+                head_tree = _ObjectReader(common_dir, hash_size).commit_tree(head)
+            except (OSError, ValueError, IndexError, zlib.error, struct.error):
+                head_tree = None
+        staged = _staged(entries, sorted(conflicted), head_tree) if head_tree is not None else None
+        return _Repo(signature, refs, hash_name, index_mtime, entries, sorted(conflicted), patterns, head_tree, staged)
+
+    def _repo(self, worktree: Path) -> Optional[_Repo]:
+        repo_dir = git_dir(worktree)
+        if repo_dir is None:
+            return None
+        common_dir = self._common_dir(repo_dir)
+        signature = stat_signature(self._watched(worktree, repo_dir, common_dir))
+        key = str(worktree)
+        with self._lock:
+            repo = self._repos.get(key)
+            if repo is not None and repo.signature == signature:
+                self._repos.move_to_end(key)
+                self.hits += 1
+                return repo
+            self.misses += 1
+
+        repo = self._read_repo(worktree, repo_dir, common_dir, signature, repo)
+        with self._lock:
+            self._repos[key] = repo
+            self._repos.move_to_end(key)
+            while len(self._repos) > self.max_entries:
+                evicted, _ = self._repos.popitem(last=False)
+                self._hashes = {k: v for k, v in self._hashes.items() if k[0] != evicted}
+                self._untracked_scans.pop(evicted, None)
+        return repo
+
+    def _changed(self, worktree: Path, repo: _Repo, entry: IndexEntry, st: os.stat_result) -> bool:
+        """Whether a tracked file's content differs from its index entry"""
+        if entry.mode & 0o170000 == _GITLINK_MODE:
+            return False  # submodules are not inspected
+        # Like git, trust a size mismatch unless the index has no size (stat data
+        # cleared, e.g. by `git reset` or a racily clean entry): then compare content
+        if st.st_size != entry.size and entry.size:
+            return True
+        # Racily clean: modified in the same second the index was written
+        racy = st.st_mtime_ns // 10 ** 9 >= repo.index_mtime // 10 ** 9
+        if int(st.st_mtime) == entry.mtime and not racy:
+            return False
+
+        key = (str(worktree), entry.path)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            sha = cached[2]
+        else:
+            sha = _blob_sha(worktree / entry.path, entry.mode, repo.hash_name)
+            with self._lock:
+                self._hashes[key] = (st.st_mtime_ns, st.st_size, sha)
+        return sha != entry.sha
+
+    @staticmethod
+    def _list_dir(worktree: Path, relative: str, scanned: List[Tuple[str, Optional[int]]]) -> List[os.DirEntry]:
+        """Entries of a folder; its mtime is recorded before listing, so a change during the scan is seen next time"""
+        scanned.append((relative, _dir_mtime(worktree / relative)))
+        try:
+            with os.scandir(worktree / relative) as items:
+                return list(items)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return []
+
+    @staticmethod
+    def _has_files(worktree: Path, relative: str, repo: _Repo, scanned: List[Tuple[str, Optional[int]]]) -> bool:
+        """Whether an untracked folder holds anything not ignored (`git status` hides it otherwise)"""
+        for item in RepoStateCache._list_dir(worktree, relative, scanned):
+            path = f"{relative}/{item.name}"
+            is_dir = item.is_dir(follow_symlinks=False)
+            if _ignored(path, is_dir, repo.patterns):
+                continue
+            if not is_dir or RepoStateCache._has_files(worktree, path, repo, scanned):
+                return True
+        return False
+
+    def _untracked(self, worktree: Path, repo: _Repo) -> List[str]:
+        """
+        Untracked paths, rescanned only when the index, the ignore files or a scanned folder changed
+
+        Adding, removing or renaming an entry updates its folder's mtime, so
+        unchanged folder mtimes mean the same names as the last scan.
+        """
+        key = str(worktree)
+        with self._lock:
+            cached = self._untracked_scans.get(key)
+        if cached is not None and cached[0] == repo.signature and all(
+            _dir_mtime(worktree / relative) == mtime for relative, mtime in cached[1]
+        ):
+            return cached[2]
+
+        scanned: List[Tuple[str, Optional[int]]] = []
+        tracked_dirs = {os.path.dirname(path) for path in repo.entries}
+        for directory in list(tracked_dirs):
+            while directory:
+                directory = os.path.dirname(directory)
+                tracked_dirs.add(directory)
+
+        untracked = []
+        pending = [""]
+        while pending and len(untracked) < MAX_PATHS:
+            relative = pending.pop()
+            for item in self._list_dir(worktree, relative, scanned):
+                path = f"{relative}/{item.name}" if relative else item.name
+                if item.name == ".git" and not relative:
+                    continue
+                is_dir = item.is_dir(follow_symlinks=False)
+                if path in repo.entries or _ignored(path, is_dir, repo.patterns):
+                    continue
+                if is_dir:
+                    if path in tracked_dirs:
+                        pending.append(path)
+                    elif self._has_files(worktree, path, repo, scanned):
+                        # Like `git status`, an untracked folder is reported once
+                        untracked.append(path + "/")
+                else:
+                    untracked.append(path)
+        result = sorted(untracked)[:MAX_PATHS]
+        # A truncated scan did not visit every folder
+        if not pending:
+            with self._lock:
+                self._untracked_scans[key] = (repo.signature, scanned, result)
+        return result
+
+    def state(self, worktree: Path) -> Dict[str, Any]:
+        """
+        Everything the deployment cockpit polls for, without running git (blocking)
+
+        Modified and deleted files compare the worktree to the index; staged
+        files compare the index to HEAD's tree, read from loose or packed
+        objects (None when an object is not available locally, in which case
+        dirty is None too unless the worktree already shows a change).
+        Untracked files honour the top-level .gitignore and info/exclude.
+
+        Args:
+            worktree: Project folder
+
+        Returns:
+            Dictionary with is_repo, branch, detached, head, upstream, branches,
+            tags (newest version first), tag_count, recent HEAD moves from the
+            reflog, operation in progress, index info, dirty, staged,
+            modified, deleted, untracked and conflicted paths
+        """
+        worktree = Path(worktree)
+        repo = self._repo(worktree)
+        if repo is None:
+            return {"path": str(worktree), "is_repo": False}
+
+        modified, deleted = [], []
+        for entry in repo.entries.values():
+            if entry.skip_worktree:
+                continue
+            try:
+                st = os.lstat(worktree / entry.path)
+            except (FileNotFoundError, NotADirectoryError):
+                deleted.append(entry.path)
+                continue
+            if self._changed(worktree, repo, entry, st):
+                modified.append(entry.path)
+        untracked = self._untracked(worktree, repo)
+        dirty: Optional[bool] = bool(modified or deleted or untracked or repo.conflicted or repo.staged)
+        if not dirty and repo.staged is None:
+            dirty = None  # the index may still differ from HEAD
+        return {
+            "path": str(worktree),
+            "is_repo": True,
+            **repo.refs,
+            "dirty": dirty,
+            "staged": repo.staged[:MAX_PATHS] if repo.staged is not None else None,
+            "modified": modified[:MAX_PATHS],
+            "deleted": deleted[:MAX_PATHS],
+            "untracked": untracked,
+            "conflicted": repo.conflicted[:MAX_PATHS],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._repos)}
@@ -0,0 +1,310 @@
+"""
+Local Runner - Execute a generated pipeline on this machine, in dependency order
+"""
+
+import datetime
+import importlib
+import multiprocessing
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .generator import sanitize_name
+from .graph import downstream_map, task_dependencies, topological_order
+from .models import ProjectConfig, Task
+
+
+# Treatment module the DAG imports the task callables from
+_TREATMENT_MODULE = "src.treatment"
+
+# Output kept from a failing bash command
+_OUTPUT_TAIL = 2000
+
+
+class LocalTaskInstance:
+    """The part of Airflow's TaskInstance task code usually touches: XCom pulls of upstream results"""
+
+    def __init__(self, task_id: str, results: Dict[str, Any], map_index: int = -1):
+        self.task_id = task_id
+        self.map_index = map_index
+        self._results = results
+
+    def xcom_pull(self, task_ids: Any = None, key: str = "return_value", **kwargs) -> Any:
+        """Return value of an upstream task (a list for several task ids)"""
+        if key != "return_value":
+            return None
+        if isinstance(task_ids, (list, tuple)):
+            return [self._results.get(task_id) for task_id in task_ids]
+        return self._results.get(task_ids)
+
+    def xcom_push(self, key: str, value: Any, **kwargs):
+        """Accepted and dropped: only return values flow between tasks locally"""
+
+
+class _Job(NamedTuple):
+    task_id: str
+    map_index: int
+    slots: int
+    kwargs: Dict[str, Any]
+
+
+def _max_rss_kib(who: int) -> int:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(who).ru_maxrss
+
+
+def _execute(project_path: str, kind: str, target: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one task instance in a worker process
+
+    Args:
+        project_path: Project folder (put on sys.path so `src.treatment` imports)
+        kind: 'python' to call `target` from src/treatment.py, 'bash' to run it as a command
+        target: Callable name or bash command
+        context: Keyword arguments for the callable
+
+    Returns:
+        Dictionary with status, wall_ms, rss_before_kib, peak_rss_kib, error and result
+    """
+    rss_before = _max_rss_kib(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    outcome: Dict[str, Any] = {"status": "success", "error": None, "result": None}
+    try:
+        if kind == "bash":
+            completed = subprocess.run(["bash", "-c", target], cwd=project_path, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(
+                    f"exit code {completed.returncode}: {(completed.stderr or completed.stdout)[-_OUTPUT_TAIL:]}"
+                )
+            # Like BashOperator, the last line of output is the task's return value
+            lines = completed.stdout.strip().splitlines()
+            outcome["result"] = lines[-1] if lines else None
+        else:
+            if project_path not in sys.path:
+                sys.path.insert(0, project_path)
+            module = importlib.import_module(_TREATMENT_MODULE)
+            outcome["result"] = getattr(module, target)(**context)
+    except BaseException as e:
+        outcome["status"] = "failed"
+        outcome["error"] = f"{type(e).__name__}: {e}"
+        outcome["traceback"] = traceback.format_exc()
+    outcome["wall_ms"] = round((time.perf_counter() - started) * 1e3, 3)
+    outcome["rss_before_kib"] = rss_before
+    outcome["peak_rss_kib"] = max(_max_rss_kib(resource.RUSAGE_SELF), _max_rss_kib(resource.RUSAGE_CHILDREN))
+
+    try:
+        pickle.dumps(outcome["result"])
+    except Exception:
+        # Downstream tasks cannot receive it across processes
+        outcome["result"] = repr(outcome["result"])
+    return outcome
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """A fresh interpreter per task instance, so RSS and module state are the task's own"""
+    context = multiprocessing.get_context("spawn")
+    try:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1)
+    except TypeError:  # Python < 3.11: workers are reused, peak RSS is the worker's so far
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def run_pipeline(config: ProjectConfig, project_path: Path, slots: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run every task of a saved project locally
+
+    Tasks start as soon as their upstreams succeed, highest pipeline position
+    first, while the pool_slots of running tasks fit in `slots`. A task larger
+    than the budget runs alone. Mapped tasks run one instance per value (at
+    most max_active_tis_per_dag at once). Downstream tasks of a failure are
+    not run and reported as upstream_failed. Dummy tasks succeed instantly;
+    external_python tasks run with this interpreter, not the conda env's.
+
+    Args:
+        config: Project configuration (as saved in project_path)
+        project_path: Project folder holding src/treatment.py
+        slots: Local concurrency budget in pool slots (defaults to the CPU count)
+
+    Returns:
+        Dictionary with success, wall_ms, slots, peak_slots, failed task ids
+        and per-task (by config id) Airflow task_id, status, wall_ms,
+        peak_rss_kib, instances and error
+    """
+    slots = max(1, slots or os.cpu_count() or 1)
+    tasks: Dict[str, Task] = {task.id: task for step in config.pipeline for task in step.tasks}
+    names = {task_id: sanitize_name(task.name) for task_id, task in tasks.items()}
+    dependencies = task_dependencies(config.pipeline)
+    downstream = downstream_map(dependencies)
+    position = {task_id: index for index, task_id in enumerate(topological_order(dependencies))}
+
+    report: Dict[str, Dict[str, Any]] = {
+        task_id: {
+            "name": task.name, "task_id": names[task_id], "type": task.type, "status": "pending", "pool_slots": task.pool_slots,
+            "wall_ms": 0.0, "peak_rss_kib": 0, "instances": 0, "error": None,
+        }
+        for task_id, task in tasks.items()
+    }
+    results: Dict[str, Any] = {}
+    waiting = {task_id: len(set(dependencies[task_id])) for task_id in tasks}
+    ready: List[_Job] = []
+    remaining: Dict[str, int] = {}
+    first_start: Dict[str, float] = {}
+    active: Dict[str, int] = {task_id: 0 for task_id in tasks}
+    running: Dict[Future, _Job] = {}
+    free, peak = slots, 0
+    run_id = f"local__{datetime.datetime.now().isoformat(timespec='seconds')}"
+    started = time.perf_counter()
+
+    def skip_downstream(task_id: str):
+        for down in downstream[task_id]:
+            if report[down]["status"] == "pending":
+                report[down]["status"] = "upstream_failed"
+                skip_downstream(down)
+
+    def finish(task_id: str):
+        entry = report[task_id]
+        entry["wall_ms"] = round((time.perf_counter() - first_start.get(task_id, time.perf_counter())) * 1e3, 3)
+        if entry["status"] == "running":
+            entry["status"] = "success"
+        if entry["status"] != "success":
+            skip_downstream(task_id)
+            return
+        for down in downstream[task_id]:
+            waiting[down] -= 1
+            if waiting[down] == 0 and report[down]["status"] == "pending":
+                release(down)
+
+    def release(task_id: str):
+        """Queue the instances of a task whose upstreams all succeeded"""
+        task = tasks[task_id]
+        report[task_id]["status"] = "running"
+        if task.type == 'dummy':
+            finish(task_id)
+            return
+        need = min(task.pool_slots, slots)
+        mapping = task.mapping
+        if mapping is None:
+            jobs = [_Job(task_id, -1, need, {})]
+        else:
+            values = results.get(mapping.from_task) if mapping.from_task else mapping.values
+            if not isinstance(values, (list, tuple)):
+                report[task_id]["status"] = "failed"
+                report[task_id]["error"] = f"Mapped over '{mapping.from_task}', which did not return a list"
+                finish(task_id)
+                return
+            jobs = [_Job(task_id, index, need, {mapping.argument: value}) for index, value in enumerate(values)]
+        remaining[task_id] = len(jobs)
+        report[task_id]["instances"] = len(jobs)
+        if not jobs:
+            finish(task_id)
+            return
+        ready.extend(jobs)
+
+    def context_for(job: _Job) -> Dict[str, Any]:
+        upstream_results = {names[up]: results.get(up) for up in dependencies[job.task_id]}
+        return {
+            "task_id": names[job.task_id],
+            "run_id": run_id,
+            "ds": datetime.date.today().isoformat(),
+            "logical_date": datetime.datetime.now(),
+            "params": {},
+            "map_index": job.map_index,
+            "ti": LocalTaskInstance(names[job.task_id], upstream_results, job.map_index),
+            **job.kwargs,
+        }
+
+    for task_id in tasks:
+        if waiting[task_id] == 0:
+            release(task_id)
+
+    with _process_pool(slots) as pool:
+        while ready or running:
+            ready.sort(key=lambda job: (position[job.task_id], job.map_index))
+            still_ready = []
+            for job in ready:
+                mapping = tasks[job.task_id].mapping
+                limit = mapping.max_active_tis_per_dag if mapping is not None else None
+                if job.slots > free or (limit is not None and active[job.task_id] >= limit):
+                    still_ready.append(job)
+                    continue
+                task = tasks[job.task_id]
+                kind, target = ("bash", task.code) if task.type == 'bash' else ("python", names[job.task_id])
+                future = pool.submit(_execute, str(project_path), kind, target, context_for(job))
+                running[future] = job
+                free -= job.slots
+                active[job.task_id] += 1
+                first_start.setdefault(job.task_id, time.perf_counter())
+            ready = still_ready
+            peak = max(peak, slots - free)
+
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                free += job.slots
+                active[job.task_id] -= 1
+                entry = report[job.task_id]
+                try:
+                    outcome = future.result()
+                except Exception as e:  # worker crashed (e.g. killed by the OOM killer)
+                    outcome = {"status": "failed", "error": f"{type(e).__name__}: {e}", "peak_rss_kib": 0}
+                entry["peak_rss_kib"] = max(entry["peak_rss_kib"], outcome.get("peak_rss_kib", 0))
+                if outcome["status"] != "success" and entry["status"] != "failed":
+                    entry["status"] = "failed"
+                    entry["error"] = outcome["error"]
+                    entry["traceback"] = outcome.get("traceback")
+                if job.map_index < 0:
+                    results[job.task_id] = outcome.get("result")
+                else:
+                    results.setdefault(job.task_id, {})[job.map_index] = outcome.get("result")
+                remaining[job.task_id] -= 1
+                if remaining[job.task_id] == 0:
+                    if job.map_index >= 0:
+                        mapped = results[job.task_id]
+                        results[job.task_id] = [mapped[index] for index in sorted(mapped)]
+                    finish(job.task_id)
+
+    failed = [task_id for task_id, entry in report.items() if entry["status"] in ("failed", "upstream_failed")]
+    return {
+        "project": config.nomprojet,
+        "success": not failed and all(entry["status"] == "success" for entry in report.values()),
+        "wall_ms": round((time.perf_counter() - started) * 1e3, 3),
+        "slots": slots,
+        "peak_slots": peak,
+        "failed": failed,
+        "tasks": report,
+    }
+
+
+def run_project(project_path: Path, slots: Optional[int] = None) -> Dict[str, Any]:
+    """Load a saved project from its folder and run it locally (see run_pipeline)"""
+    from .manager import ProjectManager
+
+    project_path = Path(project_path).resolve()
+    config = ProjectConfig(**ProjectManager(base_path=project_path.parent).load_project(project_path.name))
+    return run_pipeline(config, project_path, slots)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable table of a run_pipeline report"""
+    lines = [f"{'task':<32} {'status':<16} {'wall ms':>10} {'peak RSS MiB':>13} {'slots':>5} {'n':>4}"]
+    for entry in report["tasks"].values():
+        lines.append(
+            f"{entry['name'][:32]:<32} {entry['status']:<16} {entry['wall_ms']:>10.1f} "
+            f"{entry['peak_rss_kib'] / 1024:>13.1f} {entry['pool_slots']:>5} {entry['instances']:>4}"
+        )
+        if entry["error"]:
+            lines.append(f"    {entry['error']}")
+    lines.append(
+        f"{'ok' if report['success'] else 'FAILED'}: {report['wall_ms'] / 1e3:.2f}s wall, "
+        f"peak {report['peak_slots']}/{report['slots']} slots"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,141 @@
+"""
+Template Registry - Compiled Jinja2 templates for the generated project files
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from jinja2 import (
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    StrictUndefined,
+    Template,
+)
+
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+TEMPLATE_NAMES = ("meta.yaml.j2", "dag.py.j2", "treatment.py.j2", "test_pipeline.py.j2", "result_cache.py.j2")
+STAGES = ("LIL", "SXB")
+
+# Environment overrides, used when no tornado settings are available (CLI, benchmarks)
+TEMPLATE_DIR_ENV = "AIRFLOW_STUDIO_TEMPLATE_DIR"
+TEMPLATE_CACHE_ENV = "AIRFLOW_STUDIO_TEMPLATE_CACHE"
+
+
+def workspace_path(path: str) -> str:
+    """Absolute paths are kept, relative ones are resolved against /home/jovyan/workspaces"""
+    return path if path.startswith('/') else f"/home/jovyan/workspaces/{path}"
+
+
+class TemplateRegistry:
+    """
+    One Jinja2 environment per stage, compiled templates kept for the process lifetime
+
+    Lookup order for stage S: `<override_dir>/S/`, `<override_dir>/`, then the
+    built-in templates, so an organisation can override a single file for a
+    single stage. Templates are compiled on first use (or by `preload`) and
+    never re-checked on disk; the optional bytecode cache lets new processes
+    (CLI workers, server restarts) skip compilation too.
+    """
+
+    def __init__(self, override_dir: Optional[str] = None, bytecode_cache_dir: Optional[str] = None):
+        """
+        Args:
+            override_dir: Folder with organisation templates (optional per-stage subfolders)
+            bytecode_cache_dir: Folder for compiled template bytecode (no bytecode cache if None)
+        """
+        self.override_dir = Path(override_dir).expanduser() if override_dir else None
+        self.bytecode_cache = None
+        if bytecode_cache_dir:
+            Path(bytecode_cache_dir).expanduser().mkdir(parents=True, exist_ok=True)
+            self.bytecode_cache = FileSystemBytecodeCache(str(Path(bytecode_cache_dir).expanduser()))
+        self._environments: Dict[str, Environment] = {}
+        self._templates: Dict[tuple, Template] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None) -> "TemplateRegistry":
+        """Build a registry from the `airflow_studio` tornado settings, falling back to the environment"""
+        settings = settings or {}
+        return cls(
+            override_dir=settings.get("template_dir") or os.environ.get(TEMPLATE_DIR_ENV),
+            bytecode_cache_dir=settings.get("template_cache_dir") or os.environ.get(TEMPLATE_CACHE_ENV),
+        )
+
+    def _environment(self, stage: str) -> Environment:
+        environment = self._environments.get(stage)
+        if environment is not None:
+            return environment
+
+        search_path = []
+        if self.override_dir is not None:
+            search_path += [self.override_dir / stage, self.override_dir]
+        search_path.append(BUILTIN_TEMPLATE_DIR)
+        environment = Environment(
+            loader=ChoiceLoader([FileSystemLoader(str(path)) for path in search_path]),
+            bytecode_cache=self.bytecode_cache,
+            undefined=StrictUndefined,
+            autoescape=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            auto_reload=False,
+            cache_size=-1,
+        )
+        environment.filters["workspace_path"] = workspace_path
+        self._environments[stage] = environment
+        return environment
+
+    def get(self, name: str, stage: str = "LIL") -> Template:
+        """
+        Compiled template for a stage
+
+        Args:
+            name: Template file name (one of TEMPLATE_NAMES)
+            stage: Project stage (LIL/SXB)
+        """
+        template = self._templates.get((stage, name))
+        if template is None:
+            with self._lock:
+                template = self._templates.get((stage, name))
+                if template is None:
+                    template = self._environment(stage).get_template(name)
+                    self._templates[(stage, name)] = template
+        return template
+
+    def preload(self):
+        """Compile every template for every stage up front"""
+        for stage in STAGES:
+            for name in TEMPLATE_NAMES:
+                self.get(name, stage)
+        logger.info(
+            "Airflow Studio templates compiled (overrides: %s)",
+            self.override_dir or "none",
+        )
+
+
+_registry: Optional[TemplateRegistry] = None
+
+
+def get_registry() -> TemplateRegistry:
+    """Process-wide registry, built from the environment on first use"""
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry.from_settings()
+    return _registry
+
+
+def configure(settings: Optional[Dict[str, Any]] = None) -> TemplateRegistry:
+    """Replace the process-wide registry (called at extension start) and compile its templates"""
+    global _registry
+    registry = TemplateRegistry.from_settings(settings)
+    registry.preload()
+    _registry = registry
+    return registry
@@ -0,0 +1,465 @@
+"""
+Draft Validation - Incremental, field-level validation of project drafts
+"""
+
+import ast
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .generator import reserved_task_ids, sanitize_name
+from .graph import CycleError, ancestors, topological_order
+from .models import CALLABLE_TYPES, ProjectConfig, Task
+
+
+DEFAULT_MAX_DRAFTS = 256
+
+Issue = Dict[str, Any]
+
+# Minimal valid pipeline used to validate the top-level fields on their own
+_STUB_PIPELINE = [{"id": "_", "tasks": [{"id": "_", "name": "_"}]}]
+
+
+class PatchError(ValueError):
+    """Raised when a patch operation cannot be applied to the draft"""
+
+
+def pointer(loc: Tuple) -> str:
+    """JSON pointer (RFC 6901) for a location tuple"""
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in loc)
+
+
+def _tokens(path: str) -> List[str]:
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer '{path}'")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def validation_issues(error: ValidationError, prefix: Tuple = ()) -> List[Issue]:
+    """Structured issues from a pydantic ValidationError"""
+    return [
+        {"path": pointer(prefix + tuple(err["loc"])), "code": err["type"], "message": err["msg"]}
+        for err in error.errors()
+    ]
+
+
+def document_diff(current: Any, proposed: Any, loc: Tuple = ()) -> List[Dict[str, Any]]:
+    """
+    Leaf-level differences between two JSON documents
+
+    Lists are compared index by index. Each change is {path, current, proposed};
+    `current` or `proposed` is left out where the value does not exist on that side.
+    """
+    if isinstance(current, dict) and isinstance(proposed, dict):
+        changes = []
+        for key in list(current) + [key for key in proposed if key not in current]:
+            if key not in proposed:
+                changes.append({"path": pointer(loc + (key,)), "current": current[key]})
+            elif key not in current:
+                changes.append({"path": pointer(loc + (key,)), "proposed": proposed[key]})
+            else:
+                changes.extend(document_diff(current[key], proposed[key], loc + (key,)))
+        return changes
+    if isinstance(current, list) and isinstance(proposed, list):
+        changes = []
+        for index in range(max(len(current), len(proposed))):
+            if index >= len(proposed):
+                changes.append({"path": pointer(loc + (index,)), "current": current[index]})
+            elif index >= len(current):
+                changes.append({"path": pointer(loc + (index,)), "proposed": proposed[index]})
+            else:
+                changes.extend(document_diff(current[index], proposed[index], loc + (index,)))
+        return changes
+    if current == proposed and type(current) is type(proposed):
+        return []
+    return [{"path": pointer(loc), "current": current, "proposed": proposed}]
+
+
+def code_syntax_error(code: str) -> Optional[Tuple[int, str]]:
+    """
+    Parse task code the way it ends up in treatment.py (as a function body)
+
+    Returns:
+        (line within the task code, message), or None if it parses
+    """
+    body = "\n".join(f"    {line}" if line else "" for line in code.split("\n"))
+    try:
+        ast.parse(f"def _(**context):\n{body}\n    pass\n")
+    except SyntaxError as e:
+        return max(1, (e.lineno or 2) - 1), e.msg
+    return None
+
+
+def _task_issues(task: Any) -> List[Tuple[Tuple, str, str, Optional[int]]]:
+    """Checks that only depend on the task itself: (relative loc, code, message, line)"""
+    if not isinstance(task, dict):
+        return [((), "type_error", "Task must be an object", None)]
+
+    issues = []
+    try:
+        Task(**task)
+    except ValidationError as e:
+        issues.extend((tuple(err["loc"]), err["type"], err["msg"], None) for err in e.errors())
+
+    code = task.get("code")
+    # Bash commands and empty tasks are not Python
+    if isinstance(code, str) and task.get("type", "python") in CALLABLE_TYPES:
+        error = code_syntax_error(code)
+        if error:
+            issues.append((("code",), "syntax_error", f"Line {error[0]}: {error[1]}", error[0]))
+
+    imports = task.get("imports")
+    if isinstance(imports, str) and imports.strip():
+        try:
+            ast.parse(imports)
+        except SyntaxError as e:
+            issues.append((("imports",), "syntax_error", f"Line {e.lineno}: {e.msg}", e.lineno))
+    return issues
+
+
+def _step_issues(step: Any) -> List[Tuple[Tuple, str, str, Optional[int]]]:
+    """Checks on the step itself; its tasks are validated separately"""
+    if not isinstance(step, dict):
+        return [((), "type_error", "Step must be an object", None)]
+    issues = []
+    if not isinstance(step.get("id"), str):
+        issues.append((("id",), "string_type", "Step id must be a string", None))
+    tasks = step.get("tasks")
+    if not isinstance(tasks, list):
+        issues.append((("tasks",), "list_type", "Step tasks must be a list", None))
+    elif not tasks:
+        issues.append((("tasks",), "too_short", "A step needs at least one task", None))
+    return issues
+
+
+def _top_level_issues(document: Dict[str, Any]) -> List[Issue]:
+    """Every ProjectConfig field except the pipeline"""
+    try:
+        ProjectConfig(**{**document, "pipeline": _STUB_PIPELINE})
+    except ValidationError as e:
+        return [issue for issue in validation_issues(e) if not issue["path"].startswith("/pipeline")]
+    return []
+
+
+class Draft:
+    """
+    Server-held copy of a project config that is patched and re-validated in place
+
+    Per-task and per-step results are cached by object identity: a patch
+    inside a task drops that task's entry, while tasks that only moved (a
+    step inserted before them) keep theirs. Cross-task checks (ids, names,
+    pools, project hints, dependencies) are a linear pass over the cached
+    values; the cycle check is only re-run when the dependency graph changed.
+    """
+
+    def __init__(self, document: Dict[str, Any]):
+        if not isinstance(document, dict):
+            raise PatchError("Config must be an object")
+        self.id = uuid.uuid4().hex
+        self.version = 0
+        self.document = document
+        self._top_issues: Optional[List[Issue]] = None
+        # id(obj) -> (obj, issues[, sanitized name]); holding obj keeps the id from being reused
+        self._tasks: Dict[int, Tuple[Any, list, Optional[str]]] = {}
+        self._steps: Dict[int, Tuple[Any, list]] = {}
+        self._last_dependencies: Optional[Dict[str, List[str]]] = None
+        self._last_cycle: Optional[CycleError] = None
+
+    def apply_patch(self, operations: List[Dict[str, Any]]):
+        """
+        Apply JSON-patch operations (add, remove, replace, test)
+
+        Raises:
+            PatchError: If an operation is malformed or does not match the draft;
+                operations before it are already applied
+        """
+        if not isinstance(operations, list):
+            raise PatchError("'patch' must be a list of operations")
+        for operation in operations:
+            self._apply(operation)
+        self.version += 1
+
+    def _apply(self, operation: Dict[str, Any]):
+        kind = operation.get("op")
+        tokens = _tokens(operation.get("path", ""))
+        if kind not in ("add", "remove", "replace", "test"):
+            raise PatchError(f"Unsupported patch op '{kind}'")
+        if kind != "remove" and "value" not in operation:
+            raise PatchError(f"'{kind}' needs a value")
+        if not tokens:
+            if kind == "test":
+                if self.document != operation["value"]:
+                    raise PatchError("Test failed at ''")
+                return
+            if kind == "remove" or not isinstance(operation["value"], dict):
+                raise PatchError("The document root can only be replaced by an object")
+            self.document = operation["value"]
+            self._top_issues = None
+            return
+
+        parent = self.document
+        try:
+            for token in tokens[:-1]:
+                parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+            key = tokens[-1]
+            if isinstance(parent, list):
+                index = len(parent) if key == "-" and kind == "add" else int(key)
+                if not 0 <= index <= len(parent) - (kind != "add"):
+                    raise IndexError(index)
+                if kind == "add":
+                    parent.insert(index, operation["value"])
+                elif kind == "remove":
+                    del parent[index]
+                elif kind == "replace":
+                    parent[index] = operation["value"]
+                elif parent[index] != operation["value"]:
+                    raise PatchError(f"Test failed at '{operation['path']}'")
+            elif isinstance(parent, dict):
+                if kind == "add":
+                    parent[key] = operation["value"]
+                elif kind == "remove":
+                    del parent[key]
+                elif kind == "replace":
+                    if key not in parent:
+                        raise KeyError(key)
+                    parent[key] = operation["value"]
+                elif parent.get(key) != operation["value"]:
+                    raise PatchError(f"Test failed at '{operation['path']}'")
+            else:
+                raise PatchError(f"Cannot patch inside a scalar at '{operation['path']}'")
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            if isinstance(e, PatchError):
+                raise
+            raise PatchError(f"Path '{operation['path']}' does not exist in the draft")
+        if kind != "test":
+            self._invalidate(tokens)
+
+    def _invalidate(self, tokens: List[str]):
+        """Drop cached results under the patched path"""
+        if tokens[0] != "pipeline":
+            self._top_issues = None
+            return
+        if len(tokens) < 3:
+            # Whole pipeline or whole step: the new objects have no cache entries
+            return
+        try:
+            step = self.document["pipeline"][int(tokens[1])]
+            self._steps.pop(id(step), None)
+            if len(tokens) >= 5 and tokens[2] == "tasks":
+                self._tasks.pop(id(step["tasks"][int(tokens[3])]), None)
+        except (KeyError, IndexError, ValueError, TypeError):
+            pass
+
+    def validate(self) -> Dict[str, Any]:
+        """
+        Validate the draft, reusing cached results for untouched subtrees
+
+        Returns:
+            Dictionary with valid, errors (path/code/message[/line]), the number
+            of tasks re-validated and the elapsed time
+        """
+        started = time.perf_counter()
+        document = self.document
+        errors: List[Issue] = []
+
+        if self._top_issues is None:
+            self._top_issues = _top_level_issues(document)
+        errors.extend(self._top_issues)
+
+        pipeline = document.get("pipeline")
+        if not isinstance(pipeline, list) or not pipeline:
+            errors.append({"path": "/pipeline", "code": "too_short", "message": "The pipeline needs at least one step"})
+            pipeline = pipeline if isinstance(pipeline, list) else []
+
+        steps_cache: Dict[int, Tuple[Any, list]] = {}
+        tasks_cache: Dict[int, Tuple[Any, list, Optional[str]]] = {}
+        revalidated = 0
+        located = []  # (step index, task index, task dict, sanitized name)
+        for i, step in enumerate(pipeline):
+            entry = self._steps.get(id(step))
+            if entry is None:
+                entry = (step, _step_issues(step))
+            steps_cache[id(step)] = entry
+            for loc, code, message, line in entry[1]:
+                errors.append(self._issue(("pipeline", i) + loc, code, message, line))
+
+            tasks = step.get("tasks") if isinstance(step, dict) else None
+            for j, task in enumerate(tasks if isinstance(tasks, list) else []):
+                entry = self._tasks.get(id(task))
+                if entry is None:
+                    revalidated += 1
+                    name = task.get("name") if isinstance(task, dict) else None
+                    entry = (task, _task_issues(task), sanitize_name(name) if isinstance(name, str) else None)
+                tasks_cache[id(task)] = entry
+                for loc, code, message, line in entry[1]:
+                    errors.append(self._issue(("pipeline", i, "tasks", j) + loc, code, message, line))
+                if isinstance(task, dict):
+                    located.append((i, j, task, entry[2]))
+        # Only live objects stay cached
+        self._steps, self._tasks = steps_cache, tasks_cache
+
+        errors.extend(self._cross_task_issues(located, document))
+        return {
+            "valid": not errors,
+            "errors": errors,
+            "revalidated_tasks": revalidated,
+            "total_tasks": len(located),
+            "duration_ms": round((time.perf_counter() - started) * 1e3, 3),
+        }
+
+    @staticmethod
+    def _issue(loc: Tuple, code: str, message: str, line: Optional[int]) -> Issue:
+        issue = {"path": pointer(loc), "code": code, "message": message}
+        if line is not None:
+            issue["line"] = line
+        return issue
+
+    def _cross_task_issues(self, located: List[Tuple[int, int, dict, Optional[str]]],
+                           document: Dict[str, Any]) -> List[Issue]:
+        """
+        Unique ids and function names, reserved task ids, known pools, task hints
+        the project enables, dependencies forming a DAG, mapping sources
+        """
+        errors: List[Issue] = []
+        reserved = reserved_task_ids(document.get("wait_for_input") is True)
+        pools = document.get("pools")
+        pools = set(pools) if isinstance(pools, list) and all(isinstance(p, str) for p in pools) else set()
+        if not pools:
+            pools = {"default_pool"}
+
+        # Locations are kept as (step, task) indexes; pointers are only built for errors
+        seen_ids: Dict[str, Tuple[int, int]] = {}
+        seen_names: Dict[str, Tuple[str, Tuple[int, int]]] = {}
+        for i, j, task, safe_name in located:
+            task_id = task.get("id")
+            if isinstance(task_id, str):
+                if task_id in seen_ids:
+                    errors.append({"path": pointer(("pipeline", i, "tasks", j, "id")), "code": "duplicate_id",
+                                   "message": f"Task id '{task_id}' is already used at "
+                                              f"{pointer(('pipeline', seen_ids[task_id][0], 'tasks', seen_ids[task_id][1]))}"})
+                else:
+                    seen_ids[task_id] = (i, j)
+            if safe_name is not None:
+                if safe_name in reserved:
+                    errors.append({"path": pointer(("pipeline", i, "tasks", j, "name")), "code": "reserved_task_id",
+                                   "message": f"'{task['name']}' generates the task id '{safe_name}', which the DAG "
+                                              f"already uses for its own '{safe_name}' task"})
+                if safe_name in seen_names:
+                    other_name, (other_i, other_j) = seen_names[safe_name]
+                    errors.append({"path": pointer(("pipeline", i, "tasks", j, "name")), "code": "duplicate_name",
+                                   "message": f"'{task['name']}' and '{other_name}' "
+                                              f"({pointer(('pipeline', other_i, 'tasks', other_j))}) both "
+                                              f"generate the function '{safe_name}'"})
+                else:
+                    seen_names[safe_name] = (task["name"], (i, j))
+            pool = task.get("selected_pool")
+            if isinstance(pool, str) and pool and pool not in pools:
+                errors.append({"path": pointer(("pipeline", i, "tasks", j, "selected_pool")), "code": "unknown_pool",
+                               "message": f"Pool '{pool}' is not one of the project pools: {', '.join(sorted(pools))}"})
+            # Same rules as ProjectConfig.hints_match_project, which the stub pipeline cannot exercise
+            if task.get("gpu") and not document.get("use_gpu"):
+                errors.append({"path": pointer(("pipeline", i, "tasks", j, "gpu")), "code": "gpu_not_enabled",
+                               "message": f"Task '{task_id}' requests GPUs but the project does not enable use_gpu"})
+            if task.get("nas") and not document.get("use_nas"):
+                errors.append({"path": pointer(("pipeline", i, "tasks", j, "nas")), "code": "nas_not_enabled",
+                               "message": f"Task '{task_id}' uses the NAS but the project does not enable use_nas"})
+            if task.get("type") == "external_python" and not document.get("use_conda"):
+                errors.append({"path": pointer(("pipeline", i, "tasks", j, "type")), "code": "conda_not_enabled",
+                               "message": f"Task '{task_id}' runs in the conda env but the project does not "
+                                          f"enable use_conda"})
+
+        # Dependencies: same semantics as graph.task_dependencies, on raw dicts
+        dependencies: Dict[str, List[str]] = {}
+        previous_ids: List[str] = []
+        current_step, current_ids = None, []
+        mapped: List[Tuple[int, int, str, str]] = []
+        broken = False
+        for i, j, task, _ in located:
+            if i != current_step:
+                if current_step is not None:
+                    previous_ids = current_ids
+                current_step, current_ids = i, []
+            task_id = task.get("id")
+            if not isinstance(task_id, str):
+                continue
+            current_ids.append(task_id)
+            mapping = task.get("mapping")
+            if isinstance(mapping, dict) and isinstance(mapping.get("from_task"), str):
+                mapped.append((i, j, task_id, mapping["from_task"]))
+            depends_on = task.get("depends_on") or []
+            if not isinstance(depends_on, list):
+                continue
+            for upstream in depends_on:
+                if upstream == task_id:
+                    errors.append({"path": pointer(("pipeline", i, "tasks", j, "depends_on")), "code": "self_dependency",
+                                   "message": f"Task '{task_id}' cannot depend on itself"})
+                    broken = True
+                elif upstream not in seen_ids:
+                    errors.append({"path": pointer(("pipeline", i, "tasks", j, "depends_on")), "code": "unknown_dependency",
+                                   "message": f"Task '{task_id}' depends on unknown task '{upstream}'"})
+                    broken = True
+            dependencies[task_id] = list(depends_on) if depends_on else previous_ids
+
+        if not broken and len(dependencies) == len(seen_ids):
+            # The sort is the costliest check: reuse the last verdict while the graph is unchanged
+            if dependencies != self._last_dependencies:
+                self._last_dependencies = dependencies
+                try:
+                    topological_order(dependencies)
+                    self._last_cycle = None
+                except CycleError as e:
+                    self._last_cycle = e
+            if self._last_cycle is not None:
+                i, j = seen_ids[self._last_cycle.cycle[0]]
+                errors.append({"path": pointer(("pipeline", i, "tasks", j, "depends_on")), "code": "dependency_cycle",
+                               "message": str(self._last_cycle)})
+
+        # Mapped tasks: the XCom producer must be an upstream task of an earlier step
+        graph_known = not broken and len(dependencies) == len(seen_ids) and self._last_cycle is None
+        for i, j, task_id, source in mapped:
+            path = pointer(("pipeline", i, "tasks", j, "mapping", "from_task"))
+            if source not in seen_ids:
+                errors.append({"path": path, "code": "unknown_mapping_source",
+                               "message": f"Task '{task_id}' is mapped over unknown task '{source}'"})
+            elif seen_ids[source][0] >= i or (graph_known and source not in ancestors(dependencies, task_id)):
+                errors.append({"path": path, "code": "invalid_mapping_source",
+                               "message": f"Task '{task_id}' is mapped over '{source}', which must be an upstream "
+                                          f"task of an earlier step"})
+        return errors
+
+
+class DraftStore:
+    """Bounded LRU of drafts per user, safe to share between threads"""
+
+    def __init__(self, max_drafts: int = DEFAULT_MAX_DRAFTS):
+        self.max_drafts = max_drafts
+        self._drafts: "OrderedDict[Tuple[str, str], Draft]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, owner: str, document: Dict[str, Any]) -> Draft:
+        """Start a draft from a full config"""
+        draft = Draft(document)
+        with self._lock:
+            self._drafts[(owner, draft.id)] = draft
+            while len(self._drafts) > self.max_drafts:
+                self._drafts.popitem(last=False)
+        return draft
+
+    def get(self, owner: str, draft_id: str) -> Optional[Draft]:
+        """The owner's draft, or None if unknown or evicted"""
+        with self._lock:
+            draft = self._drafts.get((owner, draft_id))
+            if draft is not None:
+                self._drafts.move_to_end((owner, draft_id))
+            return draft
+
+    def discard(self, owner: str, draft_id: str):
+        """Forget a draft"""
+        with self._lock:
+            self._drafts.pop((owner, draft_id), None)
@@ -0,0 +1,208 @@
+"""
+Workspace Index - Cached listing of project folders with metadata summaries
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .cache import Signature, stat_signature
+from .repo_state import RepoStateCache
+from . import loader
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader as _YamlLoader
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _summary_files(project_path: Path, name: str) -> List[Path]:
+    """Files a summary is built from, in a fixed order (also its validation set)"""
+    return [
+        project_path / "meta.yaml",
+        project_path / f"dag_{name}.py",
+        project_path / "src" / "treatment.py",
+    ]
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except (FileNotFoundError, NotADirectoryError, UnicodeDecodeError):
+        return None
+
+
+def _git_summary(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Branch (or short sha when detached) and dirty flag of a RepoStateCache.state result"""
+    if not state.get("is_repo"):
+        return {"branch": None, "dirty": None}
+    return {"branch": state["branch"] or (state["head"] or "")[:12], "dirty": state["dirty"]}
+
+
+def summarize_project(project_path: Path, name: str, signature: Signature) -> Dict[str, Any]:
+    """
+    Summary of one project folder (blocking)
+
+    Args:
+        project_path: Project folder
+        name: Folder name
+        signature: stat_signature of _summary_files, taken by the caller
+
+    Returns:
+        Dictionary with name, stage, owner, task count and last save time
+    """
+    meta_file, dag_file, _ = _summary_files(project_path, name)
+    meta: Dict[str, Any] = {}
+    meta_source = _read_text(meta_file)
+    if meta_source is not None:
+        try:
+            meta = yaml.load(meta_source, Loader=_YamlLoader) or {}
+        except yaml.YAMLError:
+            meta = {}
+    if not isinstance(meta, dict):
+        meta = {}
+
+    tasks = None
+    dag_source = _read_text(dag_file)
+    if dag_source is not None:
+        try:
+            operators = loader._parse_cache.get_or_parse(dag_source, loader.parse_dag)["operators"]
+            tasks = sum(1 for var in operators if var not in loader.BOUNDARY_NODES)
+        except SyntaxError:
+            tasks = None
+
+    saved = [mtime for _, mtime, _ in signature if mtime >= 0]
+    return {
+        "name": name,
+        "is_project": meta_source is not None,
+        "stage": meta.get("stage"),
+        "owner": meta.get("persoid"),
+        "tasks": tasks,
+        "last_saved": max(saved) / 1e9 if saved else None,
+    }
+
+
+class WorkspaceIndex:
+    """
+    Index of the folders under the workspace root, safe to share between threads
+
+    Folder names are rescanned with `os.scandir` only when the root's mtime
+    changes (a folder was created, removed or renamed). Summaries are cached
+    per folder and rebuilt only when the stat signature of the files they were
+    read from changes, so a listing touches a handful of stats per project
+    instead of re-reading every meta.yaml and DAG. The git state of the
+    returned page comes from RepoStateCache, so it matches /git/state.
+    """
+
+    def __init__(self, base_path: Path = None, repo_states: Optional[RepoStateCache] = None):
+        """
+        Args:
+            base_path: Workspace root (defaults to ~/workspaces)
+            repo_states: Git state cache to share (a private one by default)
+        """
+        self.base_path = Path(base_path or Path.home() / "workspaces")
+        self.repo_states = repo_states or RepoStateCache()
+        self._root_mtime: Optional[int] = None
+        self._names: List[str] = []
+        self._summaries: Dict[str, Tuple[Signature, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        """Sorted visible folder names, rescanned only if the root changed"""
+        try:
+            root_mtime = os.stat(self.base_path).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                self._root_mtime, self._names = None, []
+                self._summaries.clear()
+            return []
+
+        with self._lock:
+            if root_mtime == self._root_mtime:
+                return self._names
+
+        names = []
+        with os.scandir(self.base_path) as entries:
+            for entry in entries:
+                # DirEntry.is_dir uses the d_type from readdir: no stat on most filesystems
+                if not entry.name.startswith('.') and entry.is_dir():
+                    names.append(entry.name)
+        names.sort()
+
+        with self._lock:
+            self._root_mtime = root_mtime
+            self._names = names
+            present = set(names)
+            for name in [n for n in self._summaries if n not in present]:
+                del self._summaries[name]
+        return names
+
+    def summary(self, name: str) -> Dict[str, Any]:
+        """Summary for one folder, rebuilt only if its files changed"""
+        project_path = self.base_path / name
+        signature = stat_signature(_summary_files(project_path, name))
+        with self._lock:
+            cached = self._summaries.get(name)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        summary = summarize_project(project_path, name, signature)
+        with self._lock:
+            self._summaries[name] = (signature, summary)
+        return summary
+
+    def _with_git(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """Summary plus its current git state (not cached with it: the worktree changes on its own)"""
+        worktree = os.path.realpath(self.base_path / summary["name"])
+        return {**summary, "git": _git_summary(self.repo_states.state(worktree))}
+
+    def list_projects(
+        self,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        query: str = "",
+        stage: Optional[str] = None,
+        owner: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of project summaries
+
+        Filtering by name only summarizes the requested page; filtering by
+        stage or owner has to summarize every name match (cached after the
+        first call). Git state is only read for the returned items.
+
+        Args:
+            offset: Index of the first item to return
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            query: Case-insensitive substring of the folder name
+            stage: Keep only projects with this stage
+            owner: Keep only projects owned by this persoid
+
+        Returns:
+            Dictionary with total (matches), offset, limit and items
+        """
+        offset = max(0, offset)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        names = self.names()
+        if query:
+            needle = query.lower()
+            names = [name for name in names if needle in name.lower()]
+
+        if stage or owner:
+            matches = [
+                summary for summary in map(self.summary, names)
+                if (not stage or summary["stage"] == stage) and (not owner or summary["owner"] == owner)
+            ]
+            total, items = len(matches), matches[offset:offset + limit]
+        else:
+            total, items = len(names), [self.summary(name) for name in names[offset:offset + limit]]
+
+        return {"total": total, "offset": offset, "limit": limit, "items": [self._with_git(item) for item in items]}
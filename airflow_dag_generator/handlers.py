@@ -4,76 +4,246 @@ Provides REST endpoints for project management, Git operations, and workspace na
 """
 
 import json
+import logging
 import os
-from pathlib import Path
+import uuid
 from typing import Dict, Any
 
 from jupyter_server.base.handlers import APIHandler
 from jupyter_server.utils import url_path_join
 import tornado
+from tornado.iostream import StreamClosedError
+from pydantic import ValidationError
 
-from .core.manager import ProjectManager
+from .core.manager import ConflictError, ProjectManager, config_etag
 from .core.git_service import GitService
+from .core.executor import WorkerPool
+from .core.cache import ProjectCache
+from .core.workspace import WorkspaceIndex, DEFAULT_PAGE_SIZE
+from .core.models import ProjectConfig, safe_project_name
+from .core.analyzer import analyze_pipeline, check_estimates
+from .core.validation import DraftStore, PatchError, validation_issues
+from .core.preflight import PreflightError
+from .core.conda import CondaIndex, project_imports
+from .core.repo_state import RepoStateCache
+from .core.profiler import profile_dag, project_python
+from .core import loader, log, metrics, preflight
 
 
-class WorkspacesHandler(APIHandler):
+logger = logging.getLogger(__name__)
+
+# Successful requests slower than this are logged at INFO instead of DEBUG
+SLOW_REQUEST_SECONDS = 1.0
+
+
+class StudioHandler(APIHandler):
+    """Base handler giving access to the shared worker pool and project cache"""
+    
+    async def prepare(self):
+        """Tag the request with an id (the client's X-Request-Id if it sent one)"""
+        self.request_id = self.request.headers.get("X-Request-Id") or uuid.uuid4().hex
+        self.set_header("X-Request-Id", self.request_id)
+        log.request_id.set(self.request_id)
+        await super().prepare()
+        if self.current_user is not None:
+            log.request_user.set(self.user_name)
+    
+    def on_finish(self):
+        """Record latency per endpoint and per user, and log the request"""
+        handler = type(self).__name__
+        status = self.get_status()
+        elapsed = self.request.request_time()
+        user = log.request_user.get()
+        metrics.REQUEST_SECONDS.labels(handler=handler, method=self.request.method, status=str(status)).observe(elapsed)
+        metrics.USER_REQUEST_SECONDS.labels(user=user, handler=handler).inc(elapsed)
+        if status >= 500:
+            level = logging.ERROR
+        elif status >= 400:
+            level = logging.WARNING
+        else:
+            level = logging.INFO if elapsed >= SLOW_REQUEST_SECONDS else logging.DEBUG
+        logger.log(
+            level, "%s %s %d %.1fms user=%s request_id=%s",
+            self.request.method, self.request.path, status, elapsed * 1e3, user, log.request_id.get(),
+            extra={"fields": {
+                "handler": handler,
+                "method": self.request.method,
+                "path": self.request.path,
+                "status": status,
+                "duration_ms": round(elapsed * 1e3, 3),
+            }}
+        )
+        super().on_finish()
+    
+    def internal_error(self, error: Exception, **body):
+        """Answer 500 for an unexpected exception, logging and counting it"""
+        handler = type(self).__name__
+        metrics.ERRORS.labels(handler=handler, exception=type(error).__name__).inc()
+        logger.error("%s failed: %s", handler, error, exc_info=error, extra={"fields": {"handler": handler}})
+        self.set_status(500)
+        self.finish(json.dumps({"error": str(error), **body}))
+    
+    @property
+    def pool(self) -> WorkerPool:
+        return self.settings["airflow_studio_pool"]
+    
+    @property
+    def project_cache(self) -> ProjectCache:
+        return self.settings["airflow_studio_cache"]
+    
+    @property
+    def drafts(self) -> DraftStore:
+        return self.settings["airflow_studio_drafts"]
+    
+    @property
+    def workspace_index(self) -> WorkspaceIndex:
+        return self.settings["airflow_studio_workspace"]
+    
+    @property
+    def conda_index(self) -> CondaIndex:
+        return self.settings["airflow_studio_conda"]
+    
+    @property
+    def repo_states(self) -> RepoStateCache:
+        return self.settings["airflow_studio_repo_state"]
+    
+    def project_manager(self) -> ProjectManager:
+        """ProjectManager bound to the shared project cache"""
+        return ProjectManager(cache=self.project_cache)
+    
+    @staticmethod
+    def folder_key(path: str) -> str:
+        """Per-project concurrency key: the real path of the project folder"""
+        return os.path.realpath(path)
+    
+    def project_key(self, project_name: str) -> str:
+        """Concurrency key of a project by name, the same as for git commands run in its folder"""
+        return self.folder_key(str(self.project_manager().get_project_path(project_name)))
+    
+    @property
+    def user_name(self) -> str:
+        """Name used as the per-user concurrency key"""
+        user = self.current_user
+        return getattr(user, "username", None) or str(user)
+
+
+class WorkspacesHandler(StudioHandler):
     """List available workspaces in /home/jovyan/workspaces"""
     
     @tornado.web.authenticated
-    def get(self):
+    async def get(self):
         """GET /airflow-studio/api/workspaces"""
         try:
-            base_path = Path.home() / "workspaces"
-            if not base_path.exists():
-                self.finish(json.dumps([]))
-                return
-            
-            workspaces = [
-                d.name for d in base_path.iterdir() 
-                if d.is_dir() and not d.name.startswith('.')
-            ]
-            
+            workspaces = await self.pool.run(self.user_name, None, self.workspace_index.names)
             self.finish(json.dumps(workspaces))
         except Exception as e:
-            self.set_status(500)
-            self.finish(json.dumps({"error": str(e)}))
+            self.internal_error(e)
+
+
+class ProjectListHandler(StudioHandler):
+    """Paginated project listing with per-project summaries"""
+    
+    @tornado.web.authenticated
+    async def get(self):
+        """GET /airflow-studio/api/projects?offset=&limit=&q=&stage=&owner="""
+        try:
+            offset = int(self.get_query_argument("offset", "0"))
+            limit = int(self.get_query_argument("limit", str(DEFAULT_PAGE_SIZE)))
+        except ValueError:
+            self.set_status(400)
+            self.finish(json.dumps({"error": "'offset' and 'limit' must be integers"}))
+            return
+        
+        try:
+            page = await self.pool.run(
+                self.user_name, None,
+                self.workspace_index.list_projects,
+                offset, limit,
+                self.get_query_argument("q", ""),
+                self.get_query_argument("stage", None),
+                self.get_query_argument("owner", None),
+            )
+            self.finish(json.dumps(page))
+        except Exception as e:
+            self.internal_error(e)
 
 
-class ProjectHandler(APIHandler):
+class ProjectHandler(StudioHandler):
     """Handle project CRUD operations"""
     
     @tornado.web.authenticated
-    def get(self, project_name: str):
-        """GET /airflow-studio/api/project/{name}"""
+    async def get(self, project_name: str):
+        """
+        GET /airflow-studio/api/project/{name}
+        
+        The ETag header is a hash of the config: with a matching If-None-Match
+        the answer is an empty 304.
+        """
         try:
-            manager = ProjectManager()
-            config = manager.load_project(project_name)
+            config = await self.pool.run(
+                self.user_name, self.project_key(project_name),
+                lambda: self.project_manager().load_project(project_name)
+            )
+            self.set_header("ETag", config_etag(config))
+            if self.check_etag_header():
+                self.set_status(304)
+                self.finish()
+                return
             self.finish(json.dumps(config))
         except FileNotFoundError:
             self.set_status(404)
             self.finish(json.dumps({"error": f"Project '{project_name}' not found"}))
         except Exception as e:
-            self.set_status(500)
-            self.finish(json.dumps({"error": str(e)}))
+            self.internal_error(e)
     
     @tornado.web.authenticated
-    def post(self):
-        """POST /airflow-studio/api/project - Create/Update project"""
+    async def post(self):
+        """
+        POST /airflow-studio/api/project - Create/Update project
+        
+        Updating an existing project requires If-Match with the ETag it was
+        loaded at (428 without it). If the project changed since, nothing is
+        written and the answer is 409 with the current ETag and the differences
+        the save would overwrite. The new ETag is returned in the header and body.
+        """
         try:
             config = json.loads(self.request.body)
-            manager = ProjectManager()
-            result = manager.save_project(config)
+            # The folder the model will save to
+            project_name = safe_project_name(str(config.get('nomprojet', '')))
+            if_match = self.request.headers.get("If-Match")
+            
+            def save():
+                manager = self.project_manager()
+                if if_match is None and (manager.get_project_path(project_name) / "meta.yaml").is_file():
+                    return None
+                result = manager.save_project(config, if_match)
+                return {**result, "etag": manager.project_etag(project_name)}
+            
+            result = await self.pool.run(self.user_name, self.project_key(project_name), save)
+            if result is None:
+                self.set_status(428)
+                self.finish(json.dumps({"error": f"Project '{project_name}' exists: send If-Match with its ETag to update it"}))
+                return
+            self.set_header("ETag", result["etag"])
             self.finish(json.dumps(result))
+        except ConflictError as e:
+            self.set_status(409)
+            self.finish(json.dumps({"error": str(e), "etag": e.etag, "diff": e.diff}))
+        except ValidationError as e:
+            self.set_status(400)
+            self.finish(json.dumps({"error": "Invalid project configuration", "errors": validation_issues(e)}))
+        except PreflightError as e:
+            self.set_status(422)
+            self.finish(json.dumps({"error": str(e), "errors": e.issues}))
         except Exception as e:
-            self.set_status(500)
-            self.finish(json.dumps({"error": str(e)}))
+            self.internal_error(e)
 
 
-class GitHandler(APIHandler):
+class GitHandler(StudioHandler):
     """Execute Git commands in project workspace"""
     
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         """POST /airflow-studio/api/git"""
         try:
             data = json.loads(self.request.body)
@@ -86,34 +256,281 @@ class GitHandler(APIHandler):
                 return
             
             git_service = GitService()
-            result = git_service.execute(command, cwd)
+            async with self.pool.slot(self.user_name, self.folder_key(cwd)):
+                result = await git_service.execute(command, cwd)
             self.finish(json.dumps(result))
         except Exception as e:
-            self.set_status(500)
-            self.finish(json.dumps({"error": str(e), "success": False, "output": ""}))
+            self.internal_error(e, success=False, output="")
 
 
-class CondaHandler(APIHandler):
-    """List available Conda environments"""
+class GitStreamHandler(StudioHandler):
+    """Run a Git command sequence and stream its output as NDJSON"""
     
     @tornado.web.authenticated
-    def get(self):
-        """GET /airflow-studio/api/conda"""
+    async def post(self):
+        """POST /airflow-studio/api/git/stream"""
         try:
-            conda_dir = Path("/etc/conda/envs/custom")
-            if not conda_dir.exists():
-                self.finish(json.dumps([]))
-                return
+            data = json.loads(self.request.body)
+        except ValueError as e:
+            self.set_status(400)
+            self.finish(json.dumps({"error": str(e)}))
+            return
+        
+        commands = data.get('commands', [])
+        cwd = data.get('cwd', '')
+        if not commands or not cwd or not isinstance(commands, list):
+            self.set_status(400)
+            self.finish(json.dumps({"error": "Missing 'commands' or 'cwd'"}))
+            return
+        
+        self.set_header("Content-Type", "application/x-ndjson")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")
+        
+        git_service = GitService()
+        events = git_service.stream([str(c) for c in commands], cwd)
+        try:
+            async with self.pool.slot(self.user_name, self.folder_key(cwd)):
+                async for event in events:
+                    self.write(json.dumps(event) + "\n")
+                    await self.flush()
+        except StreamClosedError:
+            # Client went away; closing the generator kills the running command
+            return
+        finally:
+            await events.aclose()
+        
+        self.finish()
+
+
+class GitStateHandler(StudioHandler):
+    """Branch, tags, recent history and dirty files of a project, read from .git without running git"""
+    
+    @tornado.web.authenticated
+    async def get(self):
+        """GET /airflow-studio/api/git/state?cwd="""
+        cwd = self.get_argument("cwd", "")
+        if not cwd or not os.path.isdir(cwd):
+            self.set_status(400)
+            self.finish(json.dumps({"error": f"Directory '{cwd}' does not exist"}))
+            return
+        
+        try:
+            # Read-only and cached: does not wait behind saves or git commands on the project
+            state = await self.pool.run(self.user_name, None, self.repo_states.state, os.path.realpath(cwd))
+            self.finish(json.dumps(state))
+        except Exception as e:
+            self.internal_error(e)
+
+
+class GitPlanHandler(StudioHandler):
+    """Run a structured deploy plan (add/commit/tag/push...) as one transaction"""
+    
+    @tornado.web.authenticated
+    async def post(self):
+        """POST /airflow-studio/api/git/plan"""
+        try:
+            data = json.loads(self.request.body)
+            operations = data.get('steps', [])
+            cwd = data.get('cwd', '')
             
-            envs = [
-                d.name for d in conda_dir.iterdir() 
-                if d.is_dir()
-            ]
+            if not operations or not cwd:
+                self.set_status(400)
+                self.finish(json.dumps({"error": "Missing 'steps' or 'cwd'"}))
+                return
             
-            self.finish(json.dumps(envs))
+            git_service = GitService()
+            async with self.pool.slot(self.user_name, self.folder_key(cwd)):
+                result = await git_service.run_plan(operations, cwd)
+            self.finish(json.dumps(result))
+        except Exception as e:
+            self.internal_error(e, success=False, steps=[])
+
+
+class CondaHandler(StudioHandler):
+    """List available Conda environments and their packages"""
+    
+    @tornado.web.authenticated
+    async def get(self, env_name: str = None):
+        """GET /airflow-studio/api/conda (names) or /airflow-studio/api/conda/{env} (inventory)"""
+        try:
+            if env_name is None:
+                envs = await self.pool.run(self.user_name, None, self.conda_index.names)
+                self.finish(json.dumps(envs))
+                return
+            inventory = await self.pool.run(self.user_name, None, self.conda_index.inventory, env_name)
+        except Exception as e:
+            self.internal_error(e)
+            return
+        
+        if inventory is None:
+            self.set_status(404)
+            self.finish(json.dumps({"error": f"Conda env '{env_name}' not found"}))
+            return
+        self.finish(json.dumps(inventory))
+
+
+class CondaRankHandler(StudioHandler):
+    """Conda environments ranked by how well they cover a project's imports"""
+    
+    @tornado.web.authenticated
+    async def post(self):
+        """POST /airflow-studio/api/conda/rank - body {config} or {imports: [module, ...]}"""
+        try:
+            data = json.loads(self.request.body)
+            if 'imports' in data:
+                imports = sorted({str(module) for module in data['imports']})
+            else:
+                imports = project_imports(ProjectConfig(**data.get('config', {})))
+        except (TypeError, ValueError) as e:
+            self.set_status(400)
+            self.finish(json.dumps({"error": str(e)}))
+            return
+        
+        try:
+            envs = await self.pool.run(self.user_name, None, self.conda_index.rank, imports)
+            self.finish(json.dumps({"imports": imports, "envs": envs}))
         except Exception as e:
-            self.set_status(500)
+            self.internal_error(e)
+
+
+class ValidateHandler(StudioHandler):
+    """Incremental validation of a server-held project draft"""
+    
+    @tornado.web.authenticated
+    async def post(self):
+        """
+        POST /airflow-studio/api/validate
+        
+        Body is either {config} to start a draft or {draft_id, patch} to apply
+        JSON-patch operations to it. Both return {draft_id, version, valid, errors, ...}.
+        An unknown draft or a patch that does not apply answers with resync=true:
+        the client should start over with the full config.
+        """
+        try:
+            data = json.loads(self.request.body)
+        except ValueError as e:
+            self.set_status(400)
             self.finish(json.dumps({"error": str(e)}))
+            return
+        
+        user = self.user_name
+        draft_id = data.get('draft_id')
+        if 'config' in data:
+            if draft_id:
+                self.drafts.discard(user, draft_id)
+            try:
+                draft = self.drafts.create(user, data['config'])
+            except PatchError as e:
+                self.set_status(400)
+                self.finish(json.dumps({"error": str(e)}))
+                return
+            operations = []
+        else:
+            draft = self.drafts.get(user, draft_id) if draft_id else None
+            if draft is None:
+                self.set_status(404)
+                self.finish(json.dumps({"error": "Unknown or expired draft", "resync": True}))
+                return
+            operations = data.get('patch', [])
+        
+        def patch_and_validate():
+            if operations:
+                draft.apply_patch(operations)
+            return draft.validate()
+        
+        try:
+            # One job at a time per draft keeps patches in order
+            result = await self.pool.run(user, f"draft:{draft.id}", patch_and_validate)
+        except PatchError as e:
+            self.drafts.discard(user, draft.id)
+            self.set_status(400)
+            self.finish(json.dumps({"error": str(e), "resync": True}))
+            return
+        except Exception as e:
+            self.internal_error(e)
+            return
+        
+        self.finish(json.dumps({"draft_id": draft.id, "version": draft.version, **result}))
+
+
+class AnalyzeHandler(StudioHandler):
+    """Critical path, pool capacity and makespan estimates for a pipeline"""
+    
+    @tornado.web.authenticated
+    async def post(self):
+        """POST /airflow-studio/api/analyze - body {config, durations?, pool_capacity?}"""
+        try:
+            data = json.loads(self.request.body)
+            config = ProjectConfig(**data.get('config', {}))
+            check_estimates(data.get('durations'), data.get('pool_capacity'))
+        except ValueError as e:
+            self.set_status(400)
+            self.finish(json.dumps({"error": str(e)}))
+            return
+        
+        try:
+            result = await self.pool.run(
+                self.user_name, None,
+                analyze_pipeline, config, data.get('durations'), data.get('pool_capacity')
+            )
+            self.finish(json.dumps(result))
+        except Exception as e:
+            self.internal_error(e)
+
+
+class ProfileHandler(StudioHandler):
+    """Measure the parse-time cost of a project's generated DAG file"""
+    
+    @tornado.web.authenticated
+    async def get(self, project_name: str):
+        """GET /airflow-studio/api/profile/{name}"""
+        manager = self.project_manager()
+        try:
+            config = await self.pool.run(
+                self.user_name, self.project_key(project_name),
+                lambda: manager.load_project(project_name)
+            )
+            
+            project_path = manager.get_project_path(project_name)
+            dag_path = project_path / f"dag_{project_name}.py"
+            if not dag_path.is_file():
+                self.set_status(404)
+                self.finish(json.dumps({"error": f"No DAG file in project '{project_name}'"}))
+                return
+            
+            python = project_python(config["use_conda"], config["condaenv"])
+            async with self.pool.slot(self.user_name, self.project_key(project_name)):
+                result = await profile_dag(dag_path, python)
+            self.finish(json.dumps({"lazy_imports": config.get("lazy_imports", False), **result}))
+        except FileNotFoundError:
+            self.set_status(404)
+            self.finish(json.dumps({"error": f"Project '{project_name}' not found"}))
+        except Exception as e:
+            self.internal_error(e)
+
+
+class StatsHandler(StudioHandler):
+    """Expose internal counters (project cache hit/miss)"""
+    
+    @tornado.web.authenticated
+    def get(self):
+        """GET /airflow-studio/api/stats"""
+        self.finish(json.dumps({"project_cache": self.project_cache.stats()}))
+
+
+class MetricsHandler(StudioHandler):
+    """Prometheus metrics of the extension (latencies, git, writes, caches, errors)"""
+    
+    @tornado.web.authenticated
+    def get(self):
+        """GET /airflow-studio/api/metrics"""
+        body = metrics.render()
+        if body is None:
+            self.set_status(501)
+            self.finish(json.dumps({"error": "prometheus_client is not installed"}))
+            return
+        self.finish(body, set_content_type=metrics.CONTENT_TYPE_LATEST)
 
 
 def setup_handlers(web_app):
@@ -125,13 +542,41 @@ def setup_handlers(web_app):
     """
     host_pattern = ".*$"
     base_url = web_app.settings["base_url"]
+    studio_settings = web_app.settings.get("airflow_studio")
+    web_app.settings["airflow_studio_pool"] = WorkerPool.from_settings(studio_settings)
+    web_app.settings["airflow_studio_cache"] = ProjectCache.from_settings(studio_settings)
+    web_app.settings["airflow_studio_repo_state"] = RepoStateCache()
+    # Listings report the same git status as /git/state
+    web_app.settings["airflow_studio_workspace"] = WorkspaceIndex(
+        repo_states=web_app.settings["airflow_studio_repo_state"]
+    )
+    web_app.settings["airflow_studio_drafts"] = DraftStore()
+    web_app.settings["airflow_studio_conda"] = CondaIndex()
+    web_app.settings["airflow_studio_conda"].start()
+    log.configure(studio_settings)
+    metrics.register_cache("project", web_app.settings["airflow_studio_cache"].stats)
+    metrics.register_cache("parse", loader._parse_cache.stats)
+    metrics.register_cache("preflight", preflight._check_cache.stats)
+    metrics.register_cache("conda", web_app.settings["airflow_studio_conda"].stats)
+    metrics.register_cache("repo_state", web_app.settings["airflow_studio_repo_state"].stats)
     
     handlers = [
         (url_path_join(base_url, "airflow-studio", "api", "workspaces"), WorkspacesHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "projects"), ProjectListHandler),
         (url_path_join(base_url, "airflow-studio", "api", "project", "(.+)"), ProjectHandler),
         (url_path_join(base_url, "airflow-studio", "api", "project"), ProjectHandler),
         (url_path_join(base_url, "airflow-studio", "api", "git"), GitHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "git", "stream"), GitStreamHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "git", "plan"), GitPlanHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "git", "state"), GitStateHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "conda", "rank"), CondaRankHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "conda", "(.+)"), CondaHandler),
         (url_path_join(base_url, "airflow-studio", "api", "conda"), CondaHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "validate"), ValidateHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "analyze"), AnalyzeHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "profile", "(.+)"), ProfileHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "stats"), StatsHandler),
+        (url_path_join(base_url, "airflow-studio", "api", "metrics"), MetricsHandler),
     ]
     
     web_app.add_handlers(host_pattern, handlers)
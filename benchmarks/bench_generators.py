@@ -0,0 +1,62 @@
+"""
+Scaling benchmark for DagGenerator and TreatmentGenerator
+
+Generates projects from 10 to 10,000 tasks and checks that the cost per
+task stays flat (linear scaling). Exits with status 1 if the per-task
+cost at the largest size exceeds MAX_SLOWDOWN times the smallest one.
+
+    python benchmarks/bench_generators.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from airflow_dag_generator.core.generator import DagGenerator, TreatmentGenerator
+from airflow_dag_generator.core.models import ProjectConfig
+from fixtures import make_config
+
+
+SIZES = [10, 100, 1000, 10000]
+TASKS_PER_STEP = 5
+MAX_SLOWDOWN = 3.0
+
+
+def best_of(func, repeat: int) -> float:
+    """Fastest wall time of `repeat` runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    dag_generator = DagGenerator()
+    treatment_generator = TreatmentGenerator()
+
+    print(f"{'tasks':>8} {'dag ms':>10} {'treatment ms':>14} {'us/task':>10}")
+    per_task = []
+    for size in SIZES:
+        steps = max(1, size // TASKS_PER_STEP)
+        config = ProjectConfig(**make_config(steps=steps, tasks_per_step=min(size, TASKS_PER_STEP)))
+        repeat = 5 if size <= 1000 else 2
+
+        dag_time = best_of(lambda: dag_generator.generate(config), repeat)
+        treatment_time = best_of(lambda: treatment_generator.generate(config.pipeline), repeat)
+        cost = (dag_time + treatment_time) / size * 1e6
+        per_task.append(cost)
+        print(f"{size:>8} {dag_time * 1e3:>10.2f} {treatment_time * 1e3:>14.2f} {cost:>10.2f}")
+
+    # The smallest size is dominated by fixed header cost: compare from 100 up
+    slowdown = per_task[-1] / per_task[1]
+    print(f"per-task cost ratio {SIZES[-1]} vs {SIZES[1]} tasks: {slowdown:.2f}x (limit {MAX_SLOWDOWN}x)")
+    return 0 if slowdown <= MAX_SLOWDOWN else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Synthetic project fixtures for the benchmarks
+"""
+
+from typing import Any, Dict
+
+
+def make_config(
+    steps: int = 10,
+    tasks_per_step: int = 3,
+    code_lines: int = 10,
+    imports_per_task: int = 2,
+    name: str = "bench_project",
+) -> Dict[str, Any]:
+    """
+    Build a ProjectConfig dictionary of a given shape
+
+    Args:
+        steps: Number of sequential pipeline steps
+        tasks_per_step: Parallel tasks in each step
+        code_lines: Lines of code in each task body
+        imports_per_task: Import lines per task (drawn from a shared pool
+            so the generated treatment.py de-duplicates some of them)
+        name: Project name
+    """
+    pipeline = []
+    for s in range(steps):
+        tasks = []
+        for t in range(tasks_per_step):
+            index = s * tasks_per_step + t
+            imports = "\n".join(
+                f"import module_{(index + i) % 50} as m{i}" for i in range(imports_per_task)
+            )
+            code = "\n".join(
+                f"value_{line} = {line} * context.get('run_id', 1)  # step {s} task {t}"
+                for line in range(code_lines)
+            )
+            tasks.append({
+                "id": f"t{index}",
+                "name": f"task-{s}-{t}",
+                "imports": imports,
+                "code": code,
+                "priority": ("high", "mid", "low")[index % 3],
+                "pool_slots": 1 + index % 3,
+                "type": "python",
+                "selected_pool": "bench_pool_b" if index % 4 == 0 else None,
+            })
+        pipeline.append({"id": f"s{s}", "tasks": tasks})
+
+    return {
+        "nomprojet": name,
+        "coderobin": "bnch",
+        "git_remote": "git@example.com:bench/bench.git",
+        "persoid": "bench",
+        "lddata": "bench",
+        "use_conda": True,
+        "condaenv": "airflow-ml-3.11",
+        "cron": "0 2 * * *",
+        "use_input": True,
+        "datalab_in": "bench/in",
+        "use_output": True,
+        "datalab_out": "bench/out",
+        "pipeline": pipeline,
+        "pools": ["bench_pool_a", "bench_pool_b"],
+    }
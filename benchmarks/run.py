@@ -0,0 +1,180 @@
+"""
+Benchmark harness for validation, generation, save and load
+
+Runs every operation against a matrix of synthetic projects, reporting the
+median wall time, throughput (tasks/s) and peak Python memory. Results can
+be saved as a baseline and later runs compared against it: any operation
+slower than `--threshold` times its baseline fails the run.
+
+    python benchmarks/run.py                          # report only
+    python benchmarks/run.py --save baseline.json     # record a baseline
+    python benchmarks/run.py --baseline baseline.json --threshold 1.25
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from airflow_dag_generator.core import loader
+from airflow_dag_generator.core.cache import ProjectCache
+from airflow_dag_generator.core.generator import DagGenerator, MetaYamlGenerator, TreatmentGenerator
+from airflow_dag_generator.core.manager import ProjectManager
+from airflow_dag_generator.core.models import ProjectConfig
+from fixtures import make_config
+
+
+# name: (steps, tasks per step, code lines, imports per task)
+SCENARIOS = {
+    "small": (5, 2, 10, 2),
+    "medium": (50, 4, 20, 5),
+    "large": (200, 5, 20, 5),
+    "long_code": (20, 5, 200, 2),
+    "many_imports": (20, 5, 10, 30),
+}
+
+
+def _median_time(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] = None) -> float:
+    """Median wall time of `repeat` runs; `setup` runs untimed before each one"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _peak_memory(func: Callable[[], Any], setup: Callable[[], Any] = None) -> int:
+    """Peak bytes allocated by Python during one run of `func`"""
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _operations(config_dict: Dict[str, Any], workdir: Path) -> Dict[str, tuple]:
+    """name -> (operation, setup) for one scenario"""
+    config = ProjectConfig(**config_dict)
+    manager = ProjectManager(base_path=workdir)
+    cached_manager = ProjectManager(base_path=workdir, cache=ProjectCache())
+    project_path = manager.get_project_path(config.nomprojet)
+    name = config.nomprojet
+
+    def clean_project():
+        shutil.rmtree(project_path, ignore_errors=True)
+
+    def ensure_saved():
+        if not (project_path / "meta.yaml").exists():
+            manager.save_project(config_dict)
+
+    def cold_load_setup():
+        ensure_saved()
+        loader._parse_cache = loader._ParseCache()
+
+    return {
+        "validate": (lambda: ProjectConfig(**config_dict), None),
+        "generate_meta": (lambda: MetaYamlGenerator().generate(config), None),
+        "generate_dag": (lambda: DagGenerator().generate(config), None),
+        "generate_treatment": (lambda: TreatmentGenerator().generate(config.pipeline), None),
+        "save_new": (lambda: manager.save_project(config_dict), clean_project),
+        "save_unchanged": (lambda: manager.save_project(config_dict), ensure_saved),
+        "load_cold": (lambda: manager.load_project(name), cold_load_setup),
+        "load_cached": (lambda: cached_manager.load_project(name), ensure_saved),
+    }
+
+
+def run(repeat: int, scenarios: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Run the benchmark matrix and return results keyed by 'scenario.operation'"""
+    results: Dict[str, Dict[str, Any]] = {}
+    workdir = Path(tempfile.mkdtemp(prefix="airflow-studio-bench-"))
+    try:
+        for scenario in scenarios:
+            steps, tasks_per_step, code_lines, imports = SCENARIOS[scenario]
+            config_dict = make_config(steps, tasks_per_step, code_lines, imports, name=f"bench_{scenario}")
+            task_count = steps * tasks_per_step
+
+            for operation, (func, setup) in _operations(config_dict, workdir).items():
+                # Warm-up run (imports, caches of the code under test)
+                if setup is not None:
+                    setup()
+                func()
+                seconds = _median_time(func, repeat, setup)
+                results[f"{scenario}.{operation}"] = {
+                    "tasks": task_count,
+                    "median_ms": round(seconds * 1e3, 3),
+                    "tasks_per_s": round(task_count / seconds, 1) if seconds else None,
+                    "peak_kib": round(_peak_memory(func, setup) / 1024, 1),
+                }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Names of benchmarks slower than `threshold` times their baseline"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get("median_ms"):
+            continue
+        ratio = result["median_ms"] / reference["median_ms"]
+        result["vs_baseline"] = round(ratio, 2)
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per benchmark (median is reported)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="limit to these scenarios")
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="max allowed slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat, args.scenario or list(SCENARIOS))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+
+    print(f"{'benchmark':<34} {'tasks':>6} {'median ms':>10} {'tasks/s':>12} {'peak KiB':>10} {'vs base':>8}")
+    for name, result in results.items():
+        ratio = result.get("vs_baseline")
+        flag = " !" if name in regressions else ""
+        print(
+            f"{name:<34} {result['tasks']:>6} {result['median_ms']:>10.3f} "
+            f"{result['tasks_per_s'] or 0:>12.1f} {result['peak_kib']:>10.1f} "
+            f"{(f'{ratio:.2f}x' if ratio else '-'):>8}{flag}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold}x baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
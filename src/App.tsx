@@ -1,7 +1,7 @@
 
 import React, { useState, useEffect } from 'react';
 import { ProjectConfig, PipelineStep, Task, AppView } from './types';
-import { api } from './services/api'; 
+import { api, ProjectConflictError } from './services/api'; 
 import { InputField } from './components/InputField';
 import { EnvironmentBuilder } from './components/EnvironmentBuilder';
 import { TaskBuilder } from './components/TaskBuilder';
@@ -150,7 +150,12 @@ const App: React.FC<AppProps> = ({ serviceManager }) => {
           await api.saveProject(config);
           setCurrentView('DEPLOYMENT');
       } catch (e) {
-          alert("Error saving project: " + e);
+          if (e instanceof ProjectConflictError) {
+              const paths = e.diff.slice(0, 10).map(change => change.path).join('\n');
+              alert(`${e.message}. Reload the project to see the other changes before saving:\n${paths}`);
+          } else {
+              alert("Error saving project: " + e);
+          }
       } finally {
           setIsSaving(false);
       }
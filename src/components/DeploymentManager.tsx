@@ -23,30 +23,25 @@ const InteractiveTerminal = ({ commands, cwd, onComplete }: { commands: string[]
         setIsRunning(true);
         setLines([]);
         
-        for (const cmd of commands) {
-            // UI: Type command
-            const cmdLine = `$ ${cmd}`;
-            setLines(prev => [...prev, cmdLine]);
-            
-            // UI: Slight delay
-            await new Promise(r => setTimeout(r, 400));
-            
-            // BACKEND: Execute
-            try {
-                const res = await api.executeGit(cmd, cwd);
-                const outputLines = res.output.split('\n');
-                setLines(prev => [...prev, ...outputLines]);
-                
-                if (!res.success) {
-                    setLines(prev => [...prev, `Error: Command failed with status ${res.output}`]);
-                    setIsRunning(false);
-                    return; // Stop on error
+        // BACKEND: Run the whole sequence server-side, streaming lines as they arrive
+        try {
+            const success = await api.streamGit(commands, cwd, event => {
+                if (event.event === 'command') {
+                    setLines(prev => [...prev, `$ ${event.command}`]);
+                } else if (event.event === 'output') {
+                    setLines(prev => [...prev, event.line]);
+                } else if (event.event === 'exit' && !event.success) {
+                    setLines(prev => [...prev, `Error: Command failed with status ${event.code ?? 'n/a'}`]);
                 }
-            } catch (e) {
-                setLines(prev => [...prev, `System Error: ${e}`]);
+            });
+            if (!success) {
                 setIsRunning(false);
-                return;
+                return; // Stopped on error
             }
+        } catch (e) {
+            setLines(prev => [...prev, `System Error: ${e}`]);
+            setIsRunning(false);
+            return;
         }
 
         setIsRunning(false);
@@ -3,8 +3,129 @@ import { ServerConnection } from '@jupyterlab/services';
 import { URLExt } from '@jupyterlab/coreutils';
 import { ProjectConfig } from '../types';
 
+export type GitStreamEvent =
+  | { event: 'command', index: number, command: string }
+  | { event: 'output', index: number, line: string }
+  | { event: 'exit', index: number, code: number | null, success: boolean }
+  | { event: 'done', success: boolean, completed: number };
+
+export interface SaveResult {
+  status: 'created' | 'updated' | 'unchanged';
+  path: string;
+  files?: { created: string[], written: string[], skipped: string[], removed: string[] };
+  warnings?: PreflightIssue[];
+  etag?: string;
+}
+
+/** A field the save would overwrite; `current` or `proposed` is absent where the value does not exist */
+export interface ProjectChange {
+  path: string;  // JSON pointer, e.g. /pipeline/0/tasks/1/code
+  current?: any;
+  proposed?: any;
+}
+
+/** Thrown by saveProject when someone else saved the project since it was loaded (HTTP 409) */
+export class ProjectConflictError extends Error {
+  constructor(message: string, public etag: string | null, public diff: ProjectChange[]) {
+    super(message);
+    this.name = 'ProjectConflictError';
+  }
+}
+
+/** Pre-flight finding; errors come back as a 422 body `{error, errors: PreflightIssue[]}` */
+export interface PreflightIssue {
+  file: string;
+  task: string | null;
+  code: string;
+  message: string;
+  line?: number;
+}
+
+export interface ProjectSummary {
+  name: string;
+  is_project: boolean;
+  stage: string | null;
+  owner: string | null;
+  tasks: number | null;
+  last_saved: number | null;
+  git: { branch: string | null, dirty: boolean | null };
+}
+
+export interface ProjectPage {
+  total: number;
+  offset: number;
+  limit: number;
+  items: ProjectSummary[];
+}
+
+export interface ValidationIssue {
+  path: string;  // JSON pointer, e.g. /pipeline/0/tasks/1/code
+  code: string;
+  message: string;
+  line?: number;
+}
+
+export type PatchOperation =
+  | { op: 'add' | 'replace' | 'test', path: string, value: any }
+  | { op: 'remove', path: string };
+
+export interface ValidationResult {
+  draft_id: string;
+  version: number;
+  valid: boolean;
+  errors: ValidationIssue[];
+  revalidated_tasks: number;
+  total_tasks: number;
+  duration_ms: number;
+}
+
+/** Git state of a project folder, read from .git by the server without running git */
+export interface RepoState {
+  path: string;
+  is_repo: boolean;
+  branch?: string | null;
+  detached?: boolean;
+  head?: string | null;  // null on a branch without commits
+  upstream?: { ref: string, sha: string | null, in_sync: boolean } | null;
+  branches?: string[];
+  tags?: { name: string, sha: string, commit: string }[];  // newest version first
+  tag_count?: number;
+  recent?: { sha: string, previous: string, author: string, time: number | null, message: string }[];
+  operation?: 'rebasing' | 'merging' | 'cherry-picking' | 'reverting' | 'bisecting' | null;
+  index?: { version: number | null, entries: number };
+  dirty?: boolean | null;  // null: no worktree change, but the index could not be compared with HEAD
+  staged?: string[] | null;  // index changes against HEAD; null when HEAD's objects are not available locally
+  modified?: string[];
+  deleted?: string[];
+  untracked?: string[];
+  conflicted?: string[];
+}
+
+export interface CondaInventory {
+  name: string;
+  python: string | null;
+  package_count: number;
+  size_bytes: number;
+  packages: Record<string, string>;  // conda package -> version
+  provides: Record<string, string>;  // top-level module -> conda package
+}
+
+export interface CondaEnvRank {
+  name: string;
+  python: string | null;
+  package_count: number;
+  size_bytes: number;
+  coverage: number;  // fraction of the imports found, 0..1
+  covered: Record<string, string | null>;  // module -> conda package (null: installed with pip)
+  missing: string[];
+}
+
 export class AirflowStudioAPI {
   private serverSettings = ServerConnection.makeSettings();
+  // Last loaded config per project, revalidated with If-None-Match
+  private loaded = new Map<string, { etag: string, config: ProjectConfig }>();
+  // ETag each project was last loaded or saved at, sent as If-Match
+  private etags = new Map<string, string>();
 
   async request<T>(path: string, method: string = 'GET', body: any = null): Promise<T> {
     const baseUrl = this.serverSettings.baseUrl;
@@ -36,21 +157,119 @@ export class AirflowStudioAPI {
     return this.request<string[]>('workspaces');
   }
 
+  async listProjects(
+    options: { offset?: number, limit?: number, q?: string, stage?: string, owner?: string } = {}
+  ): Promise<ProjectPage> {
+    const params = new URLSearchParams();
+    Object.entries(options).forEach(([key, value]) => {
+      if (value !== undefined && value !== '') params.set(key, String(value));
+    });
+    const query = params.toString();
+    return this.request<ProjectPage>(query ? `projects?${query}` : 'projects');
+  }
+
   async loadProject(name: string): Promise<ProjectConfig> {
-    return this.request<ProjectConfig>(`project/${name}`);
+    const url = URLExt.join(this.serverSettings.baseUrl, 'airflow-studio', 'api', 'project', name);
+    const cached = this.loaded.get(name);
+    const init: RequestInit = cached ? { headers: { 'If-None-Match': cached.etag } } : {};
+    const response = await ServerConnection.makeRequest(url, init, this.serverSettings);
+    if (response.status === 304 && cached) {
+      this.etags.set(name, cached.etag);
+      return cached.config;
+    }
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || response.statusText);
+    const etag = response.headers.get('ETag');
+    if (etag) {
+      this.loaded.set(name, { etag, config: data });
+      this.etags.set(name, etag);
+    }
+    return data;
   }
 
-  async saveProject(config: ProjectConfig): Promise<{ status: string, path: string }> {
-    return this.request('project', 'POST', config);
+  /** Saves over the version last loaded; throws ProjectConflictError if it changed on the server since */
+  async saveProject(config: ProjectConfig): Promise<SaveResult> {
+    const url = URLExt.join(this.serverSettings.baseUrl, 'airflow-studio', 'api', 'project');
+    const headers: Record<string, string> = {};
+    const etag = this.etags.get(config.nomprojet);
+    if (etag) headers['If-Match'] = etag;
+    const init: RequestInit = { method: 'POST', body: JSON.stringify(config), headers };
+    const response = await ServerConnection.makeRequest(url, init, this.serverSettings);
+    const data = await response.json();
+    if (response.status === 409) {
+      throw new ProjectConflictError(data.error, data.etag, data.diff || []);
+    }
+    if (!response.ok) throw new Error(data.error || response.statusText);
+    // The saved config is re-read on the next load; only its version is kept
+    this.loaded.delete(config.nomprojet);
+    if (data.etag) this.etags.set(config.nomprojet, data.etag);
+    return data;
+  }
+
+  /** Start a server-side draft from a full config */
+  async startValidation(config: ProjectConfig): Promise<ValidationResult> {
+    return this.request('validate', 'POST', { config });
+  }
+
+  /** Patch a draft; on `resync` errors call startValidation again with the full config */
+  async patchValidation(draftId: string, patch: PatchOperation[]): Promise<ValidationResult> {
+    return this.request('validate', 'POST', { draft_id: draftId, patch });
   }
 
   async executeGit(command: string, cwd: string): Promise<{ success: boolean, output: string }> {
     return this.request('git', 'POST', { command, cwd });
   }
 
+  /** Cheap enough to poll: served from a cache keyed by the mtimes of .git files */
+  async gitState(cwd: string): Promise<RepoState> {
+    return this.request<RepoState>(`git/state?cwd=${encodeURIComponent(cwd)}`);
+  }
+
+  async streamGit(commands: string[], cwd: string, onEvent: (event: GitStreamEvent) => void): Promise<boolean> {
+    const url = URLExt.join(this.serverSettings.baseUrl, 'airflow-studio', 'api', 'git', 'stream');
+    const init: RequestInit = { method: 'POST', body: JSON.stringify({ commands, cwd }) };
+    const response = await ServerConnection.makeRequest(url, init, this.serverSettings);
+    if (!response.ok || !response.body) {
+      const data = await response.json().catch(() => ({}));
+      throw new Error(data.error || response.statusText);
+    }
+
+    // NDJSON: one event per line, delivered as the server flushes them
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let success = false;
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let newline = buffer.indexOf('\n');
+      while (newline >= 0) {
+        const line = buffer.slice(0, newline);
+        buffer = buffer.slice(newline + 1);
+        if (line) {
+          const event = JSON.parse(line) as GitStreamEvent;
+          if (event.event === 'done') success = event.success;
+          onEvent(event);
+        }
+        newline = buffer.indexOf('\n');
+      }
+    }
+    return success;
+  }
+
   async listCondaEnvs(): Promise<string[]> {
     return this.request<string[]>('conda');
   }
+
+  async getCondaEnv(name: string): Promise<CondaInventory> {
+    return this.request<CondaInventory>(`conda/${name}`);
+  }
+
+  /** Envs covering the project's imports best first; among full matches, the smallest first */
+  async rankCondaEnvs(config: ProjectConfig): Promise<{ imports: string[], envs: CondaEnvRank[] }> {
+    return this.request('conda/rank', 'POST', { config });
+  }
 }
 
 export const api = new AirflowStudioAPI();